@@ -0,0 +1,78 @@
+"""Benchmark align_summary.txt parsing of Tophat stage.
+
+Compare the line parser :func:`ngcloud.pipe.tuxedo.parse_align_summary`
+against the previous two-regex extraction over a batch of files.
+
+Usage::
+
+    $ python benchmarks/bench_align_summary.py [<n_files>]
+
+"""
+import sys
+import shutil
+import tempfile
+import timeit
+from pathlib import Path
+from ngcloud.pipe.tuxedo import (
+    parse_align_summary, _extract_separate, _extract_align
+)
+
+ALIGN_SUMMARY = """\
+Left reads:
+          Input     :  {0}
+           Mapped   :  26884051 (55.7% of input)
+            of these:    600784 ( 2.2%) have multiple alignments \
+(697919 have >1)
+Right reads:
+          Input     :  {0}
+           Mapped   :  25391501 (52.6% of input)
+            of these:    600784 ( 2.4%) have multiple alignments \
+(678632 have >1)
+54.2% overall read mapping rate.
+
+Aligned pairs:  18814684
+     of these:    600784 ( 3.2%) have multiple alignments
+                 4680778 (24.9%) are discordant alignments
+29.3% concordant pair alignment rate.
+"""
+
+
+def read_regex(pth):
+    with pth.open() as f:
+        raw_string = f.read()
+    match_sep = _extract_separate(raw_string)
+    match_align = _extract_align(raw_string)
+    return {
+        k: int(v)
+        for m in [match_sep, match_align]
+        for k, v in m.groupdict().items()
+    }
+
+
+def read_lines(pth):
+    with pth.open() as f:
+        return parse_align_summary(f.read().splitlines())
+
+
+def main(n_files=2000):
+    root = Path(tempfile.mkdtemp())
+    try:
+        paths = []
+        for i in range(n_files):
+            pth = root / '{}.txt'.format(i)
+            with pth.open('w') as f:
+                f.write(ALIGN_SUMMARY.format(48256786 + i))
+            paths.append(pth)
+        assert all(read_regex(p) == read_lines(p) for p in paths)
+        for name, func in [('regex', read_regex), ('lines', read_lines)]:
+            best = min(timeit.repeat(
+                lambda: [func(p) for p in paths], number=1, repeat=5
+            ))
+            print('{:6s} {:8.2f} ms for {} files'.format(
+                name, best * 1000, n_files))
+    finally:
+        shutil.rmtree(str(root))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
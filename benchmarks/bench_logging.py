@@ -0,0 +1,81 @@
+"""Benchmark logging overhead in per-file hot paths at WARNING level.
+
+Compare debug messages formatted eagerly by ``str.format`` against lazy
+%-style arguments, then time :func:`ngcloud.util.open` and
+:class:`ngcloud.info.Sample` creation with logging at WARNING level against
+logging being disabled, as in a report of many files.
+
+Usage::
+
+    $ python benchmarks/bench_logging.py [<n_calls>]
+
+"""
+import sys
+import logging
+import tempfile
+import timeit
+from pathlib import Path
+from ngcloud.util import open as ng_open
+from ngcloud.info import Sample
+
+logger = logging.getLogger('ngcloud.bench')
+
+
+def eager(pth, args, kwargs):
+    logger.debug(
+        "File {0!s} is open by custom open() function "
+        "with extra arguments: args={1} kwargs={2}"
+        .format(pth, args, kwargs)
+    )
+
+
+def lazy(pth, args, kwargs):
+    logger.debug(
+        "File %s is open by custom open() function "
+        "with extra arguments: args=%s kwargs=%s",
+        pth, args, kwargs
+    )
+
+
+def best_of(func, repeat=5):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main(n_calls=100000):
+    logging.getLogger().setLevel(logging.WARNING)
+    with tempfile.NamedTemporaryFile() as tmp:
+        pth = Path(tmp.name)
+        for name, func in [('eager', eager), ('lazy', lazy)]:
+            t = best_of(lambda: [
+                func(pth, ('r',), {}) for _ in range(n_calls)
+            ])
+            print('{:6s} debug call {:8.2f} ms for {} calls'.format(
+                name, t * 1000, n_calls))
+
+        hot_paths = [
+            ('open()', lambda: [
+                ng_open(pth).close() for _ in range(n_calls)
+            ]),
+            ('Sample', lambda: [
+                Sample('S{}'.format(i), pair_end='R1', stranded=False)
+                for i in range(n_calls)
+            ]),
+        ]
+        for name, func in hot_paths:
+            t_warning = best_of(func)
+            logging.disable(logging.CRITICAL)
+            try:
+                t_disabled = best_of(func)
+            finally:
+                logging.disable(logging.NOTSET)
+            print(
+                '{:6s} {:8.2f} ms at WARNING, {:8.2f} ms logging disabled '
+                '({:+.1f}%) for {} calls'.format(
+                    name, t_warning * 1000, t_disabled * 1000,
+                    (t_warning / t_disabled - 1) * 100, n_calls
+                )
+            )
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
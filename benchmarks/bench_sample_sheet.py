@@ -0,0 +1,65 @@
+"""Benchmark loading the samples of a large cohort into JobInfo.
+
+Compare a ``job_info.yaml`` listing all samples in *sample_list* against
+one referring to a TSV *sample_sheet*, then iterating every sample group.
+
+Usage::
+
+    $ python benchmarks/bench_sample_sheet.py [<n_samples>]
+
+"""
+import sys
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from ngcloud.info import JobInfo
+
+JOB_INFO = 'job_type: tuxedo\njob_id: bench\n'
+
+
+def make_jobs(root, n_samples):
+    names = ['S{:06d}'.format(i // 2) for i in range(n_samples)]
+    yaml_root, sheet_root = root / 'yaml', root / 'sheet'
+    yaml_root.mkdir()
+    sheet_root.mkdir()
+    (yaml_root / 'job_info.yaml').write_text(
+        JOB_INFO + 'sample_list:\n' + ''.join(
+            '    - {}:\n        pair_end: R{}\n'.format(name, i % 2 + 1)
+            for i, name in enumerate(names)
+        )
+    )
+    (sheet_root / 'job_info.yaml').write_text(
+        JOB_INFO + 'sample_sheet: samples.tsv\n'
+    )
+    (sheet_root / 'samples.tsv').write_text('name\tpair_end\n' + ''.join(
+        '{}\tR{}\n'.format(name, i % 2 + 1) for i, name in enumerate(names)
+    ))
+    return yaml_root, sheet_root
+
+
+def bench(label, root):
+    start = time.perf_counter()
+    job_info = JobInfo(root)
+    loaded = time.perf_counter() - start
+    n_paired = sum(
+        len(samples) == 2 for samples in job_info.sample_group.values()
+    )
+    total = time.perf_counter() - start
+    print('{:>12s} load {:7.3f}s  load and group {:7.3f}s  ({} pairs)'.format(
+        label, loaded, total, n_paired
+    ))
+
+
+def main(n_samples=50000):
+    tmp = Path(tempfile.mkdtemp())
+    try:
+        yaml_root, sheet_root = make_jobs(tmp, n_samples)
+        bench('sample_list', yaml_root)
+        bench('sample_sheet', sheet_root)
+    finally:
+        shutil.rmtree(str(tmp))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,71 @@
+"""Benchmark peak RSS of stages holding large arrays with a memory budget.
+
+Each of the stages parses an array of *mb_per_stage* MB into its
+result_info, then all stages are rendered in order like
+:meth:`Report.render_report <ngcloud.report.Report.render_report>` does.
+Every mode runs in a fresh process, whose peak RSS is reported.
+
+Usage::
+
+    $ python benchmarks/bench_spill.py [<n_stages> [<mb_per_stage>]]
+
+"""
+import sys
+import time
+import resource
+import subprocess
+from array import array
+from types import SimpleNamespace
+from pathlib import Path
+from ngcloud.report import Stage
+from ngcloud.pipe import get_shared_template_root
+from ngcloud.spill import ArraySpiller
+
+
+class BigStage(Stage):
+    template_find_paths = [get_shared_template_root()]
+    n_items = 0
+
+    def parse(self):
+        self.result_info['values'] = array('d', bytes(self.n_items * 8))
+
+
+def run(n_stages, mb_per_stage, budget_mb):
+    BigStage.n_items = mb_per_stage * (1 << 20) // 8
+    job_info = SimpleNamespace(root_path=Path('.'), id='bench')
+    spiller = None
+    if budget_mb >= 0:
+        spiller = ArraySpiller(budget_mb << 20)
+    start = time.perf_counter()
+    stages = []
+    for _ in range(n_stages):
+        stage = BigStage(job_info, Path('report'))
+        stage.spiller = spiller
+        stage.ensure_parsed()
+        stages.append(stage)
+    total = 0.0
+    for stage in stages:
+        total += sum(stage.result_info['values'])
+        if spiller is not None:
+            spiller.release(stage)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print('{:>12s} {:8.1f} MB peak RSS {:8.2f}s'.format(
+        'no budget' if budget_mb < 0 else '{} MB'.format(budget_mb),
+        peak, elapsed
+    ))
+
+
+def main(n_stages=4, mb_per_stage=100):
+    for budget_mb in [-1, mb_per_stage, 0]:
+        subprocess.check_call([
+            sys.executable, __file__, '--run',
+            str(n_stages), str(mb_per_stage), str(budget_mb)
+        ])
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--run']:
+        run(*[int(a) for a in sys.argv[2:]])
+    else:
+        main(*[int(a) for a in sys.argv[1:]])
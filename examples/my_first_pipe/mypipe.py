@@ -11,6 +11,7 @@ class IndexStage(Stage):
 class MyStage(Stage):
     template_find_paths = template_root
     template_entrances = "mystage.html"
+    parse_inputs = ["my_stage/summary.txt"]
 
     def parse(self):
         self.result_info['mapped_rate'] = "50%"
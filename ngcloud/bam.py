@@ -0,0 +1,474 @@
+import os
+import zlib
+import struct
+from bisect import bisect_right
+from collections import OrderedDict, Counter
+from concurrent.futures import ProcessPoolExecutor
+import ngcloud as ng
+from ngcloud.util import process_pool_context, _source_path
+
+logger = ng._create_logger(__name__)
+
+__doc__ = """\
+Read alignment statistics from BAM files through a BGZF block reader.
+
+BAM files are BGZF compressed: a series of gzip blocks each holding at most
+64 KB of data, whose compressed sizes are stored in their headers. So block
+offsets are found by reading block headers only, and ranges of blocks can
+be decompressed independently on multiple processes.
+
+A BAM record may start in one block and end in another. The process
+reading a range continues past its end to finish its last record, while
+the next process finds its first record by checking candidate offsets for
+a chain of valid record headers. Both agree on the boundary or the file is
+read again sequentially.
+
+:func:`read_bam_stats` computes flagstat-like counts, the MAPQ histogram of
+primary mapped reads and the insert size histogram of proper pairs.
+Only the first blocks can be read for a quick preview.
+
+.. autosummary::
+
+    read_bam_stats
+    BamStats
+    bgzf_block_offsets
+"""
+
+_BGZF_HEADER = struct.Struct('<4BI2BH')
+_INT32 = struct.Struct('<i')
+_SUBFIELD = struct.Struct('<2BH')
+# block_size refID pos l_read_name mapq bin n_cigar_op flag l_seq
+# next_refID next_pos tlen
+_RECORD_HEAD = struct.Struct('<iiiBBHHHiiii')
+_MAX_RECORD_SIZE = 1 << 24
+_COUNT_CHUNK = 100000
+
+
+def _block_size(extra):
+    """Return BSIZE of the BC subfield of a BGZF extra field."""
+    i = 0
+    while i + _SUBFIELD.size <= len(extra):
+        si1, si2, slen = _SUBFIELD.unpack_from(extra, i)
+        if si1 == 66 and si2 == 67 and slen == 2:
+            return extra[i + 4] | (extra[i + 5] << 8)
+        i += _SUBFIELD.size + slen
+    raise ValueError("Not a BGZF block, BC subfield not found")
+
+
+def bgzf_block_offsets(path):
+    """Return file offsets of all BGZF blocks by reading block headers.
+
+    Raises
+    ------
+    ValueError
+        When the file is not BGZF compressed.
+    """
+    offsets = []
+    pos = 0
+    with _source_path(path).open('rb') as f:
+        while True:
+            f.seek(pos)
+            header = f.read(_BGZF_HEADER.size)
+            if not header:
+                break
+            if len(header) < _BGZF_HEADER.size:
+                raise ValueError("Truncated BGZF block at {}".format(pos))
+            id1, id2, cm, flg, _, _, _, xlen = _BGZF_HEADER.unpack(header)
+            if (id1, id2, cm, flg) != (31, 139, 8, 4):
+                raise ValueError(
+                    "Not a BGZF block at {} of {!s}".format(pos, path)
+                )
+            offsets.append(pos)
+            pos += _block_size(f.read(xlen)) + 1
+    return offsets
+
+
+def _inflate(raw):
+    xlen = raw[10] | (raw[11] << 8)
+    return zlib.decompress(raw[_BGZF_HEADER.size + xlen:-8], -15)
+
+
+def _iter_blocks(f, offsets, ends, start):
+    for k in range(start, len(offsets)):
+        f.seek(offsets[k])
+        yield _inflate(f.read(ends[k] - offsets[k]))
+
+
+class BamStats:
+    """Alignment statistics aggregated over BAM records.
+
+    Records are counted by their (flag, MAPQ, mate on same reference)
+    in :attr:`keys` and insert sizes of proper pairs in :attr:`tlens`,
+    then classified per distinct key by :meth:`as_dict`. Stats of block
+    ranges are merged by ``+=``.
+
+    .. versionadded:: 0.3.4
+    """
+
+    MAPQ_BINS = [0, 1, 10, 20, 30, 40, 50, 60]
+    """Lower edges of MAPQ bins, the last bin has no upper bound."""
+
+    INSERT_BINS = list(range(0, 1001, 100))
+    """Lower edges of insert size bins, the last bin has no upper bound."""
+
+    def __init__(self):
+        self.keys = Counter()
+        self.tlens = Counter()
+        self.n_blocks = 0
+        self.sampled = False
+
+    def __iadd__(self, other):
+        self.keys.update(other.keys)
+        self.tlens.update(other.tlens)
+        self.n_blocks += other.n_blocks
+        self.sampled = self.sampled or other.sampled
+        return self
+
+    def as_dict(self):
+        """Return flagstat-like counts and histograms as plain values.
+
+        Paired counts only include primary alignments, like
+        ``samtools flagstat``.
+        """
+        counts = OrderedDict((k, 0) for k in [
+            'total', 'primary', 'secondary', 'supplementary', 'duplicates',
+            'qc_fail', 'mapped', 'primary_mapped', 'paired', 'read1',
+            'read2', 'properly_paired', 'with_mate_mapped', 'singletons',
+            'mate_diff_chr', 'mate_diff_chr_mapq5',
+        ])
+        mapq_hist = [0] * len(self.MAPQ_BINS)
+        for (flag, mapq, same_ref), n in self.keys.items():
+            counts['total'] += n
+            mapped = not flag & 0x4
+            counts['mapped'] += n if mapped else 0
+            counts['duplicates'] += n if flag & 0x400 else 0
+            counts['qc_fail'] += n if flag & 0x200 else 0
+            if flag & 0x100:
+                counts['secondary'] += n
+                continue
+            if flag & 0x800:
+                counts['supplementary'] += n
+                continue
+            counts['primary'] += n
+            if mapped:
+                counts['primary_mapped'] += n
+                mapq_hist[bisect_right(self.MAPQ_BINS, mapq) - 1] += n
+            if not flag & 0x1:
+                continue
+            counts['paired'] += n
+            counts['read1'] += n if flag & 0x40 else 0
+            counts['read2'] += n if flag & 0x80 else 0
+            if not mapped:
+                continue
+            counts['properly_paired'] += n if flag & 0x2 else 0
+            if flag & 0x8:
+                counts['singletons'] += n
+                continue
+            counts['with_mate_mapped'] += n
+            if not same_ref:
+                counts['mate_diff_chr'] += n
+                counts['mate_diff_chr_mapq5'] += n if mapq >= 5 else 0
+
+        insert_hist = [0] * len(self.INSERT_BINS)
+        for tlen, n in self.tlens.items():
+            insert_hist[bisect_right(self.INSERT_BINS, tlen) - 1] += n
+        stats = OrderedDict(counts)
+        stats['mapped_percent'] = (
+            counts['primary_mapped'] / counts['primary'] * 100
+            if counts['primary'] else None
+        )
+        stats['mapq_hist'] = OrderedDict(
+            zip(_histogram_labels(self.MAPQ_BINS), mapq_hist)
+        )
+        stats['insert_size_median'] = _counter_median(self.tlens)
+        stats['insert_size_hist'] = OrderedDict(
+            zip(_histogram_labels(self.INSERT_BINS), insert_hist)
+        )
+        stats['n_blocks'] = self.n_blocks
+        stats['sampled'] = self.sampled
+        return stats
+
+
+def _histogram_labels(edges):
+    return [
+        str(lo) if hi - lo == 1 else '{}-{}'.format(lo, hi - 1)
+        for lo, hi in zip(edges, edges[1:])
+    ] + ['{}+'.format(edges[-1])]
+
+
+def _counter_median(counter):
+    total = sum(counter.values())
+    if not total:
+        return None
+    seen = 0
+    for value in sorted(counter):
+        seen += counter[value]
+        if seen * 2 >= total:
+            return value
+
+
+def _record_end(buf, p, n_ref):
+    """Return the end of a plausible record at p, False if invalid or None
+    if the buffer ends before the record header."""
+    if p + _RECORD_HEAD.size > len(buf):
+        return None
+    (block_size, ref_id, pos, l_read_name, _, _, n_cigar, _, l_seq,
+     next_ref_id, next_pos, _) = _RECORD_HEAD.unpack_from(buf, p)
+    min_size = 32 + l_read_name + 4 * n_cigar + (l_seq + 1) // 2 + l_seq
+    if not all((
+        -1 <= ref_id < n_ref, -1 <= next_ref_id < n_ref,
+        pos >= -1, next_pos >= -1, l_read_name >= 1, l_seq >= 0,
+        min_size <= block_size <= _MAX_RECORD_SIZE,
+    )):
+        return False
+    name = buf[p + _RECORD_HEAD.size:p + _RECORD_HEAD.size + l_read_name]
+    if len(name) == l_read_name and (
+        name[-1] != 0 or any(c < 33 or c > 126 for c in name[:-1])
+    ):
+        return False
+    return p + 4 + block_size
+
+
+def _guess_record_start(buf, n_ref, chain=3):
+    """Return the first offset of buf followed by a chain of valid records.
+    """
+    for p in range(len(buf)):
+        q, n_valid = p, 0
+        while n_valid < chain:
+            end = _record_end(buf, q, n_ref)
+            if not end:
+                break
+            q, n_valid = end, n_valid + 1
+        if end is False or n_valid == 0:
+            continue
+        return p
+    return None
+
+
+class _RangeReader:
+    """Buffer of decompressed data of blocks from *start_block*.
+
+    Positions are relative to :attr:`buf`, whose first byte is at
+    :attr:`base` of the range. :attr:`limit`, the range length, is known
+    once block end_block - 1 is loaded.
+    """
+
+    def __init__(self, f, offsets, ends, start_block, end_block, stats):
+        self._blocks = _iter_blocks(f, offsets, ends, start_block)
+        self._end_block = end_block
+        self._k = start_block
+        self._total = 0     # decompressed bytes loaded from start_block
+        self._stats = stats
+        self.buf = bytearray()
+        self.base = 0
+        self.limit = None
+
+    def load(self):
+        """Append the next block to buf, return False if none is left."""
+        data = next(self._blocks, None)
+        if data is None:
+            return False
+        self.buf.extend(data)
+        self._total += len(data)
+        self._k += 1
+        self._stats.n_blocks += self._k <= self._end_block
+        if self._k == self._end_block:
+            self.limit = self._total
+        return True
+
+    def need(self, p, n):
+        """Load blocks until n bytes from p are buffered, return False if
+        the file ends before."""
+        while len(self.buf) - p < n:
+            if not self.load():
+                return False
+        return True
+
+    def past_limit(self, p):
+        return self.limit is not None and self.base + p >= self.limit
+
+    def discard(self, p):
+        """Drop consumed data before p once it's large, return new p."""
+        if p > (1 << 20):
+            del self.buf[:p]
+            self.base += p
+            p = 0
+        return p
+
+
+class _RecordCounter:
+    """Count record keys and insert sizes into stats in chunks."""
+
+    def __init__(self, stats):
+        self._stats = stats
+        self._keys = []
+        self._tlens = []
+
+    def add(self, buf, p):
+        (_, ref_id, _, _, mapq, _, _, flag, _, next_ref_id, _,
+         tlen) = _RECORD_HEAD.unpack_from(buf, p)
+        self._keys.append((flag, mapq, ref_id == next_ref_id))
+        if flag & 0x90e == 0x2 and tlen > 0:
+            # primary proper pairs with both mates mapped, once a pair
+            self._tlens.append(tlen)
+        if len(self._keys) >= _COUNT_CHUNK:
+            self.flush()
+
+    def flush(self):
+        self._stats.keys.update(self._keys)
+        self._stats.tlens.update(self._tlens)
+        self._keys, self._tlens = [], []
+
+
+def _scan_range(path, offsets, ends, start_block, start_pos, end_block,
+                n_ref):
+    """Count records starting in blocks [start_block, end_block).
+
+    *start_pos* is the first record offset in the decompressed data of
+    start_block, guessed if None. Run in worker processes.
+
+    Returns
+    -------
+    tuple of (:class:`BamStats`, start_pos, next_pos) where next_pos is the
+    offset of the next record from the start of end_block.
+    """
+    stats = BamStats()
+    counter = _RecordCounter(stats)
+    with _source_path(path).open('rb') as f:
+        reader = _RangeReader(
+            f, offsets, ends, start_block, end_block, stats
+        )
+        reader.load()
+        if start_pos is None:
+            # enough data to validate a few records after the first block
+            reader.need(0, 1 << 18)
+            start_pos = _guess_record_start(reader.buf, n_ref)
+            if start_pos is None:
+                raise ValueError(
+                    "No BAM record found from block {}".format(start_block)
+                )
+        p = start_pos
+        while not reader.past_limit(p):
+            if not reader.need(p, 4):
+                if p != len(reader.buf):
+                    raise ValueError("Truncated BAM record")
+                reader.limit = reader.base + p
+                break
+            if reader.past_limit(p):
+                break
+            block_size = _INT32.unpack_from(reader.buf, p)[0]
+            if not reader.need(p, 4 + block_size):
+                raise ValueError("Truncated BAM record")
+            counter.add(reader.buf, p)
+            p = reader.discard(p + 4 + block_size)
+    counter.flush()
+    return stats, start_pos, reader.base + p - reader.limit
+
+
+def _read_header(path, offsets, ends):
+    """Return (number of references, block index, offset) of the first
+    record after the BAM header."""
+    with _source_path(path).open('rb') as f:
+        buf = bytearray()
+        block_starts = []
+        blocks = _iter_blocks(f, offsets, ends, 0)
+
+        def need(n):
+            while len(buf) < n:
+                data = next(blocks, None)
+                if data is None:
+                    raise ValueError("Truncated BAM header")
+                block_starts.append(len(buf))
+                buf.extend(data)
+
+        need(12)
+        if buf[:4] != b'BAM\x01':
+            raise ValueError("Not a BAM file {!s}".format(path))
+        l_text = _INT32.unpack_from(buf, 4)[0]
+        p = 8 + l_text
+        need(p + 4)
+        n_ref = _INT32.unpack_from(buf, p)[0]
+        p += 4
+        for _ in range(n_ref):
+            need(p + 4)
+            l_name = _INT32.unpack_from(buf, p)[0]
+            p += 4 + l_name + 4
+        need(p)
+        # the first record may start right at the next block
+        if p == len(buf):
+            return n_ref, len(block_starts), 0
+        idx = bisect_right(block_starts, p) - 1
+        return n_ref, idx, p - block_starts[idx]
+
+
+def read_bam_stats(path, workers=None, max_blocks=None):
+    """Return :class:`BamStats` of a BAM file.
+
+    Parameters
+    ----------
+    path : path-like object
+    workers : int, optional
+        Number of processes reading block ranges, default number of CPUs.
+        Small files are read in the current process.
+    max_blocks : int, optional
+        Only read records starting in the first *max_blocks* blocks after
+        the header for a quick preview. The stats are marked *sampled*.
+
+    .. versionadded:: 0.3.4
+    """
+    offsets = bgzf_block_offsets(path)
+    ends = offsets[1:] + [_source_path(path).stat().st_size]
+    n_ref, first_block, first_pos = _read_header(path, offsets, ends)
+    n_blocks = len(offsets)
+    end_block = n_blocks
+    if max_blocks is not None:
+        end_block = min(first_block + max_blocks, n_blocks)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    n_ranges = min(workers, (end_block - first_block) // 16)
+
+    if n_ranges < 2:
+        stats = _scan_range(
+            path, offsets, ends, first_block, first_pos, end_block, n_ref
+        )[0]
+    else:
+        bounds = [
+            first_block + (end_block - first_block) * i // n_ranges
+            for i in range(n_ranges + 1)
+        ]
+        try:
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=process_pool_context()
+            ) as executor:
+                results = list(executor.map(
+                    _scan_range,
+                    [path] * n_ranges, [offsets] * n_ranges,
+                    [ends] * n_ranges,
+                    bounds[:-1], [first_pos] + [None] * (n_ranges - 1),
+                    bounds[1:], [n_ref] * n_ranges,
+                ))
+        except ValueError as e:
+            logger.debug("Reading block ranges caught error {!r}".format(e))
+            results = []
+        boundaries_agree = results and all(
+            prev[2] == curr[1] for prev, curr in zip(results, results[1:])
+        )
+        if boundaries_agree:
+            stats = BamStats()
+            for range_stats, _, _ in results:
+                stats += range_stats
+        else:
+            logger.warning(
+                "Record boundaries of block ranges mismatch in {!s}, "
+                "read sequentially".format(path)
+            )
+            stats = _scan_range(
+                path, offsets, ends, first_block, first_pos, end_block, n_ref
+            )[0]
+    stats.sampled = end_block < n_blocks
+    logger.info(
+        "Read {} of {} blocks of {!s} by {} ranges".format(
+            stats.n_blocks, n_blocks, path, max(n_ranges, 1)
+        )
+    )
+    return stats
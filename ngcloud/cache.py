@@ -0,0 +1,204 @@
+import os
+import time
+import pickle
+import hashlib
+import inspect
+import ngcloud as ng
+from ngcloud.util import (
+    strify_path, discover_file_by_patterns, user_cache_dir, _source_path
+)
+
+logger = ng._create_logger(__name__)
+
+__doc__ = """\
+Cache parsed stage results keyed by their input files.
+
+A stage declares the files its :meth:`~ngcloud.report.Stage.parse` reads by
+:attr:`Stage.parse_inputs <ngcloud.report.Stage.parse_inputs>`. Before
+parsing, a fingerprint is computed from the path, size and modification
+time of those files, together with the stage class, the file defining it,
+the files of job information (job_info.yaml and the sample sheet), the
+stage attributes named by :attr:`Stage.parse_options
+<ngcloud.report.Stage.parse_options>` and the NGCloud version. When a
+result of the same fingerprint was cached, it is loaded and parsing is
+skipped.
+
+.. code-block:: python3
+
+    class MyStage(Stage):
+        parse_inputs = ['*/summary.txt']
+
+        def parse(self):
+            ...  # skipped when no summary.txt changed
+
+Results are stored by :mod:`pickle`, so result_info should contain only
+picklable objects. Stages whose result cannot be pickled are parsed every
+time. After each result is stored, results unused for
+:attr:`ParseCache.max_age` or beyond :attr:`ParseCache.max_size` in total,
+least recently used first, are removed.
+
+.. autosummary::
+
+    ParseCache
+    input_fingerprint
+"""
+
+
+def _stat_key(path):
+    st = _source_path(path).stat()
+    return '{}:{}'.format(st.st_size, st.st_mtime_ns)
+
+
+def input_fingerprint(stage):
+    """Return a hex digest identifying the inputs of a stage's parse().
+
+    Return None if the stage declares no :attr:`parse_inputs
+    <ngcloud.report.Stage.parse_inputs>`.
+    """
+    if not stage.parse_inputs:
+        return None
+    h = hashlib.sha1()
+    stage_cls = type(stage)
+    h.update('{}.{}\n{}\n'.format(
+        stage_cls.__module__, stage_cls.__qualname__, ng.__version__
+    ).encode())
+    for name in stage.parse_options:
+        h.update('{}={!r}\n'.format(name, getattr(stage, name)).encode())
+    # changes of the parsing code or sample info invalidate the cache
+    try:
+        src_file = inspect.getsourcefile(stage_cls)
+    except TypeError:
+        src_file = None
+    if src_file:
+        h.update('{}\n'.format(_stat_key(src_file)).encode())
+    info_files = getattr(
+        stage.job_info, 'source_files',
+        [stage.job_info.root_path / 'job_info.yaml']
+    )
+    for pth in info_files:
+        if pth.exists():
+            h.update('{!s}\t{}\n'.format(pth, _stat_key(pth)).encode())
+
+    result_root = stage.result_root.resolve()
+    h.update('{!s}\n'.format(result_root).encode())
+    inputs = sorted(set(
+        discover_file_by_patterns(result_root, stage.parse_inputs)
+    ))
+    for pth in inputs:
+        h.update('{}\t{}\n'.format(
+            pth.relative_to(result_root).as_posix(), _stat_key(pth)
+        ).encode())
+    return h.hexdigest()
+
+
+class ParseCache:
+    """Store and load result_info of stages declaring parse_inputs.
+
+    Parameters
+    ----------
+    cache_dir : path-like object, optional
+        Default :file:`$XDG_CACHE_HOME/ngcloud/parse`.
+    max_size : int
+        Total bytes of cached results kept by :meth:`prune`.
+    max_age : float
+        Seconds a cached result is kept by :meth:`prune` since it was last
+        stored or loaded.
+
+    .. versionadded:: 0.3.4
+    """
+
+    def __init__(
+        self, cache_dir=None, max_size=512 << 20, max_age=30 * 86400
+    ):
+        if cache_dir is None:
+            cache_dir = user_cache_dir('parse')
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.max_age = max_age
+
+    def _cache_path(self, digest):
+        return os.path.join(strify_path(self.cache_dir), digest + '.pickle')
+
+    def prune(self):
+        """Remove cached results older than :attr:`max_age`, then the least
+        recently used ones until the rest fit in :attr:`max_size`.
+
+        Returns
+        -------
+        Number of results removed.
+        """
+        try:
+            with os.scandir(strify_path(self.cache_dir)) as it:
+                entries = [
+                    (entry.stat().st_mtime, entry.stat().st_size, entry.path)
+                    for entry in it if entry.name.endswith('.pickle')
+                ]
+        except FileNotFoundError:
+            return 0
+        expire = time.time() - self.max_age
+        total = sum(size for _, size, _ in entries)
+        n_removed = 0
+        for mtime, size, path in sorted(entries):
+            if mtime >= expire and total <= self.max_size:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            n_removed += 1
+        if n_removed:
+            logger.debug("Removed %d cached results", n_removed)
+        return n_removed
+
+    def parse(self, stage):
+        """Load result_info of *stage* from cache or call its parse().
+
+        Returns
+        -------
+        True if result_info was loaded from cache.
+        """
+        digest = input_fingerprint(stage)
+        stage_name = type(stage).__name__
+        if digest is None:
+            stage.parse()
+            return False
+
+        cache_path = self._cache_path(digest)
+        try:
+            with open(cache_path, 'rb') as f:
+                stage.result_info = pickle.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(
+                "Loading cached result of {} caught error {!r}, parse again"
+                .format(stage_name, e)
+            )
+        else:
+            logger.info("Load cached result of {}".format(stage_name))
+            # mark as recently used for prune()
+            try:
+                os.utime(cache_path)
+            except OSError:
+                pass
+            return True
+
+        stage.parse()
+        tmp_path = '{}.{}.tmp'.format(cache_path, os.getpid())
+        try:
+            os.makedirs(strify_path(self.cache_dir), exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(
+                    stage.result_info, f, protocol=pickle.HIGHEST_PROTOCOL
+                )
+            os.replace(tmp_path, cache_path)
+        except Exception as e:
+            logger.warning(
+                "Result of {} cannot be cached: {!r}".format(stage_name, e)
+            )
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            return False
+        self.prune()
+        return False
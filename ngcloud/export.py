@@ -0,0 +1,338 @@
+import abc
+import re
+import json
+import math
+import sqlite3
+from array import array
+from decimal import Decimal
+from pathlib import Path
+from collections.abc import Mapping
+import ngcloud as ng
+from ngcloud.util import open, strify_path
+from ngcloud.vfs import ArchivePath
+from ngcloud.spill import SpilledArray
+
+logger = ng._create_logger(__name__)
+
+__doc__ = """\
+Export parsed NGS results as machine-readable files.
+
+Each stage's :attr:`~ngcloud.report.Stage.result_info` is serialized by
+exporters next to the rendered report, so other tools can query the metrics
+without parsing the HTML or the tool outputs again.
+
+Available exporters are listed in :data:`AVAIL_EXPORTERS`. Set
+:attr:`Report.export_formats <ngcloud.report.Report.export_formats>` or
+pass ``--export=json,sqlite`` to :command:`ngreport` to enable them.
+
+.. autosummary::
+
+    Exporter
+    JSONExporter
+    SQLiteExporter
+    ParquetExporter
+    jsonify
+    flatten_result_info
+    check_formats
+"""
+
+EXCLUDED_KEYS = {'normal_stages', 'stage_mapping', 'history'}
+"""Keys of result_info not exported. Upper case keys, which are constants
+for templates by convention, are excluded as well."""
+
+
+# metrics like over_seq.3.count are positions in lists, not comparable
+_has_list_index = re.compile(r'(^|\.)\d+(\.|$)').search
+
+
+def _exported_items(result_info):
+    for key, value in result_info.items():
+        if key in EXCLUDED_KEYS or key.isupper():
+            continue
+        yield key, value
+
+
+def jsonify(obj):
+    """Convert objects in result_info to JSON compatible types.
+
+    - mappings become dict, namedtuples become dict by their fields
+    - lists, tuples, sets, :py:class:`array.array` and
+      :class:`~ngcloud.spill.SpilledArray` become list
+    - :py:class:`~decimal.Decimal` becomes float, non-finite float becomes
+      None
+    - :py:class:`~pathlib.Path` becomes str
+    - other objects become dict of their attributes if any, otherwise str
+    """
+    if obj is None or isinstance(obj, (bool, int, str)):
+        return obj
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, Decimal):
+        return jsonify(float(obj))
+    if isinstance(obj, Path):
+        return strify_path(obj)
+    if isinstance(obj, ArchivePath):
+        return obj.as_posix()
+    if isinstance(obj, Mapping):
+        return {str(k): jsonify(v) for k, v in obj.items()}
+    if isinstance(obj, tuple) and hasattr(obj, '_asdict'):
+        return jsonify(obj._asdict())
+    if isinstance(obj, (list, tuple, set, frozenset, array, SpilledArray)):
+        return [jsonify(v) for v in obj]
+    if hasattr(obj, '__dict__'):
+        return jsonify(vars(obj))
+    return str(obj)
+
+
+def flatten_result_info(result_info, sample_names=()):
+    """Flatten result_info into (sample, metric, value) rows.
+
+    Nested keys and list indexes are joined by ``.`` as the metric name,
+    namedtuples are named by their fields as in :func:`jsonify`.
+    If a key matches one of *sample_names*, it is taken as the sample
+    instead of being part of the metric name.
+
+    Examples
+    --------
+
+        >>> info = {'qc_info': {'A_R1': {'Basic Statistics': 'pass'}},
+        ...         'overall_pair_percent': 44.28}
+        >>> list(flatten_result_info(info, ['A_R1']))
+        [('A_R1', 'qc_info.Basic Statistics', 'pass'),
+         (None, 'overall_pair_percent', 44.28)]
+
+    Yields
+    ------
+    tuple of (sample or None, metric, value) where value is
+    None, bool, int, float or str.
+    """
+    sample_names = set(sample_names)
+
+    def _walk(obj, sample, path):
+        if obj is None or isinstance(obj, (bool, int, float, str)):
+            yield sample, '.'.join(path), obj
+        elif isinstance(obj, Mapping):
+            for k, v in obj.items():
+                k = str(k)
+                if sample is None and k in sample_names:
+                    yield from _walk(v, k, path)
+                else:
+                    yield from _walk(v, sample, path + [k])
+        elif isinstance(obj, tuple) and hasattr(obj, '_asdict'):
+            yield from _walk(obj._asdict(), sample, path)
+        elif isinstance(obj, (list, tuple, array, SpilledArray)):
+            for i, v in enumerate(obj):
+                yield from _walk(v, sample, path + [str(i)])
+        else:
+            yield from _walk(jsonify(obj), sample, path)
+
+    for key, value in _exported_items(result_info):
+        yield from _walk(value, None, [key])
+
+
+def _sample_names(job_info):
+    names = set(job_info.sample_group)
+    names.update(sample.full_name for sample in job_info.sample_list)
+    return names
+
+
+def _job_dict(job_info):
+    return {
+        'job_id': str(job_info.id),
+        'job_type': job_info.type,
+        'samples': [
+            {'name': s.name, 'full_name': s.full_name,
+             'pair_end': s.pair_end, 'stranded': s.stranded}
+            for s in job_info.sample_list
+        ],
+    }
+
+
+def iter_metric_rows(report):
+    """Iterate over metrics of all stages of a generated report.
+
+    Yields
+    ------
+    tuple of (job_id, stage, sample, metric, value_num, value_text).
+    Numeric values (bool included) are in *value_num*, others in
+    *value_text*.
+    """
+    job_id = str(report.job_info.id)
+    sample_names = _sample_names(report.job_info)
+    for stage in report._stages:
+        stage_name = type(stage).__name__
+        rows = flatten_result_info(stage.result_info, sample_names)
+        for sample, metric, value in rows:
+            if isinstance(value, (bool, int, float)):
+                value_num, value_text = float(value), None
+                if math.isnan(value_num):
+                    value_num = None
+            else:
+                value_num, value_text = None, value
+            yield job_id, stage_name, sample, metric, value_num, value_text
+
+
+class Exporter(metaclass=abc.ABCMeta):
+    """Base class of exporters.
+
+    Subclass sets :attr:`filename` and implements :meth:`export`.
+    """
+
+    filename = 'metrics'
+    """File name of the export under report root."""
+
+    @abc.abstractmethod
+    def export(self, report, out_path):
+        """Write metrics of *report* to *out_path*.
+
+        Parameters
+        ----------
+        report : :class:`~ngcloud.report.Report` object
+            A report of which stages have been parsed.
+        out_path : :class:`~pathlib.Path` object
+        """
+
+
+class JSONExporter(Exporter):
+    """Export job info and full result_info of each stage as one JSON."""
+
+    filename = 'metrics.json'
+
+    def export(self, report, out_path):
+        content = _job_dict(report.job_info)
+        content['stages'] = {
+            type(stage).__name__: jsonify(dict(
+                _exported_items(stage.result_info)
+            ))
+            for stage in report._stages
+        }
+        with open(out_path, 'w') as f:
+            json.dump(content, f, indent=1, sort_keys=True)
+
+
+_SQLITE_SCHEMA = """\
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY, job_type TEXT
+);
+CREATE TABLE IF NOT EXISTS samples (
+    job_id TEXT, name TEXT, full_name TEXT, pair_end TEXT, stranded INTEGER
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    job_id TEXT, stage TEXT, sample TEXT, metric TEXT,
+    value_num REAL, value_text TEXT
+);
+"""
+
+
+class SQLiteExporter(Exporter):
+    """Export metrics into a SQLite database in long format.
+
+    Tables are *jobs*, *samples* and *metrics*, where each metric row is
+    (job_id, stage, sample, metric, value_num, value_text). See
+    :func:`iter_metric_rows`.
+    """
+
+    filename = 'metrics.sqlite'
+
+    def export(self, report, out_path):
+        if out_path.exists():
+            out_path.unlink()
+        job = _job_dict(report.job_info)
+        conn = sqlite3.connect(strify_path(out_path))
+        try:
+            with conn:
+                conn.executescript(_SQLITE_SCHEMA)
+                conn.execute(
+                    "INSERT INTO jobs VALUES (?, ?)",
+                    (job['job_id'], job['job_type'])
+                )
+                conn.executemany(
+                    "INSERT INTO samples VALUES (?, ?, ?, ?, ?)",
+                    [(job['job_id'], s['name'], s['full_name'],
+                      s['pair_end'], s['stranded'])
+                     for s in job['samples']]
+                )
+                conn.executemany(
+                    "INSERT INTO metrics VALUES (?, ?, ?, ?, ?, ?)",
+                    iter_metric_rows(report)
+                )
+        finally:
+            conn.close()
+
+
+class ParquetExporter(Exporter):
+    """Export metrics as a columnar Parquet file, require pyarrow.
+
+    Columns are the same as the *metrics* table of :class:`SQLiteExporter`.
+    """
+
+    filename = 'metrics.parquet'
+    columns = [
+        'job_id', 'stage', 'sample', 'metric', 'value_num', 'value_text'
+    ]
+
+    def export(self, report, out_path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        cols = list(zip(*iter_metric_rows(report))) or [()] * 6
+        table = pa.Table.from_pydict({
+            name: list(col) for name, col in zip(self.columns, cols)
+        })
+        pq.write_table(table, strify_path(out_path))
+
+
+AVAIL_EXPORTERS = {
+    'json': JSONExporter,
+    'sqlite': SQLiteExporter,
+    'parquet': ParquetExporter,
+}
+"""Exporters by format name. Custom exporters can be added here."""
+
+
+def check_formats(formats):
+    """Raise ValueError if any format name is not in :data:`AVAIL_EXPORTERS`.
+
+    Called before a report is generated, so a mistyped format fails fast.
+    """
+    unknown = [
+        fmt for fmt in formats
+        if isinstance(fmt, str) and fmt not in AVAIL_EXPORTERS
+    ]
+    if unknown:
+        raise ValueError(
+            "Unknown export format {}, available formats are {}".format(
+                ', '.join(map(repr, unknown)),
+                ', '.join(sorted(AVAIL_EXPORTERS))
+            )
+        )
+
+
+def export_report(report, formats):
+    """Export metrics of *report* under its report root.
+
+    Parameters
+    ----------
+    report : :class:`~ngcloud.report.Report` object
+    formats : list of str or :class:`Exporter` subclass
+        Format names in :data:`AVAIL_EXPORTERS` or exporter classes.
+
+    Returns
+    -------
+    List of exported file paths.
+    """
+    check_formats(formats)
+    exported = []
+    for fmt in formats:
+        Exporter_ = AVAIL_EXPORTERS[fmt] if isinstance(fmt, str) else fmt
+        out_path = report.report_root / Exporter_.filename
+        logger.info("Export metrics to {!s}".format(out_path))
+        try:
+            Exporter_().export(report, out_path)
+        except ImportError as e:
+            logger.warning(
+                "Export by {} skipped, missing dependency: {}"
+                .format(Exporter_.__name__, e)
+            )
+            continue
+        exported.append(out_path)
+    return exported
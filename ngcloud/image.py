@@ -0,0 +1,217 @@
+import os
+import time
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+import ngcloud as ng
+from ngcloud.util import (
+    copy, file_hash, process_pool_context, strify_path, user_cache_dir,
+    _source_path
+)
+
+logger = ng._create_logger(__name__)
+
+__doc__ = """\
+Optimize embedded result images and make their thumbnails.
+
+Result images such as FastQC plots are embedded at full resolution, which
+makes reports of many samples heavy. When enabled by
+:attr:`Report.optimize_images <ngcloud.report.Report.optimize_images>`
+(``ngreport --optimize-images``), embedded PNG images are re-encoded
+losslessly and a downscaled thumbnail is made next to each of them under
+:data:`THUMB_DIRNAME`. Templates use :func:`thumb_path` through the
+``thumb()`` global to show the thumbnail linking to the full image.
+
+Images are processed on a process pool and cached by their content hash,
+so unchanged images are not processed again. Require Pillow_
+(``pip install ngcloud[image]``); images are copied as they are if Pillow
+is not installed.
+
+.. _Pillow: https://pypi.python.org/pypi/Pillow
+
+.. autosummary::
+
+    ImageOptimizer
+    thumb_path
+"""
+
+IMAGE_SUFFIXES = {'.png'}
+"""Suffixes of images being optimized."""
+
+THUMB_DIRNAME = '_thumb'
+"""Name of the folder storing thumbnails next to the full images."""
+
+
+def is_available():
+    """Return whether image optimization is available (Pillow installed)."""
+    return Image is not None
+
+
+def thumb_path(rel_path):
+    """Return path of the thumbnail of image *rel_path*.
+
+    Examples
+    --------
+
+        >>> thumb_path('qc_sample/pics/A_R1/per_base_quality.png')
+        'qc_sample/pics/A_R1/_thumb/per_base_quality.png'
+
+    """
+    pth = Path(rel_path)
+    return (pth.parent / THUMB_DIRNAME / pth.name).as_posix()
+
+
+def default_cache_dir():
+    """Return :file:`$XDG_CACHE_HOME/ngcloud/images`."""
+    return user_cache_dir('images')
+
+
+def _cache_paths(cache_dir, digest, thumb_size):
+    w, h = thumb_size
+    return (
+        os.path.join(cache_dir, '{}.png'.format(digest)),
+        os.path.join(cache_dir, '{}_{}x{}.png'.format(digest, w, h)),
+    )
+
+
+def _optimize_image(src, cache_dir, thumb_size):
+    """Return (optimized image, thumbnail, whether cached) in *cache_dir* of
+    image *src*, processing it if not cached. Run in worker processes, so
+    the caller never reads the images itself."""
+    full, thumb = _cache_paths(cache_dir, file_hash(src), thumb_size)
+    if os.path.exists(full) and os.path.exists(thumb):
+        return full, thumb, True
+    _process_image(src, full, thumb, thumb_size)
+    return full, thumb, False
+
+
+def _process_image(src, full_dest, thumb_dest, thumb_size):
+    """Write optimized image and its thumbnail."""
+    # workers may process images of the same content at once
+    tmp_full = '{}.{}.tmp'.format(full_dest, os.getpid())
+    tmp_thumb = '{}.{}.tmp'.format(thumb_dest, os.getpid())
+    src = _source_path(src)
+    with src.open('rb') as f, Image.open(f) as img:
+        img.save(tmp_full, format='PNG', optimize=True)
+        img.thumbnail(thumb_size)
+        img.save(tmp_thumb, format='PNG', optimize=True)
+    # keep the original if re-encoding doesn't help
+    if os.path.getsize(tmp_full) >= src.stat().st_size:
+        os.unlink(tmp_full)
+        copy(src, tmp_full)
+    # rename is atomic, other processes never see partial files in cache
+    os.replace(tmp_full, full_dest)
+    os.replace(tmp_thumb, thumb_dest)
+
+
+def _place(src, dest):
+    """Copy *src* to *dest*, never linking, so editing the report leaves
+    the cache and the source images intact."""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    if dest.exists():
+        dest.unlink()
+    copy(src, dest)
+
+
+class ImageOptimizer:
+    """Optimize images and make thumbnails on a process pool.
+
+    Images are submitted by :meth:`submit` and hashed, looked up in the
+    cache and processed in background. Results are written into the cache
+    folder named by content hash of the source image, then copied to their
+    destinations when :meth:`join`.
+
+    Parameters
+    ----------
+    dst_root : path-like object
+        Root of relative destination paths.
+    cache_dir : path-like object, optional
+        Folder of processed images, default :func:`default_cache_dir`.
+    max_workers : int, optional
+        Number of processes, default number of CPUs.
+    thumb_size : tuple of int
+        Maximal (width, height) of thumbnails, aspect ratio is kept.
+
+    .. versionadded:: 0.3.4
+    """
+
+    def __init__(
+        self, dst_root, cache_dir=None, max_workers=None,
+        thumb_size=(400, 300)
+    ):
+        if not is_available():
+            raise ImportError(
+                "Image optimization requires Pillow, "
+                "try pip install ngcloud[image]"
+            )
+        self.dst_root = Path(strify_path(dst_root))
+        if cache_dir is None:
+            cache_dir = default_cache_dir()
+        self.cache_dir = Path(strify_path(cache_dir))
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.thumb_size = tuple(thumb_size)
+        self._executor = ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=process_pool_context()
+        )
+        self._jobs = dict()
+        self._dests = []
+        self._start = time.perf_counter()
+
+    def submit(self, src, rel_dest):
+        """Optimize image *src* into *rel_dest* under destination root.
+
+        The thumbnail goes to :func:`thumb_path` of *rel_dest*.
+        """
+        src = _source_path(src)
+        self._dests.append((src, rel_dest))
+        if src not in self._jobs:
+            self._jobs[src] = self._executor.submit(
+                _optimize_image, src, strify_path(self.cache_dir),
+                self.thumb_size
+            )
+
+    def join(self):
+        """Wait for all images processed and place them to destinations.
+
+        Images failed to be processed are copied as they are, with the
+        full image as the thumbnail.
+
+        Returns
+        -------
+        tuple of (bytes of source images, bytes of optimized images)
+        """
+        self._executor.shutdown(wait=True)
+        results = dict()
+        for src, future in self._jobs.items():
+            try:
+                results[src] = future.result()
+            except Exception as e:
+                logger.warning(
+                    "Optimizing image caught error {!r}, copy it as is"
+                    .format(e)
+                )
+                results[src] = (src, src, False)
+
+        n_src_bytes = n_out_bytes = 0
+        for src, rel_dest in self._dests:
+            dest = self.dst_root / rel_dest
+            thumb_dest = self.dst_root / thumb_path(rel_dest)
+            full, thumb, _ = results[src]
+            _place(full, dest)
+            _place(thumb, thumb_dest)
+            n_src_bytes += src.stat().st_size
+            n_out_bytes += dest.stat().st_size
+
+        elapsed = time.perf_counter() - self._start
+        n_cached = sum(cached for _, _, cached in results.values())
+        logger.info(
+            "Optimized {} images ({} sources, {} cached) in {:.2f}s, "
+            "{:.1f} MB -> {:.1f} MB".format(
+                len(self._dests), len(self._jobs), n_cached, elapsed,
+                n_src_bytes / 1e6, n_out_bytes / 1e6,
+            )
+        )
+        return n_src_bytes, n_out_bytes
@@ -1,8 +1,11 @@
+import csv
+import itertools
 from collections import OrderedDict
-from pathlib import Path
+from collections.abc import Mapping, Sequence
 import yaml
 import ngcloud as ng
-from ngcloud.util import open, _val_bool_or_none
+from ngcloud.util import open, strify_path, _val_bool_or_none
+from ngcloud.vfs import ArchivePath, job_path
 
 logger = ng._create_logger(__name__)
 
@@ -57,9 +60,7 @@ class Sample:
         self.stranded = stranded
 
         self.full_name = self._gen_full_name()
-        logger.debug(
-            "New sample(full_name: {0.full_name}) created".format(self)
-        )
+        logger.debug("New sample(full_name: %s) created", self.full_name)
 
     def __repr__(self):
         return "Sample(name={0.name!r})".format(self)
@@ -81,6 +82,228 @@ class Sample:
             )
 
 
+_NONE_TEXT = {'', 'none', 'null', 'na', '~'}
+_BOOL_TEXT = {
+    'true': True, 'yes': True, '1': True,
+    'false': False, 'no': False, '0': False,
+}
+
+
+def _sheet_value(value):
+    """Convert a text cell of sample sheet into None, bool or stripped
+    text. Cells of other types, e.g. typed Parquet columns, are kept."""
+    if not isinstance(value, str):
+        return value
+    text = value.strip()
+    if text.lower() in _NONE_TEXT:
+        return None
+    return _BOOL_TEXT.get(text.lower(), text)
+
+
+class SampleSheet(Sequence):
+    """Samples stored column-wise, read from a TSV, CSV or Parquet sheet.
+
+    It is a sequence of :class:`Sample` like the *sample_list* in YAML, but
+    each :class:`Sample` is only created when it is first accessed, which
+    keeps the loading of cohorts with tens of thousands of samples fast.
+
+    A sheet has a header row naming its columns. Column *name* is required,
+    and columns matching :class:`Sample` parameters, *pair_end* and
+    *stranded*, are passed to each sample. Empty cells are None, and
+    true/false or yes/no are booleans. Other columns are kept in
+    :attr:`columns` but are unused by samples.
+
+    Parameters
+    ----------
+    columns : dict
+        Mapping of column name to its list of values.
+
+    Attributes
+    ----------
+    columns : OrderedDict
+
+    Examples
+    --------
+    Given a file ``samples.tsv``,
+
+    .. code-block:: none
+
+        name    pair_end    stranded
+        A       R1
+        A       R2
+        B       False       true
+
+        >>> sheet = SampleSheet.read(Path('samples.tsv'))
+        >>> len(sheet), sheet[2].full_name, sheet[2].stranded
+        (3, 'B', True)
+        >>> list(sheet.groups())
+        ['A', 'B']
+
+    .. versionadded:: 0.3.4
+    """
+
+    SAMPLE_FIELDS = ('pair_end', 'stranded')
+    """Columns passed to :class:`Sample` as parameters."""
+
+    def __init__(self, columns):
+        if 'name' not in columns:
+            raise ValueError(
+                "Sample sheet requires a name column, got columns {}"
+                .format(', '.join(map(str, columns)))
+            )
+        self.columns = OrderedDict(
+            (key, list(col)) for key, col in columns.items()
+        )
+        lengths = set(map(len, self.columns.values()))
+        if len(lengths) > 1:
+            raise ValueError("Sample sheet columns differ in length")
+        self._length = len(self.columns['name'])
+        self._fields = [f for f in self.SAMPLE_FIELDS if f in self.columns]
+        self._samples = [None] * self._length
+        # name column as pyarrow array of Parquet sheets, used for grouping
+        self._name_array = None
+
+    @classmethod
+    def read(cls, path):
+        """Read sheet from *path* by its suffix.
+
+        Files ending with ``.csv`` are comma separated, ``.parquet`` or
+        ``.pq`` are Parquet files which require pyarrow, otherwise they are
+        tab separated.
+        """
+        suffix = path.suffix.lower()
+        logger.info("Reading sample sheet {!s}".format(path))
+        if suffix in ('.parquet', '.pq'):
+            table = _read_parquet_table(path)
+            sheet = cls(table.to_pydict())
+            sheet._name_array = table.column('name')
+            return sheet
+        delimiter = ',' if suffix == '.csv' else '\t'
+        return cls(_read_text_columns(path, delimiter))
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._length))]
+        sample = self._samples[index]
+        if sample is None:
+            sample = self._samples[index] = self._create_sample(index)
+        return sample
+
+    def _create_sample(self, index):
+        name = self.columns['name'][index]
+        if not isinstance(name, str):
+            name = str(name)
+        kwargs = {
+            field: _sheet_value(self.columns[field][index])
+            for field in self._fields
+        }
+        return Sample(name.strip(), **kwargs)
+
+    def groups(self):
+        """Return mapping of sample name to the list of its samples.
+
+        Rows are grouped by the name column alone, the samples of a group
+        are created when the group is accessed.
+        """
+        return SampleGroups(self)
+
+    def __repr__(self):
+        return '<SampleSheet of {} samples, columns: {}>'.format(
+            self._length, ', '.join(map(str, self.columns))
+        )
+
+
+class SampleGroups(Mapping):
+    """Ordered mapping of sample name to samples of a :class:`SampleSheet`.
+
+    It is used as :attr:`JobInfo.sample_group` for sample sheets. Row
+    indices of each name are computed on creation without creating any
+    :class:`Sample`, by a pyarrow group by for string name columns of
+    Parquet sheets, otherwise in one pass over the name column.
+
+    .. versionadded:: 0.3.4
+    """
+
+    def __init__(self, sheet):
+        self.sheet = sheet
+        if sheet._name_array is not None:
+            self._rows = _group_rows_arrow(sheet._name_array)
+            if self._rows is not None:
+                return
+        self._rows = OrderedDict()
+        add_group = self._rows.setdefault
+        for row, name in enumerate(sheet.columns['name']):
+            if not isinstance(name, str):
+                name = str(name)
+            add_group(name.strip(), []).append(row)
+
+    def __getitem__(self, name):
+        sheet = self.sheet
+        return [sheet[row] for row in self._rows[name]]
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, name):
+        return name in self._rows
+
+
+def _group_rows_arrow(names):
+    """Group row indices by stripped names of a pyarrow string array.
+
+    Return None if names are not all strings.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    if not pa.types.is_string(names.type) or names.null_count:
+        return None
+    table = pa.table({
+        'name': pc.utf8_trim_whitespace(names),
+        'row': pa.array(range(len(names)), type=pa.int64()),
+    })
+    # without threads groups keep the order of their first row
+    grouped = table.group_by('name', use_threads=False).aggregate(
+        [('row', 'list')]
+    )
+    return OrderedDict(zip(
+        grouped.column('name').to_pylist(),
+        grouped.column('row_list').to_pylist(),
+    ))
+
+
+def _read_text_columns(path, delimiter):
+    with open(path, newline='') as f:
+        rows = (row for row in csv.reader(f, delimiter=delimiter) if row)
+        try:
+            header = [h.strip() for h in next(rows)]
+        except StopIteration:
+            raise ValueError("Sample sheet {!s} is empty".format(path))
+        columns = [[] for _ in header]
+        for row in rows:
+            # short rows are padded with empty cells, extra cells dropped
+            for col, value in itertools.zip_longest(
+                columns, row[:len(columns)], fillvalue=''
+            ):
+                col.append(value)
+    return OrderedDict(zip(header, columns))
+
+
+def _read_parquet_table(path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    if isinstance(path, ArchivePath):
+        source = pa.BufferReader(path.read_bytes())
+    else:
+        source = strify_path(path)
+    return pq.read_table(source)
+
+
 class JobInfo:
     """Store a job information.
 
@@ -88,23 +311,36 @@ class JobInfo:
     ----------
     id : str
     type : str
-    root_path : Path
+    root_path : Path or :class:`~ngcloud.vfs.ArchivePath`
         path to result root
-    sample_list : list
+    sample_list : list or :class:`SampleSheet`
         Lists of :class:`Sample` in this job
-    sample_group : OrderedDict
+    sample_group : OrderedDict or :class:`SampleGroups`
         Ordered mapping by grouping pair-end samples
+    source_files : list of Path or :class:`~ngcloud.vfs.ArchivePath`
+        Files the job information is read from, ``job_info.yaml`` and the
+        sample sheet if any
 
     Parameters
     ----------
     root_path : path like object
+        Job folder, or a tar or zip archive of it read by :mod:`ngcloud.vfs`.
+
+    Samples are given by *sample_list* in ``job_info.yaml``, or by
+    *sample_sheet*, a path relative to the job folder of a TSV, CSV or
+    Parquet file read by :class:`SampleSheet`.
+
+    .. versionchanged:: 0.3.4
+        Accept archived job folders and *sample_sheet*. Add
+        *source_files*.
     """
 
     def __init__(self, root_path):
-        self.root_path = Path(root_path).resolve()
+        self.root_path = job_path(root_path)
         logger.debug("Reading info from path: {!s}".format(self.root_path))
 
         self._raw = self._read_yaml()
+        self.source_files = [self.root_path / 'job_info.yaml']
         self.id = self._raw['job_id']
         self.type = self._raw['job_type']
         if 'pipe_param' not in self._raw:
@@ -115,8 +351,17 @@ class JobInfo:
         logger.debug(
             "JobInfo created (id: {0.id} type: {0.type})".format(self)
         )
-        self.sample_list = self._parse_sample_list()
-        self.sample_group = self._group_sample()
+        if 'sample_sheet' in self._raw:
+            if self._raw.get('sample_list'):
+                raise ValueError(
+                    "job_info.yaml should have either sample_list or "
+                    "sample_sheet, not both"
+                )
+            self.sample_list = self._read_sample_sheet()
+            self.sample_group = self.sample_list.groups()
+        else:
+            self.sample_list = self._parse_sample_list()
+            self.sample_group = self._group_sample()
 
     def _read_yaml(self):
         logger.info("Reading job_info.yaml")
@@ -132,6 +377,11 @@ class JobInfo:
             sample_list.append(Sample(name, **info))
         return sample_list
 
+    def _read_sample_sheet(self):
+        sheet_path = self.root_path / self._raw['sample_sheet']
+        self.source_files.append(sheet_path)
+        return SampleSheet.read(sheet_path)
+
     def _group_sample(self):
         sample_group = OrderedDict()
         for sample in self.sample_list:
@@ -0,0 +1,307 @@
+import os
+import sys
+import json
+import time
+import tracemalloc
+from array import array
+from collections import OrderedDict
+from contextlib import contextmanager
+import ngcloud as ng
+from ngcloud.spill import SpilledArray
+try:
+    import resource
+except ImportError:
+    resource = None
+
+logger = ng._create_logger(__name__)
+
+__doc__ = """\
+Measure memory used by each stage while a report is generated.
+
+When :attr:`Report.memory_profile <ngcloud.report.Report.memory_profile>`
+is set (``ngreport --memory-profile=<json>``), a :class:`MemoryProfiler`
+records every phase of each stage, that is :meth:`parse
+<ngcloud.report.Stage.ensure_parsed>`, :meth:`render
+<ngcloud.report.Stage.render>` and :meth:`copy_static
+<ngcloud.report.Stage.copy_static>`, and the size of each result_info key.
+For each phase it records:
+
+- wall time, resident set size (RSS) before and after
+- peak RSS within the phase. On Linux the peak is reset before each phase
+  through ``/proc/self/clear_refs``; where that is not allowed, the peak of
+  the whole process so far is reported and *peak_rss_scope* is
+  ``process``
+- peak of memory traced by :py:mod:`tracemalloc` and the source lines
+  allocating the most memory that is still alive after the phase
+
+Phases not belonging to a stage are recorded under stage ``Report``:
+rendering by worker processes, waiting for the static files copied in
+background, and writing the pages. The JSON file is rewritten after every
+phase, so it is left up to the last finished phase even if the process is
+killed for running out of memory. A summary table is given by
+:meth:`MemoryProfiler.format_table`.
+
+tracemalloc slows Python allocations down severalfold and its snapshots
+take memory of their own, so timings and RSS in this mode are only
+relative.
+
+.. autosummary::
+
+    MemoryProfiler
+    deep_sizeof
+
+.. versionadded:: 0.3.4
+"""
+
+_MB = 1 << 20
+
+
+def _read_proc_status():
+    """Return (VmRSS, VmHWM) in bytes from /proc, or None if unavailable."""
+    try:
+        with open('/proc/self/status') as f:
+            status = dict(
+                line.split(':', 1) for line in f if ':' in line
+            )
+        return tuple(
+            int(status[key].split()[0]) * 1024 for key in ('VmRSS', 'VmHWM')
+        )
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _reset_peak_rss():
+    """Reset the peak RSS of this process, return whether it succeeded."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _rss():
+    """Return (current RSS, peak RSS) in bytes, either may be None."""
+    status = _read_proc_status()
+    if status is not None:
+        return status
+    if resource is None:
+        return None, None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return None, peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _referents(obj):
+    """Return objects followed by :func:`deep_sizeof` from *obj*."""
+    if isinstance(obj, (str, bytes, bytearray, array, int, float)):
+        return ()
+    if isinstance(obj, dict):
+        return list(obj.keys()) + list(obj.values())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return obj
+    if any((
+        isinstance(obj, (type, SpilledArray)), callable(obj),
+        type(obj).__module__ == 'builtins',
+    )):
+        return ()
+    children = [vars(obj)] if hasattr(obj, '__dict__') else []
+    children.extend(
+        getattr(obj, slot)
+        for slot in getattr(type(obj), '__slots__', ())
+        if hasattr(obj, slot)
+    )
+    return children
+
+
+def deep_sizeof(obj):
+    """Return approximate bytes of *obj* and all objects it refers to.
+
+    Containers, arrays and attributes of plain objects are followed, each
+    object is counted once. Classes, functions and modules are not
+    followed. A :class:`~ngcloud.spill.SpilledArray` counts only its
+    object, since its content stays on disk.
+    """
+    visited = set()
+    total = 0
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in visited:
+            continue
+        visited.add(id(obj))
+        total += sys.getsizeof(obj)
+        stack.extend(_referents(obj))
+    return total
+
+
+class MemoryProfiler:
+    """Record memory used by phases of report stages.
+
+    Parameters
+    ----------
+    path : path-like object, optional
+        JSON file rewritten by :meth:`write_json` after each phase.
+    trace : bool
+        Trace Python allocations by :py:mod:`tracemalloc`.
+    top : int
+        Number of top allocating source lines kept for each phase.
+
+    Examples
+    --------
+
+        >>> profiler = MemoryProfiler('memory.json')
+        >>> profiler.start()
+        >>> with profiler.phase(stage, 'parse'):
+        ...     stage.ensure_parsed()
+        >>> profiler.record_result_info(stage)
+        >>> profiler.stop()
+        >>> print(profiler.format_table())
+
+    """
+
+    def __init__(self, path=None, trace=True, top=10):
+        self.path = path
+        self.trace = trace
+        self.top = top
+        self.phases = []
+        self.result_info = OrderedDict()
+        self._started_tracing = False
+
+    def start(self):
+        """Start tracing allocations if :attr:`trace`."""
+        if self.trace and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def stop(self):
+        """Stop tracing allocations started by :meth:`start`."""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def _snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<unknown>'),
+        ])
+
+    @contextmanager
+    def phase(self, stage, name):
+        """Record the block as phase *name* of *stage*.
+
+        *stage* is a stage object, or None for the report itself.
+        """
+        stage_name = 'Report' if stage is None else type(stage).__name__
+        tracing = self.trace and tracemalloc.is_tracing()
+        before = self._snapshot() if tracing else None
+        if tracing and hasattr(tracemalloc, 'reset_peak'):
+            # Python 3.9+, otherwise the peak since tracing started
+            tracemalloc.reset_peak()
+        peak_reset = _reset_peak_rss()
+        rss_before, _ = _rss()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            rss_after, peak_rss = _rss()
+            record = OrderedDict([
+                ('stage', stage_name),
+                ('phase', name),
+                ('seconds', elapsed),
+                ('rss_before', rss_before),
+                ('rss_after', rss_after),
+                ('peak_rss', peak_rss),
+                ('peak_rss_scope', 'phase' if peak_reset else 'process'),
+            ])
+            if tracing:
+                _, traced_peak = tracemalloc.get_traced_memory()
+                stats = self._snapshot().compare_to(before, 'lineno')
+                record['traced_peak'] = traced_peak
+                record['traced_diff'] = sum(s.size_diff for s in stats)
+                record['top_allocations'] = [
+                    OrderedDict([
+                        ('file', s.traceback[0].filename),
+                        ('line', s.traceback[0].lineno),
+                        ('size_diff', s.size_diff),
+                        ('count_diff', s.count_diff),
+                    ])
+                    for s in stats[:self.top] if s.size_diff > 0
+                ]
+            self.phases.append(record)
+            if self.path is not None:
+                self.write_json(self.path)
+            logger.debug(
+                "%s %s took %.2fs, peak RSS %s", stage_name, name, elapsed,
+                peak_rss
+            )
+
+    def record_result_info(self, stage):
+        """Record :func:`deep_sizeof` of each key of stage's result_info."""
+        self.result_info[type(stage).__name__] = OrderedDict(
+            (key, deep_sizeof(value))
+            for key, value in stage.result_info.items()
+        )
+
+    def as_dict(self):
+        return OrderedDict([
+            ('pid', os.getpid()),
+            ('tracemalloc', self.trace),
+            ('phases', self.phases),
+            ('result_info', self.result_info),
+        ])
+
+    def write_json(self, path=None):
+        """Write recorded phases and result_info sizes as JSON to *path*,
+        default :attr:`path`."""
+        with open(self.path if path is None else path, 'w') as f:
+            json.dump(self.as_dict(), f, indent=2)
+
+    def format_table(self, n_keys=10):
+        """Return recorded phases and the *n_keys* largest result_info keys
+        as plain text tables, sizes in MB."""
+        def mb(n_bytes):
+            return '-' if n_bytes is None else '{:.1f}'.format(n_bytes / _MB)
+
+        lines = [
+            '{:<20s} {:<12s} {:>8s} {:>10s} {:>10s} {:>12s}  {}'.format(
+                'Stage', 'Phase', 'Time (s)', 'Peak RSS', 'RSS diff',
+                'Traced peak', 'Top allocation'
+            )
+        ]
+        for rec in self.phases:
+            rss_diff = None
+            if rec['rss_before'] is not None and rec['rss_after'] is not None:
+                rss_diff = rec['rss_after'] - rec['rss_before']
+            top = rec.get('top_allocations')
+            lines.append(
+                '{:<20s} {:<12s} {:>8.2f} {:>10s} {:>10s} {:>12s}  {}'.format(
+                    rec['stage'], rec['phase'], rec['seconds'],
+                    mb(rec['peak_rss']), mb(rss_diff),
+                    mb(rec.get('traced_peak')),
+                    '{} MB at {}:{}'.format(
+                        mb(top[0]['size_diff']),
+                        os.path.basename(top[0]['file']), top[0]['line']
+                    ) if top else '-'
+                )
+            )
+        key_sizes = sorted(
+            (
+                (size, stage_name, key)
+                for stage_name, sizes in self.result_info.items()
+                for key, size in sizes.items()
+            ),
+            reverse=True
+        )[:n_keys]
+        if key_sizes:
+            lines.extend(['', '{:<20s} {:<24s} {:>10s}'.format(
+                'Stage', 'result_info key', 'Size'
+            )])
+            lines.extend(
+                '{:<20s} {:<24s} {:>10s}'.format(stage_name, key, mb(size))
+                for size, stage_name, key in key_sizes
+            )
+        return '\n'.join(lines)
@@ -0,0 +1,257 @@
+import shutil
+import pickle
+from pathlib import Path
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import ngcloud as ng
+from ngcloud.info import JobInfo
+from ngcloud.report import SummaryStage, _cwd_on_sys_path
+from ngcloud.preflight import check_inputs
+from ngcloud.pipe import get_shared_template_root
+from ngcloud.util import open, merged_copytree, process_pool_context
+from ngcloud.export import (
+    flatten_result_info, _sample_names, _has_list_index
+)
+
+logger = ng._create_logger(__name__)
+
+__doc__ = """\
+Comparative report over several jobs of the same pipeline.
+
+For example, replicates sequenced on different lanes are run as separate
+jobs. :class:`MultiJobReport` loads their job info and parses their stages
+concurrently, then merges stage results by sample into one report with a
+table per stage, where each row is a metric of a sample and each column a
+job. Run it by ``ngreport --compare <job_dir> <job_dir> ...``. Job info
+is loaded on threads, while stages are parsed on a process pool, one task
+per job.
+
+The report has a single page, :file:`multi_job.html`, with the static
+files of the pipeline. Pages of each stage are not rendered; generate the
+report of each job for them.
+
+.. autosummary::
+
+    MultiJobReport
+    MultiJobStage
+    merge_stage_results
+"""
+
+
+def merge_stage_results(reports):
+    """Merge metrics of parsed reports by stage and sample.
+
+    Metrics are flattened like :func:`ngcloud.export.flatten_result_info`.
+    Metrics of list positions, e.g. ``over_seq.3.count``, are skipped.
+
+    Parameters
+    ----------
+    reports : list of :class:`~ngcloud.report.Report` object
+        Reports of the same pipeline being parsed.
+
+    Returns
+    -------
+    OrderedDict of stage class name to list of (sample, metric, values)
+    sorted by sample and metric, where *values* are in the order of
+    *reports* and None if missing in that job. Sample is None for job-wide
+    metrics.
+    """
+    merged = OrderedDict()
+    for i, report in enumerate(reports):
+        sample_names = _sample_names(report.job_info)
+        for stage in report._stages:
+            if isinstance(stage, SummaryStage):
+                continue
+            rows = merged.setdefault(type(stage).__name__, dict())
+            for sample, metric, value in flatten_result_info(
+                    stage.result_info, sample_names):
+                if _has_list_index(metric):
+                    continue
+                values = rows.setdefault(
+                    (sample, metric), [None] * len(reports)
+                )
+                values[i] = value
+    return OrderedDict(
+        (stage_name, [
+            (sample, metric, values)
+            for (sample, metric), values in sorted(
+                rows.items(), key=lambda kv: (kv[0][0] or '', kv[0][1])
+            )
+        ])
+        for stage_name, rows in merged.items()
+    )
+
+
+class MultiJobStage(SummaryStage):
+    """Page comparing stage results across jobs.
+
+    Its result_info has keys *jobs*, list of (label, :class:`JobInfo
+    <ngcloud.info.JobInfo>`) and *stage_tables* from
+    :func:`merge_stage_results`.
+    """
+    template_find_paths = [get_shared_template_root()]
+    template_entrances = 'multi_job.html'
+    result_foldername = ''
+
+    def __init__(self, reports, labels, report_root):
+        self.reports = reports
+        self.labels = labels
+        super().__init__(reports[0].job_info, report_root)
+
+    def _locate_result_folder(self):
+        return self.job_info.root_path
+
+    def parse(self):
+        self.result_info['jobs'] = [
+            (label, report.job_info)
+            for label, report in zip(self.labels, self.reports)
+        ]
+        self.result_info['stage_tables'] = merge_stage_results(self.reports)
+
+
+def _parse_job_stages(snapshot):
+    """Parse pickled stages of a job and return them, run in worker
+    processes."""
+    # stage classes may live in modules found under current folder
+    with _cwd_on_sys_path():
+        stages = pickle.loads(snapshot)
+    for stage in stages:
+        stage.ensure_parsed()
+    return stages
+
+
+class MultiJobReport:
+    """Generate one comparative report over several jobs.
+
+    The report is the single page :file:`multi_job.html` comparing stage
+    metrics with the static files it needs. Pages of each stage, as in
+    the report of a single job, are not rendered; generate the report of
+    each job for them.
+
+    Parameters
+    ----------
+    PipeReport : subclass of :class:`~ngcloud.report.Report`
+        Report class of the pipeline all jobs ran.
+    max_workers : int, optional
+        Number of jobs being loaded and parsed at the same time, default
+        number of CPUs.
+
+    Examples
+    --------
+
+        >>> from ngcloud.pipe.tuxedo import TuxedoReport
+        >>> MultiJobReport(TuxedoReport).generate(
+        ...     ['job_lane1', 'job_lane2'], 'output')
+
+    .. versionadded:: 0.3.4
+    """
+
+    def __init__(self, PipeReport, max_workers=None):
+        self.PipeReport = PipeReport
+        self.max_workers = max_workers
+
+    def generate(self, job_dirs, out_dir):
+        """Parse all jobs and write the report under *out_dir*.
+
+        The report root is :file:`report_multi_<id1>_<id2>...`. Only the
+        comparison page :file:`multi_job.html` is rendered, not the pages
+        of each stage.
+        """
+        out_dir = Path(out_dir)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            job_infos = list(executor.map(JobInfo, job_dirs))
+            job_types = {job_info.type for job_info in job_infos}
+            if len(job_types) > 1:
+                logger.warning(
+                    "Comparing jobs of different types {!r}"
+                    .format(sorted(job_types))
+                )
+            self.labels = self._job_labels(job_infos)
+            self.report_root = out_dir / 'report_multi_{}'.format(
+                '_'.join(self.labels)
+            )
+
+            self.reports = []
+            for job_info in job_infos:
+                report = self.PipeReport()
+                report.job_info = job_info
+                report.out_dir = out_dir
+                report.report_root = self.report_root
+                report.create_stages()
+                self.reports.append(report)
+            if self.PipeReport.preflight:
+                check_inputs(
+                    [stage for report in self.reports
+                     for stage in report._stages]
+                )
+        self._parse_reports()
+
+        if self.report_root.exists():
+            logger.warning(
+                "Report root {!s} has already existed! Overwriting..."
+                .format(self.report_root)
+            )
+            shutil.rmtree(self.report_root.as_posix())
+        self.report_root.mkdir(parents=True)
+
+        stage = MultiJobStage(self.reports, self.labels, self.report_root)
+        for name, content in stage.render().items():
+            with open(self.report_root / name, 'w') as f:
+                f.write(content)
+        merged_copytree(
+            self.reports[0]._static_root_list(), self.report_root / 'static'
+        )
+
+    def _parse_reports(self):
+        """Parse each job in its own process, stages of a job in order.
+
+        Jobs whose stages cannot be pickled or parsed by a worker are
+        parsed in the current process.
+        """
+        logger.info("Parse {} jobs".format(len(self.reports)))
+        # never fork, parsing is CPU bound and threads won't run in parallel
+        with ProcessPoolExecutor(
+            max_workers=self.max_workers, mp_context=process_pool_context()
+        ) as executor:
+            futures = []
+            for report in self.reports:
+                try:
+                    snapshot = pickle.dumps(
+                        report._stages, protocol=pickle.HIGHEST_PROTOCOL
+                    )
+                except Exception as e:
+                    logger.debug(
+                        "Stages cannot be pickled, parse in place: %r", e
+                    )
+                    futures.append(None)
+                else:
+                    futures.append(
+                        executor.submit(_parse_job_stages, snapshot)
+                    )
+            for report, future in zip(self.reports, futures):
+                try:
+                    if future is not None:
+                        report._stages = future.result()
+                        continue
+                except Exception as e:
+                    logger.warning(
+                        "Parsing job %s by worker caught error %r, "
+                        "parse in place", report.job_info.id, e
+                    )
+                report.parse()
+
+    @staticmethod
+    def _job_labels(job_infos):
+        labels = [str(job_info.id) for job_info in job_infos]
+        if len(set(labels)) < len(labels):
+            # same job ID in different folders, tell them by folder name
+            labels = [
+                '{}-{}'.format(job_info.id, job_info.root_path.name)
+                for job_info in job_infos
+            ]
+        if len(set(labels)) < len(labels):
+            # e.g. a job folder and its archive, tell them by position
+            labels = [
+                '{}-{}'.format(label, i) for i, label in enumerate(labels, 1)
+            ]
+        return labels
@@ -2,6 +2,57 @@ from pathlib import Path
 
 _here = Path(__file__).parent
 
+ENTRY_POINT_GROUP = 'ngcloud.pipes'
+"""Entry point group where packages register their pipelines.
+
+For example in :file:`setup.py` of an external pipeline package,
+::
+
+    setup(
+        ...
+        entry_points={
+            'ngcloud.pipes': ['mypipe = mypkg.report:MyReport'],
+        },
+    )
+
+then ``ngreport -p mypipe`` uses it. The report class is imported only when
+the pipeline is selected.
+"""
+
+_registered_pipes = None
+
+
+def registered_pipes():
+    """Return dict of pipeline name to its report class target.
+
+    Targets are strings like ``'mypkg.report:MyReport'`` read from
+    :data:`ENTRY_POINT_GROUP` entry points of installed packages. Nothing
+    is imported. The result is cached after the first call.
+
+    .. versionadded:: 0.3.4
+    """
+    global _registered_pipes
+    if _registered_pipes is None:
+        _registered_pipes = dict(_iter_entry_points(ENTRY_POINT_GROUP))
+    return dict(_registered_pipes)
+
+
+def _iter_entry_points(group):
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        import pkg_resources
+        for ep in pkg_resources.iter_entry_points(group):
+            yield ep.name, '{}:{}'.format(ep.module_name, '.'.join(ep.attrs))
+        return
+    eps = entry_points()
+    if hasattr(eps, 'select'):
+        eps = eps.select(group=group)
+    else:
+        eps = eps.get(group, [])
+    for ep in eps:
+        yield ep.name, ep.value
+
 def _get_builtin_report_root():
     return _here / 'report'
 
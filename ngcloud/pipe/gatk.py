@@ -0,0 +1,360 @@
+import io
+import re
+import gzip
+import contextlib
+from bisect import bisect_right
+from itertools import islice
+from collections import OrderedDict, Counter
+import ngcloud as ng
+from ngcloud.report import SummaryStage, Stage, Report
+from ngcloud.pipe import (
+    _get_builtin_report_root,
+    get_shared_template_root, get_shared_static_root
+)
+from ngcloud.util import discover_file_by_patterns, _source_path
+from ngcloud.bam import read_bam_stats
+
+logger = ng._create_logger(__name__)
+_find_paths = [
+    _get_builtin_report_root() / 'gatk' / 'templates',
+    get_shared_template_root(),
+]
+
+__doc__ = """\
+Built-in report templates for GATK variant calling pipeline.
+
+Class created for the pipeline
+------------------------------
+.. autosummary::
+    :nosignatures:
+
+    GATKReport
+    IndexStage
+    AlignStage
+    VariantStage
+
+Result folder structure
+-----------------------
+
+.. code::
+
+    <Report.job_info.root_path>
+    ├── align/
+    │   └── *.bam or <sample>/*.bam # Aligned reads
+    ├── gatk/
+    │   └── *.vcf or *.vcf.gz       # Called variants, plain or bgzipped
+
+Miscellaneous:
+
+- :class:`GATKBaseStage`
+- :class:`VCFStats`
+- :func:`read_vcf_stats`
+
+"""
+
+_TRANSITIONS = {('A', 'G'), ('G', 'A'), ('C', 'T'), ('T', 'C')}
+_BASES = set('ACGT')
+_search_dp = re.compile(r'(?:^|;)DP=(\d+)').search
+_split_gt = re.compile(r'[/|]').split
+
+
+def _info_dp(info):
+    """Return the DP value of an INFO column as str, None if not found."""
+    match = _search_dp(info)
+    return match.group(1) if match else None
+
+
+def _genotype_class(gt):
+    """Classify a GT value as hom_ref, het, hom_alt or missing."""
+    alleles = _split_gt(gt)
+    if '.' in alleles or not gt:
+        return 'missing'
+    if len(set(alleles)) > 1:
+        return 'het'
+    return 'hom_ref' if alleles[0] == '0' else 'hom_alt'
+
+
+def _histogram_labels(edges):
+    return [
+        '{}-{}'.format(lo, hi) for lo, hi in zip(edges, edges[1:])
+    ] + ['{}+'.format(edges[-1])]
+
+
+class VCFStats:
+    """Statistics of VCF records updated chunk by chunk.
+
+    Each chunk of record lines is aggregated by :class:`collections.Counter`
+    over its columns first, then classified per distinct key, so the
+    per-record work is only splitting the line. Memory depends on the
+    number of chromosomes and samples, not the number of records.
+
+    Parameters
+    ----------
+    samples : list of str
+        Sample names of the VCF header.
+
+    Attributes
+    ----------
+    n_records : int
+    n_snv, n_indel, n_other : int
+        Counts of alternative alleles by variant type, multi-allelic records
+        count once per allele.
+    n_transition, n_transversion : int
+    chrom_counts : :class:`collections.Counter`
+        Records per chromosome in the order of appearance.
+    filter_counts : :class:`collections.Counter`
+        Records per FILTER value.
+    genotypes : dict of sample to :class:`collections.Counter`
+        Counts of *hom_ref*, *het*, *hom_alt* and *missing* genotypes.
+    qual_hist, dp_hist : list of int
+        Counts of QUAL and INFO DP values binned by :attr:`QUAL_BINS`
+        and :attr:`DP_BINS`.
+
+    .. versionadded:: 0.3.4
+    """
+
+    QUAL_BINS = [0, 10, 20, 30, 50, 100, 200, 500, 1000]
+    """Lower edges of QUAL bins, the last bin has no upper bound."""
+
+    DP_BINS = [0, 5, 10, 20, 30, 50, 100, 200, 500]
+    """Lower edges of INFO DP bins, the last bin has no upper bound."""
+
+    def __init__(self, samples=()):
+        self.samples = list(samples)
+        self.n_records = 0
+        self.n_snv = self.n_indel = self.n_other = 0
+        self.n_transition = self.n_transversion = 0
+        self.n_no_qual = self.n_no_dp = 0
+        self.chrom_counts = Counter()
+        self.filter_counts = Counter()
+        self.genotypes = OrderedDict((s, Counter()) for s in self.samples)
+        self.qual_hist = [0] * len(self.QUAL_BINS)
+        self.dp_hist = [0] * len(self.DP_BINS)
+
+    def update(self, lines):
+        """Add a chunk of VCF record lines."""
+        rows = [line.rstrip('\n').split('\t') for line in lines]
+        self.n_records += len(rows)
+        self.chrom_counts.update(row[0] for row in rows)
+        self.filter_counts.update(row[6] for row in rows)
+
+        for (ref, alts), n in Counter(
+                (row[3].upper(), row[4].upper()) for row in rows).items():
+            for alt in alts.split(','):
+                self._count_allele(ref, alt, n)
+
+        for qual, n in Counter(row[5] for row in rows).items():
+            try:
+                q = float(qual)
+            except ValueError:
+                self.n_no_qual += n
+                continue
+            self.qual_hist[max(bisect_right(self.QUAL_BINS, q) - 1, 0)] += n
+
+        for dp, n in Counter(_info_dp(row[7]) for row in rows).items():
+            if dp is None:
+                self.n_no_dp += n
+                continue
+            self.dp_hist[bisect_right(self.DP_BINS, int(dp)) - 1] += n
+
+        if self.samples:
+            gt_counts = Counter(
+                (i, col.split(':', 1)[0])
+                for row in rows
+                for i, col in enumerate(row[9:9 + len(self.samples)])
+            )
+            for (i, gt), n in gt_counts.items():
+                self.genotypes[self.samples[i]][_genotype_class(gt)] += n
+
+    def _count_allele(self, ref, alt, n):
+        if alt in ('.', '*') or alt.startswith('<'):
+            self.n_other += n
+        elif len(ref) == 1 and len(alt) == 1:
+            if ref in _BASES and alt in _BASES:
+                self.n_snv += n
+                if (ref, alt) in _TRANSITIONS:
+                    self.n_transition += n
+                else:
+                    self.n_transversion += n
+            else:
+                self.n_other += n
+        elif len(ref) != len(alt):
+            self.n_indel += n
+        else:
+            self.n_other += n
+
+    @property
+    def titv(self):
+        """Transition/transversion ratio, None if no transversion."""
+        if not self.n_transversion:
+            return None
+        return self.n_transition / self.n_transversion
+
+    def as_dict(self):
+        """Return the statistics as a dict of plain values."""
+        return OrderedDict([
+            ('n_records', self.n_records),
+            ('n_snv', self.n_snv),
+            ('n_indel', self.n_indel),
+            ('n_other', self.n_other),
+            ('n_transition', self.n_transition),
+            ('n_transversion', self.n_transversion),
+            ('titv', self.titv),
+            ('chrom_counts', OrderedDict(self.chrom_counts)),
+            ('filter_counts', OrderedDict(self.filter_counts)),
+            ('genotypes', OrderedDict(
+                (sample, OrderedDict(
+                    (k, counts[k])
+                    for k in ['hom_ref', 'het', 'hom_alt', 'missing']
+                ))
+                for sample, counts in self.genotypes.items()
+            )),
+            ('qual_hist', OrderedDict(
+                zip(_histogram_labels(self.QUAL_BINS), self.qual_hist)
+            )),
+            ('n_no_qual', self.n_no_qual),
+            ('dp_hist', OrderedDict(
+                zip(_histogram_labels(self.DP_BINS), self.dp_hist)
+            )),
+            ('n_no_dp', self.n_no_dp),
+        ])
+
+
+@contextlib.contextmanager
+def _open_vcf(path):
+    path = _source_path(path)
+    with path.open('rb') as raw:
+        if path.name.endswith(('.gz', '.bgz')):
+            # BGZF is a series of gzip members, readable by gzip as a stream
+            with gzip.open(raw, 'rt') as f:
+                yield f
+        else:
+            with io.TextIOWrapper(raw) as f:
+                yield f
+
+
+def read_vcf_stats(path, chunk_size=50000):
+    """Stream a plain or bgzipped VCF file and return its :class:`VCFStats`.
+
+    Records are read *chunk_size* lines at a time, so memory stays flat
+    however large the file is.
+
+    Parameters
+    ----------
+    path : path-like object
+    chunk_size : int
+        Number of records aggregated at a time.
+
+    .. versionadded:: 0.3.4
+    """
+    with _open_vcf(path) as f:
+        samples = []
+        for line in f:
+            if line.startswith('#CHROM'):
+                samples = line.rstrip('\n').split('\t')[9:]
+                break
+            if not line.startswith('#'):
+                raise ValueError(
+                    "No #CHROM header line found in VCF {!s}".format(path)
+                )
+        stats = VCFStats(samples)
+        while True:
+            chunk = list(islice(f, chunk_size))
+            if not chunk:
+                break
+            stats.update(line for line in chunk if line.strip())
+    logger.info(
+        "Read {} records of {} samples from {!s}"
+        .format(stats.n_records, len(samples), path)
+    )
+    return stats
+
+
+class GATKBaseStage(Stage):
+    template_find_paths = _find_paths
+
+    def parse(self):
+        self.result_info['stage_mapping'] = [
+            ('summary', 'index.html', 'Summary'),
+            ('align', 'align.html', 'Alignment'),
+            ('variant', 'variant.html', 'Variant Calling'),
+        ]
+
+
+class IndexStage(SummaryStage, GATKBaseStage):
+    """Index page for GATK pipeline"""
+    template_entrances = 'index.html'
+
+
+class AlignStage(GATKBaseStage):
+    """Alignment page for GATK pipeline read from BAM files.
+
+    Each BAM file under the result folder, such as
+    :file:`<sample>/accepted_hits.bam`, is read by
+    :func:`~ngcloud.bam.read_bam_stats`. Key **bam_stats** of result_info
+    maps paths relative to the result folder to
+    :meth:`BamStats.as_dict <ngcloud.bam.BamStats.as_dict>`.
+    """
+    template_entrances = 'align.html'
+    result_foldername = 'align'
+    parse_inputs = ['*.bam', '*/*.bam']
+    parse_options = ['bam_max_blocks']
+
+    bam_workers = None
+    """Number of processes reading each BAM, default number of CPUs."""
+
+    bam_max_blocks = None
+    """Only read the first BGZF blocks of each BAM for a quick preview."""
+
+    def parse(self):
+        super().parse()
+        bam_paths = sorted(
+            discover_file_by_patterns(self.result_root, self.parse_inputs)
+        )
+        if not bam_paths:
+            logger.warning(
+                "No BAM file found under {!s}".format(self.result_root)
+            )
+        self.result_info['bam_stats'] = OrderedDict(
+            (pth.relative_to(self.result_root).as_posix(), read_bam_stats(
+                pth, workers=self.bam_workers,
+                max_blocks=self.bam_max_blocks
+            ).as_dict())
+            for pth in bam_paths
+        )
+
+
+class VariantStage(GATKBaseStage):
+    """Variant page for GATK pipeline from called VCF files.
+
+    Each VCF file under the result folder is summarized by
+    :func:`read_vcf_stats`. Key **vcf_stats** of result_info maps file
+    names to :meth:`VCFStats.as_dict`.
+    """
+    template_entrances = 'variant.html'
+    result_foldername = 'gatk'
+    parse_inputs = ['*.vcf', '*.vcf.gz']
+
+    chunk_size = 50000
+    """Number of VCF records aggregated at a time."""
+
+    def parse(self):
+        super().parse()
+        vcf_paths = sorted(
+            discover_file_by_patterns(self.result_root, self.parse_inputs)
+        )
+        if not vcf_paths:
+            logger.warning(
+                "No VCF file found under {!s}".format(self.result_root)
+            )
+        self.result_info['vcf_stats'] = OrderedDict(
+            (pth.name, read_vcf_stats(pth, self.chunk_size).as_dict())
+            for pth in vcf_paths
+        )
+
+
+class GATKReport(Report):
+    """NGCloud report class of GATK pipeline."""
+
+    stage_classnames = [IndexStage, AlignStage, VariantStage]
+    static_roots = [get_shared_static_root()]
@@ -1,16 +1,23 @@
+import io
 import re
+import csv
+import json
+import math
+from array import array
 from pathlib import Path
-from collections import OrderedDict
+from collections import OrderedDict, namedtuple
+from collections.abc import Mapping
 import decimal
 D = decimal.Decimal
-import statistics as stats  # TODO: 3.3 compatiblity
 import ngcloud as ng
 from ngcloud.report import SummaryStage, Stage, Report
 from ngcloud.pipe import (
     _get_builtin_report_root,
     get_shared_template_root, get_shared_static_root
 )
-from ngcloud.util import open
+from ngcloud.util import (
+    open, ZipMember, discover_zip_members, _open_zipfile
+)
 
 logger = ng._create_logger(__name__)
 _here = Path(__file__).parent
@@ -31,6 +38,7 @@ Class created for the pipeline
     IndexStage
     QCStage
     TophatStage
+    CuffdiffStage
 
 Result folder structure
 -----------------------
@@ -59,25 +67,109 @@ Miscellaneous:
 
 - :class:`TuxedoBaseStage`
 - :class:`OverSeq`
+- :class:`AlignTable`
+- :func:`parse_align_summary`
+- :class:`DiffGene`
+- :func:`read_gene_exp_diff`
 
 """
 
 # According to the threads on Tuxedo Tools User Group,
 # We read the alignment status from aling_summary.txt
 # https://groups.google.com/d/msg/tuxedo-tools-users/s_oQRTwCuXA/_0PL4thE8OYJ
+_ALIGN_SECTION = {
+    'Left reads:': 'left',
+    'Right reads:': 'right',
+    'Reads:': 'left',           # single-end
+}
+_ALIGN_FIELD = {
+    'Input': 'input',
+    'Mapped': 'map',
+}
+
+
+def parse_align_summary(lines):
+    """Parse Tophat's align_summary.txt line by line.
+
+    Supported layouts are single-end (one ``Reads:`` section), pair-end
+    (``Left reads:`` and ``Right reads:`` followed by ``Aligned pairs:``),
+    and Tophat 2.1+ which prefixes the discordant line with ``and:``.
+    Counters of single-end reads are stored under *left_* keys.
+
+    Parameters
+    ----------
+    lines : iterable of str
+        Usually the opened file object of align_summary.txt.
+
+    Returns
+    -------
+    :class:`!dict` object mapping counter names in
+    :attr:`AlignTable.COLUMNS` to int. Only counters found are included.
+
+    Examples
+    --------
+
+        >>> with open('align_summary.txt') as f:
+        ...     parse_align_summary(f)
+        {'left_input': 48256786, 'left_map': 26884051, ...}
+
+    """
+    info = dict()
+    section = None
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if line in _ALIGN_SECTION:
+            section = _ALIGN_SECTION[line]
+            continue
+        if line.startswith('Aligned pairs:'):
+            section = 'align'
+            info['align_pair'] = int(line[14:])
+            continue
+        key, sep, value = line.partition(':')
+        if not sep:
+            # "4680778 (24.9%) are discordant alignments" of Tophat < 2.1
+            if line.endswith('are discordant alignments'):
+                info['align_discord'] = int(line.split(None, 1)[0])
+            continue
+        _parse_align_field(info, section, key.strip(), value)
+    return info
+
+
+def _parse_align_field(info, section, key, value):
+    """Store counters of a ``key: value`` line of align_summary.txt."""
+    if key in _ALIGN_FIELD and section is not None:
+        info[section + '_' + _ALIGN_FIELD[key]] = int(value.split()[0])
+    elif key == 'of these' and section == 'align':
+        info['align_multi'] = int(value.split(None, 1)[0])
+    elif key == 'of these' and section is not None:
+        # "600784 ( 2.2%) have multiple alignments (697919 have >1)"
+        info[section + '_multimap'] = int(value.split(None, 1)[0])
+        if 'have >' in value:
+            info[section + '_multicount'] = int(
+                value.rpartition('(')[2].split(None, 1)[0]
+            )
+    elif key == 'and':
+        info['align_discord'] = int(value.split(None, 1)[0])
+
+
+# Previous regex based extraction, used as a fallback when
+# the line parser cannot find required counters of a file
 _align_txt_left = (
     r"Left reads:\n"
     r"\s*Input\s*:\s*(?P<left_input>\d+)\n"
     r"\s*Mapped\s*:\s*(?P<left_map>\d+) \([ 0-9.%]* of input\)\n"
     r"\s*of these:\s*(?P<left_multimap>\d+) \([ 0-9.%]*\) "
-    r"have multiple alignments \((?P<left_multicount>\d+) have >1\)\n"
+    r"have multiple alignments \((?P<left_multicount>\d+) have >\d+\)\n"
 )
 _align_txt_right = _align_txt_left.replace(
     'Left', 'Right').replace('left', 'right')
 _align_txt_aligned = (
     r"\s*Aligned pairs:\s*(?P<align_pair>\d+)\n"
     r"\s*of these:\s*(?P<align_multi>\d+) \([ 0-9.%]*\) .*\n"
-    r"\s*(?P<align_discord>\d+) \([ 0-9.%]*\) are discordant alignments\n"
+    r"\s*(?:and:\s*)?(?P<align_discord>\d+) \([ 0-9.%]*\) "
+    r"are discordant alignments\n"
 )
 _extract_separate = re.compile(
     _align_txt_left + _align_txt_right, re.MULTILINE
@@ -86,6 +178,151 @@ _extract_align = re.compile(
     _align_txt_aligned, re.MULTILINE
 ).search
 
+_DIFF_NUMERIC = [
+    'value_1', 'value_2', 'log2_fold_change', 'p_value', 'q_value'
+]
+
+DiffGene = namedtuple('DiffGene', [
+    'test_id', 'gene', 'locus', 'sample_1', 'sample_2', 'status',
+    'value_1', 'value_2', 'log2_fold_change', 'p_value', 'q_value',
+    'significant',
+])
+
+
+def read_gene_exp_diff(diff_path):
+    """Read Cuffdiff's gene_exp.diff in one streaming pass.
+
+    Only the columns needed by the report are kept, numeric columns are
+    converted to float (Cuffdiff writes ``inf``, ``-inf`` and ``nan`` for
+    untestable genes, which float() accepts as is).
+
+    Parameters
+    ----------
+    diff_path : path-like object
+
+    Returns
+    -------
+    List of :class:`DiffGene` in file order.
+    """
+    genes = []
+    with open(diff_path, newline='') as diff_f:
+        reader = csv.reader(diff_f, delimiter='\t')
+        header = next(reader)
+        col = {name: i for i, name in enumerate(header)}
+        col['log2_fold_change'] = col['log2(fold_change)']
+        i_test_id, i_gene = col['test_id'], col['gene']
+        i_locus, i_status = col['locus'], col['status']
+        i_s1, i_s2 = col['sample_1'], col['sample_2']
+        i_nums = [col[name] for name in _DIFF_NUMERIC]
+        i_sig = col['significant']
+        for row in reader:
+            genes.append(DiffGene(
+                row[i_test_id], row[i_gene], row[i_locus],
+                row[i_s1], row[i_s2], row[i_status],
+                *[float(row[i]) for i in i_nums],
+                significant=row[i_sig] == 'yes'
+            ))
+    return genes
+
+
+def _sort_key_q_value(gene):
+    # NaN compares false with everything, push them to the end
+    q = gene.q_value
+    return (math.isnan(q), q, gene.p_value)
+
+
+def _sort_key_fold_change(gene):
+    fc = abs(gene.log2_fold_change)
+    return (math.isnan(fc), -fc)
+
+
+def _finite_or_none(value):
+    return value if math.isfinite(value) else None
+
+
+class AlignTable(Mapping):
+    """Column-oriented table of Tophat alignment counters.
+
+    Every counter in :attr:`COLUMNS` is stored as a typed
+    :py:class:`array.array` of unsigned 64-bit integers with one element per
+    sample group, so rates over thousands of groups are computed column-wise
+    on plain integers and floats.
+
+    Single-end groups are recorded in :attr:`paired` as 0 and their
+    right read and pair counters are ``None`` when accessed by group.
+
+    The table is also a read-only mapping from group name to a dict of its
+    counters, which is how templates iterate over it::
+
+        {% for group, info in detail_info.items() %}
+            {{ humanfmt(info.left_input) }}
+        {% endfor %}
+
+    Examples
+    --------
+
+        >>> table = AlignTable()
+        >>> table.append('5566', {'left_input': 100, 'left_map': 80, ...})
+        >>> table['5566']['left_map']
+        80
+        >>> table.ratio('left_map', 'left_input')
+        array('d', [0.8])
+
+    """
+
+    COLUMNS = [
+        'left_input', 'left_map', 'left_multimap', 'left_multicount',
+        'right_input', 'right_map', 'right_multimap', 'right_multicount',
+        'align_pair', 'align_multi', 'align_discord',
+    ]
+
+    PAIR_ONLY = [
+        name for name in COLUMNS if name.startswith(('right_', 'align_'))
+    ]
+
+    def __init__(self):
+        self.groups = []
+        self._row_of = dict()
+        self.paired = array('B')
+        self.columns = OrderedDict(
+            (name, array('Q')) for name in self.COLUMNS
+        )
+
+    def append(self, group, counts):
+        """Append counters of a sample group as a new row.
+
+        Group is pair-end if *counts* contains ``right_input``.
+        Missing counters are stored as 0.
+        """
+        self._row_of[group] = len(self.groups)
+        self.groups.append(group)
+        self.paired.append('right_input' in counts)
+        for name, column in self.columns.items():
+            column.append(counts.get(name, 0))
+
+    def ratio(self, numer, denom):
+        """Return column *numer* divided by column *denom* for all groups."""
+        return array('d', [
+            n / d if d else 0.0
+            for n, d in zip(self.columns[numer], self.columns[denom])
+        ])
+
+    def __getitem__(self, group):
+        i = self._row_of[group]
+        row = OrderedDict(
+            (name, column[i]) for name, column in self.columns.items()
+        )
+        if not self.paired[i]:
+            row.update(dict.fromkeys(self.PAIR_ONLY))
+        return row
+
+    def __iter__(self):
+        return iter(self.groups)
+
+    def __len__(self):
+        return len(self.groups)
+
+
 class OverSeq:
     def __init__(self, seq, count, percentage, possible_source):
         self.seq = seq
@@ -102,6 +339,8 @@ class TuxedoBaseStage(Stage):
             ('qc', 'qc.html', 'Quality Control'),
             ('tophat', 'tophat.html', 'Alignment'),
             ('cufflinks', 'cufflinks.html', 'Expression Quantification'),
+            ('cuffdiff', 'cuffdiff.html', 'Differential Expression'),
+            ('history', 'history.html', 'History'),
         ]
 
     @property
@@ -114,8 +353,35 @@ class IndexStage(SummaryStage, TuxedoBaseStage):
     template_entrances = 'index.html'
 
 
+class HistoryStage(SummaryStage, TuxedoBaseStage):
+    """Compare metrics of this job against other jobs in the warehouse.
+
+    See :attr:`Report.warehouse_path <ngcloud.report.Report.warehouse_path>`.
+    """
+    template_entrances = 'history.html'
+
+
+def _fastqc_zip_root(archive):
+    """Return the folder in FastQC's zip archive holding fastqc_data.txt."""
+    with _open_zipfile(archive) as zf:
+        for name in zf.namelist():
+            root, sep, filename = name.partition('/')
+            if filename == 'fastqc_data.txt':
+                return root
+    raise ValueError("No fastqc_data.txt found in {!s}".format(archive))
+
+
 class QCStage(TuxedoBaseStage):
-    """QC page for Tuxedo pipeline from output of FastQC"""
+    """QC page for Tuxedo pipeline from output of FastQC
+
+    Result of each sample is either the extracted folder
+    :file:`<sample.full_name>/` or FastQC's native archive
+    :file:`<sample.full_name>_fastqc.zip`, which is read in place.
+    The extracted folder is preferred if both exist.
+
+    .. versionchanged:: 0.3.4
+        Read FastQC zip archives without extracting them.
+    """
     template_entrances = 'qc.html'
     result_foldername = 'fastqc'
     # embed_result_joint = [
@@ -131,6 +397,11 @@ class QCStage(TuxedoBaseStage):
          'patterns': ['Images/*.png'],
          'dest': 'qc_sample/pics'},
     ]
+    parse_inputs = ['*/fastqc_data.txt', '*_fastqc.zip']
+    required_inputs = [
+        ('{sample.full_name}/fastqc_data.txt',
+         '{sample.full_name}_fastqc.zip'),
+    ]
     FASTQC_FILENAME = {
         'Per base sequence quality': 'per_base_quality.png',
         'Per sequence quality scores': 'per_sequence_quality.png',
@@ -152,12 +423,31 @@ class QCStage(TuxedoBaseStage):
         'fail': 'glyphicon-remove'
     }
 
+    def _fastqc_zip(self, sample, src=''):
+        """Return path to sample's FastQC zip archive under *src*, or None
+        if its result folder is extracted or the archive does not exist."""
+        src_root = self.result_root / src
+        archive = src_root / '{}_fastqc.zip'.format(sample.full_name)
+        if (src_root / sample.full_name).is_dir() or not archive.exists():
+            return None
+        return archive
+
+    def _open_fastqc_data(self, sample):
+        archive = self._fastqc_zip(sample)
+        if archive is None:
+            return open(
+                self.result_root / sample.full_name / 'fastqc_data.txt'
+            )
+        member = ZipMember(
+            archive, _fastqc_zip_root(archive) + '/fastqc_data.txt'
+        )
+        return io.TextIOWrapper(member.open(), encoding='utf-8')
+
     def read_fastqc_data(self, sample):
         qc_info = OrderedDict()
         over_seq = []
         qc_desc = None
-        qc_data_pth = self.result_root / sample.full_name / 'fastqc_data.txt'
-        with open(qc_data_pth) as qc_data:
+        with self._open_fastqc_data(sample) as qc_data:
             # parse FASTQC by brute force
             for line in qc_data:
                 new_sec = line.startswith('>>')
@@ -176,6 +466,25 @@ class QCStage(TuxedoBaseStage):
                             sec_end = next_line.startswith('>>END_MODULE')
         return qc_info, over_seq
 
+    def iter_static_persample(self):
+        """Iterate over FastQC images of each sample.
+
+        Images of samples having only the zip archive are yielded as
+        :class:`~ngcloud.util.ZipMember` and streamed out of the archive
+        when copied.
+        """
+        yield from super().iter_static_persample()
+        for desc in self.embed_result_persample:
+            for sample in self.job_info.sample_list:
+                archive = self._fastqc_zip(sample, desc['src'])
+                if archive is None:
+                    continue
+                sp_dest = Path(desc['dest'], sample.full_name)
+                for member in discover_zip_members(
+                        archive, desc['patterns'],
+                        root=_fastqc_zip_root(archive)):
+                    yield member, sp_dest / member.name
+
     def parse(self):
         super().parse()
         self.result_info['qc_info'] = dict()
@@ -195,6 +504,8 @@ class TophatStage(TuxedoBaseStage):
     """Tophat stage for Tuxedo pipeline"""
     result_foldername = 'tophat'
     template_entrances = 'tophat.html'
+    parse_inputs = ['*/align_summary.txt']
+    required_inputs = ['{group}/align_summary.txt']
 
     DETAIL_SEP = [
         ('Input', 'input'),
@@ -207,14 +518,18 @@ class TophatStage(TuxedoBaseStage):
         ('Mutli-align pairs', 'multi'),
         ('Discordants pairs', 'discord')
     ]
+    REQUIRED_SINGLE = ['left_input', 'left_map']
+    REQUIRED_PAIR = REQUIRED_SINGLE + [
+        'right_input', 'right_map', 'align_pair'
+    ]
 
     def parse(self):
         super().parse()
         self.set_const()
-        self.result_info['detail_info'] = OrderedDict()
+        detail_info = AlignTable()
         for group, sample_list in self.job_info.sample_group.items():
-            detail_info = self.parse_sample(group, sample_list)
-            self.result_info['detail_info'][group] = detail_info
+            detail_info.append(group, self.parse_sample(group, sample_list))
+        self.result_info['detail_info'] = detail_info
         logger.debug('Get overall pair align rate')
         self.compute_overall()
 
@@ -228,6 +543,16 @@ class TophatStage(TuxedoBaseStage):
         with open(align_txt) as align_summary:
             raw_string = align_summary.read()
 
+        info_dict = parse_align_summary(raw_string.splitlines())
+        paired = len(sample_list) == 2 or 'right_input' in info_dict
+        required = self.REQUIRED_PAIR if paired else self.REQUIRED_SINGLE
+        if all(k in info_dict for k in required):
+            return info_dict
+
+        logger.info(
+            "Unknown layout of {!s}, fall back to regex extraction"
+            .format(align_txt)
+        )
         match_sep = _extract_separate(raw_string)
         if not match_sep:
             raise ValueError("Cannot get left/right info in align_summary.txt")
@@ -236,7 +561,7 @@ class TophatStage(TuxedoBaseStage):
             raise ValueError("Cannot get pair info in align_summary.txt")
 
         info_dict = {
-            k: D(v)
+            k: int(v)
             for m in [match_sep, match_align]
             for k, v in m.groupdict().items()
         }
@@ -244,31 +569,177 @@ class TophatStage(TuxedoBaseStage):
 
     def compute_overall(self):
         detail = self.result_info['detail_info']
-        sep_rate = dict()
-        pair_rate = dict()
-        for group in self.sample_group:
-            left_all = detail[group]['left_input']
-            right_all = detail[group]['right_input']
-            if not left_all == right_all:
-                raise ValueError(
-                    "Unequal numbers of read for pair-end sample"
-                    "{}".format(group))
-            sep_rate[group] = [
-                detail[group][d + '_map'] / left_all
-                for d in ['left', 'right']
-            ]
-            pair_rate[group] = detail[group]['align_pair'] / left_all
+        cols = detail.columns
+        unequal = [
+            group for group, paired, left_all, right_all in zip(
+                detail.groups, detail.paired,
+                cols['left_input'], cols['right_input'])
+            if paired and left_all != right_all
+        ]
+        if unequal:
+            raise ValueError(
+                "Unequal numbers of read for pair-end sample"
+                "{}".format(', '.join(unequal)))
+
+        left_rate = detail.ratio('left_map', 'left_input')
+        right_rate = detail.ratio('right_map', 'right_input')
+        pair_rate = detail.ratio('align_pair', 'left_input')
+
+        sep_rate = OrderedDict()
+        paired_pair_rate = OrderedDict()
+        for group, paired, left, right, pair in zip(
+                detail.groups, detail.paired,
+                left_rate, right_rate, pair_rate):
+            if paired:
+                sep_rate[group] = [left, right]
+                paired_pair_rate[group] = pair
+            else:
+                sep_rate[group] = [left]
+        # single-end groups have zero right_rate
+        n_read = len(detail) + len(paired_pair_rate)
 
         self.result_info['sep_rate'] = sep_rate
-        self.result_info['pair_rate'] = pair_rate
-        self.result_info['overall_sep_percent'] = stats.mean(
-            rate
-            for group_rates in sep_rate.values()
-            for rate in group_rates
-        ) * 100
-        self.result_info['overall_pair_percent'] = stats.mean(
-            rate for rate in pair_rate.values()
-        ) * 100
+        self.result_info['pair_rate'] = paired_pair_rate
+        self.result_info['overall_sep_percent'] = (
+            math.fsum(left_rate) + math.fsum(right_rate)
+        ) / n_read * 100
+        if paired_pair_rate:
+            pair_rate = math.fsum(paired_pair_rate.values())
+            self.result_info['overall_pair_percent'] = (
+                pair_rate / len(paired_pair_rate) * 100
+            )
+        else:
+            self.result_info['overall_pair_percent'] = None
+
+
+class CuffdiffStage(TuxedoBaseStage):
+    """Cuffdiff stage for Tuxedo pipeline.
+
+    ``gene_exp.diff`` is read once in :meth:`parse`, where the row indexes
+    sorted by q-value and by absolute fold change are computed. Only the top
+    significant genes go into :attr:`result_info`; the full table together
+    with its indexes is written as data files under
+    ``<report_root>/static/cuffdiff/`` by :meth:`copy_static`, so the page
+    can paginate and draw the volcano plot without embedding every row.
+
+    Data files:
+
+    - **gene_exp.jsonl**: one JSON array per gene, columns are listed in
+      ``DATA_FIELDS``. Non-finite numbers are written as ``null``.
+    - **gene_exp_index.json**: row numbers of the jsonl file sorted by
+      q-value (``by_q_value``) and by absolute fold change
+      (``by_fold_change``), and the significant ones (``significant``)
+      in q-value order.
+
+    The full table and its indexes are kept out of result_info only until
+    they are written, and dropped by :meth:`release`. Jobs without a
+    Cuffdiff result folder get a page telling the result is missing.
+    """
+    result_foldername = 'cuffdiff'
+    result_optional = True
+    template_entrances = 'cuffdiff.html'
+
+    DIFF_FILENAME = 'gene_exp.diff'
+    DATA_DEST = 'cuffdiff'
+    DATA_FIELDS = DiffGene._fields
+    TOP_GENES = 50
+    PAGE_SIZE = 50
+
+    def parse(self):
+        super().parse()
+        self._diff_genes = []
+        self._diff_index = None
+        self.result_info.update({
+            'diff_found': False,
+            'DATA_DEST': self.DATA_DEST,
+            'PAGE_SIZE': self.PAGE_SIZE,
+            'DATA_FIELDS': self.DATA_FIELDS,
+        })
+
+        diff_pth = self.result_root / self.DIFF_FILENAME
+        if not diff_pth.exists():
+            logger.warning(
+                "Cuffdiff result {!s} not found, skipped".format(diff_pth)
+            )
+            return
+
+        genes = read_gene_exp_diff(diff_pth)
+        logger.debug("Sorting {} genes by q-value".format(len(genes)))
+        by_q_value = sorted(
+            range(len(genes)), key=lambda i: _sort_key_q_value(genes[i])
+        )
+        by_fold_change = sorted(
+            range(len(genes)), key=lambda i: _sort_key_fold_change(genes[i])
+        )
+        significant = [i for i in by_q_value if genes[i].significant]
+        self._diff_genes = genes
+        self._diff_index = OrderedDict([
+            ('n_rows', len(genes)),
+            ('by_q_value', by_q_value),
+            ('by_fold_change', by_fold_change),
+            ('significant', significant),
+        ])
+
+        self.result_info.update({
+            'diff_found': True,
+            'n_genes': len(genes),
+            'n_tested': sum(1 for g in genes if g.status == 'OK'),
+            'n_significant': len(significant),
+            'sample_pairs': sorted(set(
+                (g.sample_1, g.sample_2) for g in genes
+            )),
+            'top_genes': [genes[i] for i in significant[:self.TOP_GENES]],
+        })
+
+    def copy_static(self):
+        """Copy static files and write the Cuffdiff data files.
+
+        The stage is parsed first if it has not been, since the data files
+        come from the parsed gene table.
+        """
+        super().copy_static()
+        self.ensure_parsed()
+        if self._diff_index is not None:
+            self.write_diff_data()
+
+    def __getstate__(self):
+        # pages are rendered from result_info, never ship the gene table
+        state = super().__getstate__()
+        state.update(_diff_genes=[], _diff_index=None)
+        return state
+
+    def release(self):
+        """Drop result_info and the gene table not written yet."""
+        super().release()
+        self._drop_diff_table()
+
+    def _drop_diff_table(self):
+        self._diff_genes = []
+        self._diff_index = None
+
+    def write_diff_data(self):
+        """Write gene_exp.jsonl and its index under report static folder.
+
+        The gene table is dropped afterwards, it's only needed here.
+        """
+        dest_root = self.report_root / 'static' / self.DATA_DEST
+        if not dest_root.exists():
+            dest_root.mkdir(parents=True)
+
+        logger.info(
+            "Writing {} Cuffdiff genes to {!s}"
+            .format(len(self._diff_genes), dest_root)
+        )
+        with open(dest_root / 'gene_exp.jsonl', 'w') as data_f:
+            for gene in self._diff_genes:
+                data_f.write(json.dumps([
+                    _finite_or_none(v) if isinstance(v, float) else v
+                    for v in gene
+                ], separators=(',', ':')))
+                data_f.write('\n')
+        with open(dest_root / 'gene_exp_index.json', 'w') as index_f:
+            json.dump(self._diff_index, index_f, separators=(',', ':'))
+        self._drop_diff_table()
 
 
 class TuxedoReport(Report):
@@ -276,14 +747,9 @@ class TuxedoReport(Report):
 
     stage_classnames = [
         IndexStage, QCStage, TophatStage,  # CufflinkStage,
+        CuffdiffStage, HistoryStage,
     ]
     static_roots = [
         get_shared_static_root(),
         _get_builtin_report_root() / 'tuxedo' / 'static',
     ]
-
-    def template_config(self):
-        decimal_context = decimal.getcontext()
-        if decimal_context.prec < 10:
-            logger.warning('Decimal module precison is too low, set to 10')
-            decimal_context.prec = 10
@@ -0,0 +1,131 @@
+import os
+from pathlib import Path
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import ngcloud as ng
+
+logger = ng._create_logger(__name__)
+
+__doc__ = """\
+Check required inputs of all stages before a report is generated.
+
+Stages declare the files that their parsing or static copying cannot do
+without by :attr:`Stage.required_inputs
+<ngcloud.report.Stage.required_inputs>`, usually one or a few per sample.
+:func:`check_inputs` tests all of them by a pool of threads and raises
+:class:`MissingInputError` listing every missing input at once, before any
+result is parsed or the report folder is touched.
+
+.. code-block:: python3
+
+    class MyStage(Stage):
+        # either the extracted folder or the archive of each sample
+        required_inputs = [
+            ('{sample.full_name}/summary.txt', '{sample.full_name}.zip'),
+        ]
+
+.. autosummary::
+
+    check_inputs
+    find_missing_inputs
+    MissingInput
+    MissingInputError
+
+.. versionadded:: 0.3.4
+"""
+
+MissingInput = namedtuple('MissingInput', ['stage', 'target', 'paths'])
+"""A required input of which none of the candidate *paths* exists.
+
+*stage* is the stage class name, *target* is the sample full name or group
+name the input belongs to, or None if it is shared by the whole stage."""
+
+
+class MissingInputError(FileNotFoundError):
+    """Raised by :func:`check_inputs` with all missing inputs.
+
+    Attributes
+    ----------
+    missing : list of :class:`MissingInput`
+    """
+
+    def __init__(self, missing):
+        self.missing = list(missing)
+        lines = [
+            "{} required input(s) of the job are missing:"
+            .format(len(self.missing))
+        ]
+        for item in self.missing:
+            lines.append("  {}{}: {}".format(
+                item.stage,
+                '' if item.target is None else ' [{}]'.format(item.target),
+                ' or '.join(str(p) for p in item.paths)
+            ))
+        super().__init__('\n'.join(lines))
+
+
+def _find_missing(checks):
+    missing = []
+    for stage_name, root, target, rel_paths in checks:
+        if isinstance(root, Path):
+            # plain strings, no Path object is made for inputs found
+            root_str = os.fspath(root)
+            found = any(
+                os.path.exists(os.path.join(root_str, rel))
+                for rel in rel_paths
+            )
+        else:
+            found = any((root / rel).exists() for rel in rel_paths)
+        if not found:
+            missing.append(MissingInput(
+                stage_name, target, [root / rel for rel in rel_paths]
+            ))
+    return missing
+
+
+def find_missing_inputs(stages, workers=16):
+    """Return list of :class:`MissingInput` of *stages* in stage order.
+
+    Inputs from :meth:`Stage.iter_required_inputs
+    <ngcloud.report.Stage.iter_required_inputs>` are split into one chunk
+    per thread, so stat calls on slow or network file systems overlap.
+    """
+    checks = [
+        (type(stage).__name__, stage.result_root, target, rel_paths)
+        for stage in stages
+        for target, rel_paths in stage.iter_required_inputs()
+    ]
+    if not checks:
+        return []
+    n_chunks = max(1, min(workers, len(checks)))
+    chunk_size = -(-len(checks) // n_chunks)
+    chunks = [
+        checks[i:i + chunk_size] for i in range(0, len(checks), chunk_size)
+    ]
+    logger.debug(
+        "Check %d required inputs by %d threads", len(checks), len(chunks)
+    )
+    if len(chunks) == 1:
+        return _find_missing(checks)
+    with ThreadPoolExecutor(max_workers=len(chunks)) as executor:
+        return [
+            missing
+            for chunk_missing in executor.map(_find_missing, chunks)
+            for missing in chunk_missing
+        ]
+
+
+def check_inputs(stages, workers=16):
+    """Raise :class:`MissingInputError` if any required input of *stages*
+    is missing.
+
+    Parameters
+    ----------
+    stages : list of :class:`~ngcloud.report.Stage` object
+    workers : int
+        Number of threads testing the inputs.
+    """
+    missing = find_missing_inputs(stages, workers=workers)
+    if missing:
+        raise MissingInputError(missing)
+    logger.info("All required inputs of {} stages found".format(len(stages)))
@@ -1,11 +1,17 @@
 import re
 import sys
+import os
 import os.path
 import importlib
+import contextlib
 import shutil
+import pickle
 from pathlib import Path
 import abc
 import logging
+from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
 try:
 	import colorlog
 except ImportError:
@@ -15,16 +21,23 @@ import jinja2
 import ngcloud as ng
 from ngcloud.util import (
     strify_path, open, is_pathlike, merged_copytree,
-    copy, discover_file_by_patterns,
-    humanfmt
+    copy, discover_file_by_patterns, CopyPool, SYNC_MODES,
+    humanfmt, process_pool_context
 )
 from ngcloud.info import JobInfo
+# modules of optional features are imported where they are used, so
+# ngreport --list-pipes and reports not using them start quickly
 
 logger = ng._create_logger(__name__)
 
 AVAIL_PIPES = {
-    'tuxedo': 'ngcloud.pipe.tuxedo.TuxedoReport'
+    'tuxedo': 'ngcloud.pipe.tuxedo:TuxedoReport',
+    'gatk': 'ngcloud.pipe.gatk:GATKReport',
 }
+"""Builtin pipelines by name, used only if NGCloud is not installed.
+
+Builtin pipelines are registered by entry points in :file:`setup.py` like
+those of other packages, see :data:`ngcloud.pipe.ENTRY_POINT_GROUP`."""
 
 _SCRIPT_DOC = """\
 NGCloud report generator for differenct NGS analysis pipelines.
@@ -32,6 +45,9 @@ NGCloud report generator for differenct NGS analysis pipelines.
 Usage:
     ngreport [-p <pipeline>] <job_dir> [<out_dir>] [-v ...] [options]
     ngreport [-p <pipeline>] <job_dir> [-o <out_dir>] [-v ...] [options]
+    ngreport [-p <pipeline>] --compare <job_dirs>... [-o <out_dir>] [-v ...]
+             [options]
+    ngreport --list-pipes
     ngreport -h | --help
     ngreport --version
 
@@ -40,12 +56,47 @@ Options:
     -V --version        Show version
     -v --verbose        Increase verbosity (noiser when more -v)
     -p <pipeline>, --pipe=<pipeline>
-                        Name of the pipeline [default: tuxedo]
-    <job_dir>           Path to the organized job folder [default: .]
+                        Name of the pipeline or Python path to its report
+                        class [default: tuxedo]
+    --list-pipes        List available pipelines
+    <job_dir>           Path to the organized job folder, or its tar or zip
+                        archive [default: .]
+    --compare           Generate one report comparing all given job folders
     -o <out_dir>, --outdir=<out_dir>, <out_dir>
                         Path to the report output [default: ./output]
     --color             Produce colorful logs, require colorlog
     --log-time          Add time stamp in log
+    --watch             Keep rebuilding the report when job results or
+                        templates change
+    --debounce=<sec>    Seconds to wait for changes to settle in watch mode
+                        [default: 2]
+    --serve             Preview the report through a local HTTP server,
+                        pages are rendered on request and nothing is written
+    --port=<port>       Port of the preview server [default: 8000]
+    --export=<formats>  Also export parsed metrics next to the report,
+                        comma separated formats of json, sqlite, parquet
+    --warehouse=<db>    Compare against and append metrics into a SQLite
+                        metrics warehouse shared across jobs
+    --sync=<mode>       Keep existing report and skip static files up to
+                        date, compared by mtime or hash
+    --dedupe-static     Copy static files of identical content once and
+                        hard link the others
+    --optimize-images   Optimize embedded PNG images and make thumbnails,
+                        require Pillow
+    --parse-cache       Cache parsed NGS results under
+                        $XDG_CACHE_HOME/ngcloud/parse and load them while
+                        their inputs are unchanged
+    --render-workers=<n>
+                        Render pages by a pool of n processes
+    --memory-budget=<size>
+                        Spill large arrays of parsed results to disk when
+                        they exceed size, e.g. 2G
+    --no-preflight      Skip checking that required inputs of all stages
+                        exist before generating the report
+    --memory-profile=<json>
+                        Record peak memory and top allocations of each
+                        stage's parse, render and copy_static to a JSON
+                        file, and print a summary table
 
 """
 
@@ -57,6 +108,8 @@ Quick remainder for serving current folder through http:
 
     $ python3 -m http.server
     # Serving HTTP on 0.0.0.0 port 8000 ...
+
+Or preview the report without generating it by `ngreport --serve`.
 '''
 
 __doc__ = """\
@@ -65,8 +118,12 @@ Base classes to produce NGCloud report
 .. autosummary::
 
     Stage
+    SummaryStage
+    NormalStages
     Report
     gen_report
+    available_pipes
+    load_report_class
     main
 """
 
@@ -133,6 +190,14 @@ class Stage(metaclass=abc.ABCMeta):
         Embedded per sample static file copying description
     result_foldername : str
         Folder name to the NGS result of this stage
+    result_optional : bool
+        Keep the stage if its result folder is missing
+    optimize_images : bool
+        Optimize embedded images and make thumbnails
+    parse_inputs : list of str
+        File patterns read by parse(), used to cache parsed result
+    parse_options : list of str
+        Attributes changing the parsed result, used to cache parsed result
     job_info : JobInfo object
         Information about how the NGS result is run
     result_info : dict object
@@ -146,8 +211,12 @@ class Stage(metaclass=abc.ABCMeta):
     copy_static
     copy_static_joint
     copy_static_persample
+    iter_static_files
     parse
+    ensure_parsed
+    release
     render
+    render_template
 
     """
     template_entrances = ['stage.html']
@@ -221,6 +290,78 @@ class Stage(metaclass=abc.ABCMeta):
     .. versionadded:: 0.3
     """
 
+    optimize_images = False
+    """Whether embedded PNG images are optimized with thumbnails made.
+
+    Applied when static files are copied, see :mod:`ngcloud.image`. In
+    templates, ``thumb()`` gives the path to the thumbnail of an embedded
+    image, or the image itself if images are not optimized. It is turned on
+    for all stages by :attr:`Report.optimize_images`.
+
+    .. versionadded:: 0.3.4
+    """
+
+    parse_inputs = []
+    """File patterns under :attr:`result_root` that :meth:`parse` reads.
+
+    When declared, the parsed :attr:`result_info` is cached and
+    :meth:`parse` is skipped as long as these input files are unchanged.
+    Patterns support the same globbing syntax as :attr:`embed_result_joint`.
+    ::
+
+        parse_inputs = ['*/align_summary.txt']
+
+    Only declare it if :meth:`parse` depends on nothing but these files,
+    job info, the stage code and :attr:`parse_options`, and it stores
+    everything in :attr:`result_info`. See :mod:`ngcloud.cache`.
+
+    .. versionadded:: 0.3.4
+    """
+
+    parse_options = []
+    """Names of stage attributes that change what :meth:`parse` stores.
+
+    Their values are part of the cache fingerprint of :attr:`parse_inputs`,
+    so results parsed under other settings are not loaded::
+
+        parse_options = ['bam_max_blocks']
+
+    .. versionadded:: 0.3.4
+    """
+
+    required_inputs = []
+    """Paths under :attr:`result_root` that must exist before generation.
+
+    Each element is a path template formatted by :py:meth:`str.format`, or
+    a tuple of alternative templates of which at least one must exist.
+    Templates containing ``{group}`` are checked for each sample group, and
+    those containing ``{sample}`` fields for each sample::
+
+        required_inputs = [
+            '{group}/align_summary.txt',
+            ('{sample.full_name}/data.txt', '{sample.full_name}.zip'),
+        ]
+
+    All of them are checked at once before parsing by
+    :mod:`ngcloud.preflight` unless :attr:`Report.preflight` is off.
+
+    .. versionadded:: 0.3.4
+    """
+
+    parse_cache = None
+    """:class:`~ngcloud.cache.ParseCache` object used by
+    :meth:`ensure_parsed`, set by :class:`Report`. None to disable caching.
+
+    .. versionadded:: 0.3.4
+    """
+
+    spiller = None
+    """:class:`~ngcloud.spill.ArraySpiller` tracking arrays of result_info
+    once parsed, set by :class:`Report` with :attr:`Report.memory_budget`.
+
+    .. versionadded:: 0.3.4
+    """
+
     result_foldername = ''
     """Folder name to the result of this stage.
 
@@ -232,11 +373,22 @@ class Stage(metaclass=abc.ABCMeta):
     to this folder is stored in :attr:`self.result_root <result_root>`.
 
     Otherwise, *ValueError* is raised if none or more than two
-    matched folder are found.
+    matched folder are found, unless the stage is
+    :attr:`result_optional`.
 
     .. versionadded:: 0.3
     """
 
+    result_optional = False
+    """Whether the stage is kept when no result folder is found.
+
+    The stage is then created with :attr:`result_root` set to the missing
+    folder :file:`<job root>/<result_foldername>`, and its :meth:`parse`
+    should handle the missing result files.
+
+    .. versionadded:: 0.3.4
+    """
+
     def __init__(self, job_info, report_root):
         """Initiate a Stage object.
 
@@ -268,20 +420,40 @@ class Stage(metaclass=abc.ABCMeta):
             This attribute is automatically set by finding the matched
             foldername based on :attr:`result_foldername`
         """
-        logger.info("Initating new stage {}".format(type(self).__name__))
+        logger.info("Initating new stage %s", type(self).__name__)
         self._setup_jinja2()
-        if is_pathlike(self.template_entrances):
-            tpls = [self.template_entrances]
-        else:
-            tpls = self.template_entrances
-        self._templates = {tpl: self._env.get_template(tpl) for tpl in tpls}
+        self._load_templates()
 
         self.job_info = job_info
         self.report_root = report_root
         self.result_info = dict()
+        self._parsed = False
         logger.debug("... Loacate result folder path")
         self.result_root = self._locate_result_folder()
-        logger.debug("... stage initiated".format(type(self).__name__))
+        logger.debug("... stage %s initiated", type(self).__name__)
+
+    def __getstate__(self):
+        # Jinja2 environment is not picklable, rebuilt when unpickled
+        state = self.__dict__.copy()
+        for attr in ('_report_loader', '_env', '_templates', 'spiller'):
+            state.pop(attr, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._setup_jinja2()
+        self._load_templates()
+
+    def _load_templates(self):
+        if is_pathlike(self.template_entrances):
+            tpls = [self.template_entrances]
+        else:
+            tpls = self.template_entrances
+        # names only, templates are got from the environment when rendered
+        # so that those modified on disk are reloaded
+        self._templates = list(tpls)
+        for tpl in self._templates:
+            self._env.get_template(tpl)
 
     def _setup_jinja2(self):
         try:
@@ -290,20 +462,19 @@ class Stage(metaclass=abc.ABCMeta):
             _template_paths = [
                 strify_path(p) for p in self.template_find_paths
             ]
-        logger.debug(
-            "Jinja2 reads templates from {}".format(_template_paths)
-        )
+        logger.debug("Jinja2 reads templates from %s", _template_paths)
         self._report_loader = jinja2.FileSystemLoader(_template_paths)
         self._env = jinja2.Environment(
             loader=self._report_loader,
             extensions=['jinja2.ext.with_'],
         )
         self._env.globals['static'] = self._template_static_path
+        self._env.globals['thumb'] = self._template_thumb_path
         self._env.globals['humanfmt'] = humanfmt
 
     def _locate_result_folder(self):
         if not self.result_foldername:
-            logger.warn(
+            logger.warning(
                 "No result foldername set for stage {}, "
                 "using {!s}"
                 .format(self.__class__.__name__, self.job_info.root_path)
@@ -320,6 +491,12 @@ class Stage(metaclass=abc.ABCMeta):
             if valid_name(p.name)
         ]
         if not stage_result_path:
+            if self.result_optional:
+                logger.warning(
+                    "No result folder of %s found, its result is missing",
+                    type(self).__name__
+                )
+                return self.job_info.root_path / self.result_foldername
             raise ValueError("No matched foldername found of pattern {}"
                              .format(self.result_foldername))
         if len(stage_result_path) > 1:
@@ -331,6 +508,21 @@ class Stage(metaclass=abc.ABCMeta):
     def _template_static_path(self, *path_parts):
         return Path('static', *path_parts).as_posix()
 
+    def _template_thumb_path(self, *path_parts):
+        rel_path = Path(*path_parts)
+        if self._optimizes(rel_path):
+            from ngcloud.image import thumb_path
+            return self._template_static_path(thumb_path(rel_path))
+        return self._template_static_path(rel_path)
+
+    def _optimizes(self, rel_dest):
+        if not self.optimize_images:
+            return False
+        from ngcloud import image
+        if not image.is_available():
+            return False
+        return Path(rel_dest).suffix.lower() in image.IMAGE_SUFFIXES
+
     def render(self):
         """Render the templates of this stages and return HTML output.
 
@@ -382,12 +574,26 @@ class Stage(metaclass=abc.ABCMeta):
 
         """
         return {
-            tpl_name: tpl.render(
-                job_info=self.job_info, result_info=self.result_info,
-                **self.result_info)
-            for tpl_name, tpl in self._templates.items()
+            tpl_name: self.render_template(tpl_name)
+            for tpl_name in self._templates
         }
 
+    def render_template(self, tpl_name):
+        """Render one of the :attr:`template_entrances` and return HTML.
+
+        See :meth:`render` for the variables passed to the template.
+
+        The stage is parsed first if not yet, see :meth:`ensure_parsed`.
+
+        .. versionadded:: 0.3.4
+        """
+        if tpl_name not in self._templates:
+            raise KeyError(tpl_name)
+        self.ensure_parsed()
+        return self._env.get_template(tpl_name).render(
+            job_info=self.job_info, result_info=self.result_info,
+            **self.result_info)
+
     def parse(self):
         """Parse the NGS result and store in :attr:`self.result_info <result_info>`
 
@@ -395,6 +601,70 @@ class Stage(metaclass=abc.ABCMeta):
         """
         pass
 
+    def ensure_parsed(self):
+        """Call :meth:`parse` if not yet parsed and return :attr:`result_info`.
+
+        Stages are parsed through this method by :class:`Report`,
+        so each stage is parsed once no matter it is first accessed by
+        rendering its pages or by summary stages. If the stage declares
+        :attr:`parse_inputs` and has :attr:`parse_cache`, result_info is
+        loaded from cache when the inputs are unchanged. Large arrays of
+        result_info may then be spilled to disk by :attr:`spiller`.
+
+        .. versionadded:: 0.3.4
+        """
+        if not self._parsed:
+            logger.debug("Call {}'s parse()".format(type(self).__name__))
+            if self.parse_cache is not None and self.parse_inputs:
+                self.parse_cache.parse(self)
+            else:
+                self.parse()
+            self._parsed = True
+            if self.spiller is not None:
+                self.spiller.track(self, self.result_info)
+        return self.result_info
+
+    def release(self):
+        """Drop the parsed :attr:`result_info` to free memory.
+
+        The stage will be parsed again on next :meth:`ensure_parsed`.
+
+        .. versionadded:: 0.3.4
+        """
+        if self.spiller is not None:
+            self.spiller.forget(self)
+        self.result_info = dict()
+        self._parsed = False
+
+    def iter_required_inputs(self):
+        """Iterate over (target, candidate paths) of :attr:`required_inputs`.
+
+        *target* is the group name or sample full name the input belongs
+        to, or None. Candidate paths are strings relative to
+        :attr:`result_root`, and the input is found if any of them exists.
+
+        .. versionadded:: 0.3.4
+        """
+        for template in self.required_inputs:
+            alternatives = (
+                (template,) if isinstance(template, str) else tuple(template)
+            )
+            joined = ''.join(alternatives)
+            if '{group' in joined:
+                targets = [
+                    (group, {'group': group})
+                    for group in self.job_info.sample_group
+                ]
+            elif '{sample' in joined:
+                targets = [
+                    (sample.full_name, {'sample': sample})
+                    for sample in self.job_info.sample_list
+                ]
+            else:
+                targets = [(None, {})]
+            for target, fields in targets:
+                yield target, [alt.format(**fields) for alt in alternatives]
+
     def copy_static(self):
         """Copy stage-specific static files under report folder.
 
@@ -479,15 +749,22 @@ class Stage(metaclass=abc.ABCMeta):
 
         .. versionadded:: 0.3
         """
+        self._copy_static_files(self.iter_static_joint())
+
+    def iter_static_joint(self):
+        """Iterate over the static files of :meth:`copy_static_joint`.
+
+        Yield pairs of source file path and destination path relative to
+        report static folder, e.g. ``(<result_root>/from/foo.jpg, to/foo.jpg)``
+        without copying anything.
+
+        .. versionadded:: 0.3.4
+        """
         for desc in self.embed_result_joint:
             src_root = self.result_root / desc['src']
-            dest_root = self.report_root / 'static' / desc['dest']
-            if not dest_root.exists():
-                dest_root.mkdir(parents=True)
-
             file_list = discover_file_by_patterns(src_root, desc['patterns'])
             for fp in file_list:
-                copy(fp, dest_root)
+                yield fp, Path(desc['dest'], fp.name)
 
     def copy_static_persample(self):
         """Copy statics file that are spearately produced by each sample.
@@ -528,20 +805,56 @@ class Stage(metaclass=abc.ABCMeta):
 
         .. versionadded:: 0.3
         """
+        self._copy_static_files(self.iter_static_persample())
+
+    def iter_static_persample(self):
+        """Iterate over the static files of :meth:`copy_static_persample`.
+
+        Same as :meth:`iter_static_joint` but destination paths contain
+        sample's full name, e.g. ``(<result_root>/from/A_R1/foo, to/A_R1/foo)``
+
+        .. versionadded:: 0.3.4
+        """
         for desc in self.embed_result_persample:
             all_src_root = self.result_root / desc['src']
-            all_dest_root = self.report_root / 'static'
 
             for sample in self.job_info.sample_list:
                 # TODO: fuzzy match sample.name
                 sp_src_root = all_src_root / sample.full_name
-                sp_dest_root = all_dest_root / desc['dest'] / sample.full_name
-                sp_dest_root.mkdir(parents=True)
+                sp_dest = Path(desc['dest'], sample.full_name)
 
                 file_list = discover_file_by_patterns(
                     sp_src_root, desc['patterns'])
                 for fp in file_list:
-                    copy(fp, sp_dest_root)
+                    yield fp, sp_dest / fp.name
+
+    def iter_static_files(self):
+        """Iterate over all static files embedded by this stage.
+
+        Chain :meth:`iter_static_joint` and :meth:`iter_static_persample`.
+
+        .. versionadded:: 0.3.4
+        """
+        yield from self.iter_static_joint()
+        yield from self.iter_static_persample()
+
+    def _copy_static_files(self, static_files):
+        static_root = self.report_root / 'static'
+        optimizer = None
+        for src, dest in static_files:
+            if self._optimizes(dest):
+                if optimizer is None:
+                    from ngcloud.image import ImageOptimizer
+                    optimizer = ImageOptimizer(static_root)
+                optimizer.submit(src, dest)
+                continue
+            dest_root = (static_root / dest).parent
+            if not dest_root.exists():
+                dest_root.mkdir(parents=True)
+            copy(src, dest_root)
+        if optimizer is not None:
+            optimizer.join()
+
 
 class SummaryStage(Stage):
     """Special stage class that can access other normal stages's result_info.
@@ -562,8 +875,45 @@ class SummaryStage(Stage):
 
         <p>Some info of MyStage: {{ normal_stages.MyStage.some_info }}</p>
 
+    **normal_stages** is a :class:`NormalStages` mapping, a normal stage is
+    parsed when its result_info is first accessed.
+
+    .. versionchanged:: 0.3.4
+        Normal stages are parsed on access
+    """
+
+
+class NormalStages(Mapping):
+    """Read-only mapping of stage class name to result_info of normal stages.
+
+    Getting a stage's result_info parses the stage if not yet by
+    :meth:`Stage.ensure_parsed`, so summary stages touching only some of
+    the normal stages don't wait for others to be parsed.
+
+    Parameters
+    ----------
+    stages : list of :class:`Stage` object
+
+    .. versionadded:: 0.3.4
     """
 
+    def __init__(self, stages):
+        self._stages = OrderedDict(
+            (type(stage).__name__, stage) for stage in stages
+        )
+
+    def __getitem__(self, name):
+        return self._stages[name].ensure_parsed()
+
+    def __iter__(self):
+        return iter(self._stages)
+
+    def __len__(self):
+        return len(self._stages)
+
+    def __repr__(self):
+        return '<{} {!r}>'.format(type(self).__name__, list(self._stages))
+
 class Report(metaclass=abc.ABCMeta):
     """NGCloud report base class of every pipeline.
 
@@ -586,14 +936,40 @@ class Report(metaclass=abc.ABCMeta):
         List of stage class name in order used in for this pipeline report.
     static_roots : Path object
         Path to the template static file dir
+    export_formats : list
+        Formats to export parsed metrics
+    warehouse_path : path-like object or None
+        SQLite metrics warehouse shared across jobs
+    copy_workers : int
+        Number of static files copied concurrently
+    sync_static : str or None
+        Keep existing report root and skip static files up to date
+    dedupe_static : bool
+        Hard link static files of identical content
+    optimize_images : bool
+        Optimize embedded images and make thumbnails for all stages
+    parse_cache_dir : path-like object or None
+        Where to cache parsed results of stages declaring parse_inputs
+    render_workers : int
+        Number of processes rendering pages of normal stages
+    memory_budget : int, str or None
+        Bytes of large arrays in result_info kept in memory
+    preflight : bool
+        Check required inputs of all stages before generation
+    memory_profile : path-like object or None
+        Where to record memory used by each stage phase
 
     Methods
     -------
     __init__
     template_config
     generate
+    load_job
+    create_stages
+    update
     render_report
     copy_static
+    iter_static_files
     output_report
 
     """
@@ -632,6 +1008,133 @@ class Report(metaclass=abc.ABCMeta):
     See :ref:`extend_builtin_pipe` for more inforation.
     """
 
+    export_formats = []
+    """Formats to export parsed metrics after the report is generated.
+
+    Each element is a format name in
+    :data:`~ngcloud.export.AVAIL_EXPORTERS` or a subclass of
+    :class:`~ngcloud.export.Exporter`. Files are written under
+    :attr:`report_root`, see :mod:`ngcloud.export`.
+    ::
+
+        export_formats = ['json', 'sqlite']
+
+    .. versionadded:: 0.3.4
+    """
+
+    warehouse_path = None
+    """Path to a SQLite metrics warehouse shared across jobs, or None.
+
+    When set, metrics of this job are compared against other jobs in the
+    warehouse before rendering, and the comparison is passed to summary
+    stages as key **history** of their result_info. After the report is
+    written, the job is appended into the warehouse.
+    See :mod:`ngcloud.warehouse`.
+
+    .. versionadded:: 0.3.4
+    """
+
+    copy_workers = 8
+    """Number of static files being copied at the same time by
+    :meth:`generate`. See :class:`~ngcloud.util.CopyPool`.
+
+    .. versionadded:: 0.3.4
+    """
+
+    sync_static = None
+    """Whether to keep an existing report root and skip static files that
+    are up to date, one of :data:`~ngcloud.util.SYNC_MODES` or None.
+
+    By default, the report root is removed and every file is copied again.
+    With ``'mtime'`` or ``'hash'``, generating a report again into the same
+    output folder only copies changed static files. Files no longer being
+    part of the report are not removed.
+
+    .. versionadded:: 0.3.4
+    """
+
+    dedupe_static = False
+    """Whether static files of identical content are copied only once.
+
+    Files are hashed while copied by :meth:`generate`, duplicates become
+    hard links to the first copy so paths used by templates are unchanged.
+    Hashing reads every static file on every run, so it is off by default
+    (``ngreport --dedupe-static``). See :class:`~ngcloud.util.CopyPool`.
+
+    .. versionadded:: 0.3.4
+    """
+
+    optimize_images = False
+    """Turn on :attr:`Stage.optimize_images` of all stages.
+
+    Embedded PNG images are re-encoded losslessly with thumbnails made on
+    a process pool, require Pillow. See :mod:`ngcloud.image`.
+
+    .. versionadded:: 0.3.4
+    """
+
+    parse_cache_dir = None
+    """Folder to cache parsed results of stages declaring
+    :attr:`Stage.parse_inputs`. Empty string for the default folder
+    :file:`$XDG_CACHE_HOME/ngcloud/parse` (``ngreport --parse-cache``),
+    None to disable caching, which is the default. See
+    :mod:`ngcloud.cache`.
+
+    .. versionadded:: 0.3.4
+    """
+
+    render_workers = 0
+    """Number of processes rendering pages of normal stages by
+    :meth:`render_report`, 0 to render all pages in the current process.
+
+    Each normal stage is pickled after being parsed and its entrance
+    templates are rendered in worker processes, while summary stages are
+    rendered last in the current process. Stages overriding
+    :meth:`Stage.render` or holding unpicklable attributes are rendered in
+    the current process as well. Output is identical to serial rendering.
+
+    .. versionadded:: 0.3.4
+    """
+
+    memory_budget = None
+    """Bytes of large :py:class:`array.array` in result_info of normal
+    stages kept in memory, e.g. ``'2G'``, or None for no limit.
+
+    Once the arrays of parsed stages add up over the budget, the largest
+    ones are spilled to memory-mapped files, which are unmapped after their
+    stages are rendered. See :mod:`ngcloud.spill`.
+
+    .. versionadded:: 0.3.4
+    """
+
+    memory_profile = None
+    """Path of JSON file to record memory of each stage's parse, render and
+    copy_static phases and the size of its result_info keys, or None.
+
+    Phases are traced by :py:mod:`tracemalloc`, which slows generation
+    down. The recorder is kept as :attr:`memory_profiler`. See
+    :mod:`ngcloud.memprof`.
+
+    .. versionadded:: 0.3.4
+    """
+
+    memory_profiler = None
+    """:class:`~ngcloud.memprof.MemoryProfiler` of the last
+    :meth:`generate` if :attr:`memory_profile` is set."""
+
+    preflight = True
+    """Check :attr:`Stage.required_inputs` of all stages before anything is
+    parsed or written, and raise
+    :class:`~ngcloud.preflight.MissingInputError` listing every missing
+    input. See :mod:`ngcloud.preflight`.
+
+    .. versionadded:: 0.3.4
+    """
+
+    history = None
+    """Comparison from :meth:`MetricsWarehouse.compare
+    <ngcloud.warehouse.MetricsWarehouse.compare>`, None if no warehouse."""
+
     def __init__(self):
         """Call :py:func:`template_config`. Don't override me."""
         logger.debug(
@@ -645,25 +1148,182 @@ class Report(metaclass=abc.ABCMeta):
 
         The whole process breaks down into follwoing parts:
 
-        1. read job info as :py:class:`~ngcloud.info.JobInfo`
-        2. parse NGS result, covered by :meth:`parse`
-        2. render report, covered by :py:meth:`render_report`
-        3. copy template-related static files such as JS and CSS
-           into output dir, covered by :py:meth:`copy_static`
-        4. copy stage-related static files into output dir.
-           Call each :py:meth:`Stage.copy_static` respectively
-        5. output rendered reports into output dir, covered by
+        1. read job info as :py:class:`~ngcloud.info.JobInfo`, create
+           stages and check their required inputs if :attr:`preflight`
+        2. start copying template-related static files such as JS and CSS
+           (see :py:meth:`copy_static`) and stage-related static files
+           (see :py:meth:`Stage.copy_static`) into output dir in background
+        3. parse NGS result, covered by :meth:`parse`
+        4. render report, covered by :py:meth:`render_report`
+        5. copy static files of stages overriding :meth:`Stage.copy_static`,
+           whose files may depend on the parsed result, then wait for
+           the background copying to finish
+        6. output rendered reports into output dir, covered by
            :py:meth:`output_report`
+        7. export parsed metrics if :attr:`export_formats` is set
+        8. append metrics into warehouse if :attr:`warehouse_path` is set
+
+        Memory used by each phase of stages is recorded if
+        :attr:`memory_profile` is set.
+
+        Static files are copied by a pool of :attr:`copy_workers` threads,
+        overlapping parsing and rendering since they don't depend on
+        result_info. If :meth:`copy_static` is overridden, it is called
+        before any stage static file is copied.
 
         .. warning::
 
             **Override this function with care.** You might break the logic.
 
+        .. versionchanged:: 0.3.4
+            Copy static files concurrently in background; check required
+            inputs before the report folder is touched; record memory
+            by :attr:`memory_profile`
+
         """
         logger.info(
             "Generate report from job result {!s} under {!s}"
             .format(job_dir, out_dir)
         )
+        if self.sync_static and self.sync_static not in SYNC_MODES:
+            raise ValueError(
+                "Unknown sync mode {!r}, should be one of {!r}"
+                .format(self.sync_static, SYNC_MODES)
+            )
+        if self.export_formats:
+            from ngcloud.export import check_formats
+            check_formats(self.export_formats)
+        self.load_job(job_dir, out_dir)
+
+        self.memory_profiler = None
+        if self.memory_profile is not None:
+            from ngcloud.memprof import MemoryProfiler
+            logger.info(
+                "Record memory of stages to {!s}".format(self.memory_profile)
+            )
+            self.memory_profiler = MemoryProfiler(self.memory_profile)
+            self.memory_profiler.start()
+        try:
+            self._generate()
+        finally:
+            if self.memory_profiler is not None:
+                self.memory_profiler.stop()
+                self.memory_profiler.write_json()
+
+    def _generate(self):
+        # create stage instances, then fail early before touching the report
+        self.create_stages()
+        if self.preflight:
+            from ngcloud.preflight import check_inputs
+            check_inputs(self._stages)
+
+        if self.report_root.exists():
+            if self.sync_static:
+                logger.info(
+                    "Report root {!s} has already existed, syncing by {}"
+                    .format(self.report_root, self.sync_static)
+                )
+            else:
+                logger.warning(
+                    "Report root {!s} has already existed! Overwriting..."
+                    .format(self.report_root)
+                )
+                shutil.rmtree(self.report_root.as_posix())
+        self.report_root.mkdir(parents=True, exist_ok=True)
+
+        with contextlib.ExitStack() as stack:
+            warehouse = None
+            if self.warehouse_path:
+                from ngcloud.warehouse import MetricsWarehouse
+                warehouse = stack.enter_context(
+                    MetricsWarehouse(self.warehouse_path)
+                )
+            self._build_report(warehouse)
+        self._release_spilled()
+
+    def _build_report(self, warehouse):
+        """Parse, render and write the report, then export its metrics."""
+        logger.info("Start copying static files in background")
+        pool = CopyPool(
+            self.report_root / 'static', max_workers=self.copy_workers,
+            sync=self.sync_static, dedupe=self.dedupe_static
+        )
+        optimizer = None
+        try:
+            deferred_stages, optimizer = self._submit_static(pool)
+
+            if warehouse is not None:
+                # comparing needs all stages parsed before rendering
+                logger.debug("Parse NGS result info")
+                self.parse()
+                logger.info("Compare metrics against other jobs in warehouse")
+                self.history = warehouse.compare(self)
+
+            # other stages are parsed when first rendered or read by a
+            # summary stage, then released unless exported later
+            self._deferred_static = deferred_stages
+            self._release_rendered = not (self.export_formats or warehouse)
+            logger.info("Render report templates")
+            self.render_report()
+
+            for stage in list(self._deferred_static):
+                self._copy_deferred_static(stage)
+        finally:
+            self._deferred_static = []
+            self._release_rendered = False
+            with self._phase(None, 'copy_static'):
+                pool.join()
+                if optimizer is not None:
+                    optimizer.join()
+
+        logger.info("Write rendered templates to file")
+        with self._phase(None, 'output'):
+            self.output_report()
+
+        if self.export_formats:
+            from ngcloud.export import export_report
+            logger.info("Export parsed metrics")
+            export_report(self, self.export_formats)
+
+        if warehouse is not None:
+            warehouse.add_report(self)
+
+    def _submit_static(self, pool):
+        """Submit static files to copy.
+
+        Return stages to copy themselves and the image optimizer or None.
+        """
+        if type(self).copy_static is Report.copy_static:
+            # later static roots take precedence, copy only the last one
+            static_files = OrderedDict(
+                (dest, src) for src, dest in self.iter_static_files()
+            )
+            for dest, src in static_files.items():
+                pool.submit(src, dest, ignore_errors=True)
+        else:
+            self.copy_static()
+
+        deferred_stages = []
+        optimizer = None
+        for stage in self._stages:
+            if type(stage).copy_static is Stage.copy_static:
+                for src, dest in stage.iter_static_files():
+                    if stage._optimizes(dest):
+                        if optimizer is None:
+                            from ngcloud.image import ImageOptimizer
+                            optimizer = ImageOptimizer(pool.dst_root)
+                        optimizer.submit(src, dest)
+                    else:
+                        pool.submit(src, dest)
+            else:
+                deferred_stages.append(stage)
+        return deferred_stages, optimizer
+
+    def load_job(self, job_dir, out_dir):
+        """Read job info and decide report root, nothing is written.
+
+        .. versionadded:: 0.3.4
+        """
         self.job_info = JobInfo(job_dir)
         self.out_dir = Path(out_dir)
 
@@ -673,44 +1333,88 @@ class Report(metaclass=abc.ABCMeta):
             "id: {0.id} type: {0.type}".format(self.job_info)
         )
 
-        if self.report_root.exists():
-            logger.warn(
-                "Report root {!s} has already existed! Overwriting..."
-                .format(self.report_root)
-            )
-            shutil.rmtree(self.report_root.as_posix())
-        self.report_root.mkdir(parents=True)
+    def create_stages(self):
+        """Create stage instances of :attr:`stage_classnames`.
 
-        # create stage instances
+        .. versionadded:: 0.3.4
+        """
         self._stages = [
             Stage(self.job_info, self.report_root)
             for Stage in self.stage_classnames
         ]
+        if self.parse_cache_dir is not None:
+            from ngcloud.cache import ParseCache
+            parse_cache = ParseCache(self.parse_cache_dir or None)
+            for stage in self._stages:
+                stage.parse_cache = parse_cache
+        if self.optimize_images:
+            from ngcloud import image
+            if not image.is_available():
+                logger.warning(
+                    "Image optimization requires Pillow, "
+                    "images are copied as they are"
+                )
+            for stage in self._stages:
+                stage.optimize_images = True
+        self._spiller = None
+        if self.memory_budget is not None:
+            from ngcloud.spill import ArraySpiller, parse_size
+            self._spiller = ArraySpiller(parse_size(self.memory_budget))
+            for stage in self._stages:
+                if not isinstance(stage, SummaryStage):
+                    stage.spiller = self._spiller
+
+    def update(self, stages=(), static=False):
+        """Update part of a report already made by :meth:`generate`.
+
+        Given stages are re-parsed and have their static files copied again.
+        All stages are re-rendered since summary stages depend on the others,
+        while the Jinja2 environment of each stage is kept, so templates
+        modified on disk are reloaded without re-creating the stages.
+
+        Parameters
+        ----------
+        stages : list of :class:`Stage` object
+            Stages of this report whose NGS result has changed.
+        static : bool
+            Copy template static files again by :meth:`copy_static`.
+
+        .. versionadded:: 0.3.4
+        """
+        for stage in stages:
+            logger.info("Re-parse {}".format(type(stage).__name__))
+            stage.release()
+            stage.ensure_parsed()
 
-        logger.debug("Parse NGS result info")
-        self.parse()
-
-        logger.info("Render report templates")
         self.render_report()
-
-        logger.info("Copying report static files")
-        self.copy_static()
-
-        logger.info("Copying each stage's static files")
-        for stage in self._stages:
+        if static:
+            self.copy_static()
+        for stage in stages:
             stage.copy_static()
-
-        logger.info("Write rendered templates to file")
         self.output_report()
 
     def parse(self):
         """Parse NGS results for each stage.
 
-        Call :meth:`Stage.parse`.
+        Call :meth:`Stage.ensure_parsed`, stages already parsed are skipped.
+
+        .. versionchanged:: 0.3.4
+            Skip stages already parsed
         """
         for stage in self._stages:
-            logger.debug("Call {}'s parse()".format(type(stage).__name__))
-            stage.parse()
+            self._parse_stage(stage)
+
+    def _parse_stage(self, stage):
+        with self._phase(stage, 'parse'):
+            stage.ensure_parsed()
+        if self.memory_profiler is not None:
+            self.memory_profiler.record_result_info(stage)
+
+    def _phase(self, stage, name):
+        """Context of a stage phase recorded by :attr:`memory_profiler`."""
+        if self.memory_profiler is None:
+            return contextlib.ExitStack()
+        return self.memory_profiler.phase(stage, name)
 
     def render_report(self):
         """Put real results into report template and return rendered html.
@@ -721,8 +1425,98 @@ class Report(metaclass=abc.ABCMeta):
         the initiation.
 
         See :class:`SummaryStage` for its usage.
+
+        Pages of normal stages are rendered by a process pool if
+        :attr:`render_workers` is set.
+
+        Summary stages are rendered first, parsing the normal stages they
+        read. Each normal stage is parsed when its pages are rendered if
+        not yet, and when called by :meth:`generate`, released once they
+        are done unless its result is exported or stored afterwards.
+
+        .. versionchanged:: 0.3.4
+            Render on a process pool by :attr:`render_workers`; parse
+            normal stages on demand
         """
         self.report_html = dict()
+        self.link_summary_stages()
+        for stage in self._stages:
+            if isinstance(stage, SummaryStage):
+                with self._phase(stage, 'render'):
+                    self.report_html.update(stage.render())
+        normal_stages = [
+            stage for stage in self._stages
+            if not isinstance(stage, SummaryStage)
+        ]
+        if not self.render_workers:
+            for stage in normal_stages:
+                self._parse_stage(stage)
+                with self._phase(stage, 'render'):
+                    self.report_html.update(stage.render())
+                self._stage_rendered(stage)
+            return
+
+        rendered = OrderedDict()
+        # never fork, CopyPool threads may be copying static files
+        with self._phase(None, 'render'), ProcessPoolExecutor(
+            max_workers=self.render_workers,
+            mp_context=process_pool_context()
+        ) as executor:
+            for stage in normal_stages:
+                self._parse_stage(stage)
+                snapshot = _render_snapshot(stage)
+                if snapshot is None:
+                    rendered[stage] = stage.render()
+                else:
+                    rendered[stage] = OrderedDict(
+                        (tpl_name, executor.submit(
+                            _render_stage_template, snapshot, tpl_name
+                        ))
+                        for tpl_name in stage._templates
+                    )
+                # workers render from the snapshot, the stage is done here
+                self._stage_rendered(stage)
+            for stage, pages in rendered.items():
+                for name, page in pages.items():
+                    if not isinstance(page, str):
+                        page = _page_result(stage, name, page)
+                    self.report_html[name] = page
+
+    def _stage_rendered(self, stage):
+        """Copy deferred static files of a normal stage whose pages are
+        rendered, then release it or its spilled arrays."""
+        if stage in getattr(self, '_deferred_static', ()):
+            self._copy_deferred_static(stage)
+        if getattr(self, '_release_rendered', False):
+            stage.release()
+        else:
+            self._release_spilled(stage)
+
+    def _copy_deferred_static(self, stage):
+        """Copy static files of a stage with custom copy_static()."""
+        self._deferred_static.remove(stage)
+        logger.info("Copying {}'s static files".format(type(stage).__name__))
+        with self._phase(stage, 'copy_static'):
+            stage.copy_static()
+
+    def _release_spilled(self, stage=None):
+        """Unmap spilled arrays of a normal stage after it's rendered,
+        or of all stages if *stage* is None or a summary stage."""
+        if getattr(self, '_spiller', None) is None:
+            return
+        if isinstance(stage, SummaryStage):
+            stage = None
+        self._spiller.release(stage)
+
+    def link_summary_stages(self):
+        """Pass result_info of normal stages to summary stages.
+
+        Set key **normal_stages** and **history** of each summary stage's
+        result_info. Called by :meth:`render_report`. Normal stages are
+        not parsed here but when accessed, see :class:`NormalStages`.
+
+        .. versionadded:: 0.3.4
+        """
         norm_stages = [
             stg for stg in self._stages if not isinstance(stg, SummaryStage)
         ]
@@ -730,14 +1524,11 @@ class Report(metaclass=abc.ABCMeta):
             'Normal stages are {!r}, collecting their result_infos'
             .format([stg.__class__.__name__ for stg in norm_stages])
         )
-        all_norm_result_info = {
-            stage.__class__.__name__: stage.result_info
-            for stage in norm_stages
-        }
+        all_norm_result_info = NormalStages(norm_stages)
         for stage in self._stages:
             if stage not in norm_stages:
                 stage.result_info['normal_stages'] = all_norm_result_info
-            self.report_html.update(stage.render())
+                stage.result_info['history'] = self.history
 
     def copy_static(self):
         """Copy template statics files to output dir.
@@ -745,11 +1536,31 @@ class Report(metaclass=abc.ABCMeta):
         Files under each path specifed by :py:attr:`static_roots`
         will be copied to folder :file:`static` below :py:attr:`report_root`.
         """
+        merged_copytree(
+            self._static_root_list(), self.report_root / 'static',
+            sync=self.sync_static
+        )
+
+    def iter_static_files(self):
+        """Iterate over template static files of :meth:`copy_static`.
+
+        Yield pairs of source file path and destination path relative to
+        report static folder. Files of later static roots come later, so they
+        take precedence when copied in order.
+
+        .. versionadded:: 0.3.4
+        """
+        for root in self._static_root_list():
+            root_p = Path(strify_path(root))
+            for current_root, dirs, files in os.walk(strify_path(root)):
+                rel_root = Path(current_root).relative_to(root_p)
+                for f in files:
+                    yield Path(current_root, f), rel_root / f
+
+    def _static_root_list(self):
         if is_pathlike(self.static_roots):
-            _static_roots = [self.static_roots]
-        else:
-            _static_roots = self.static_roots
-        merged_copytree(_static_roots, self.report_root / 'static')
+            return [self.static_roots]
+        return self.static_roots
 
     def output_report(self):
         """Output rendered htmls to output directory.
@@ -769,32 +1580,80 @@ class Report(metaclass=abc.ABCMeta):
         pass
 
 
-def gen_report(pipe_report_cls, job_dir, out_dir):
-    """Generate a NGCloud report.
+def available_pipes():
+    """Return dict of available pipeline name to its report class target.
 
-    For :ref:`normal usage <ngreport>`, one can use :command:`ngreport` command
-    instead of calling this Python function directly.
+    Pipelines are registered by entry points, see
+    :func:`ngcloud.pipe.registered_pipes`. Builtin pipelines missing there,
+    when NGCloud is run from its source tree without being installed, are
+    taken from :data:`AVAIL_PIPES`. No pipeline is imported.
+
+    .. versionadded:: 0.3.4
+    """
+    from ngcloud.pipe import registered_pipes
+    pipes = registered_pipes()
+    for name, target in AVAIL_PIPES.items():
+        pipes.setdefault(name, target)
+    return pipes
+
+
+@contextlib.contextmanager
+def _cwd_on_sys_path():
+    """Make modules under current folder importable temporarily."""
+    cwd = os.path.abspath('.')
+    added = cwd not in sys.path
+    if added:
+        sys.path.append(cwd)
+    try:
+        yield
+    finally:
+        if added and cwd in sys.path:
+            sys.path.remove(cwd)
+
+
+def load_report_class(pipe_report_cls):
+    """Import and return the report class of a pipeline.
 
     Parameters
     ----------
     pipe_report_cls: str
-        Name of the Python class to generate the report of certain pipeline.
-    job_dir: path-like object
-    out_dir: path-like object
+        Name of an available pipeline, see :func:`available_pipes`, or the
+        full Python name of the report class, such as
+        ``'ngcloud.pipe.tuxedo.TuxedoReport'`` or
+        ``'ngcloud.pipe.tuxedo:TuxedoReport'``. Modules under current
+        folder can be found while importing.
+
+    Raises
+    ------
+    TypeError
+        When the class is not a subclass of :class:`Report`.
 
+    .. versionadded:: 0.3.4
     """
-    # read in the pipeline class
+    pipes = available_pipes()
+    if pipe_report_cls in pipes:
+        logger.debug(
+            "Pipeline {} is available as {}"
+            .format(pipe_report_cls, pipes[pipe_report_cls])
+        )
+        pipe_report_cls = pipes[pipe_report_cls]
     logger.debug("Get pipeline class: {}".format(pipe_report_cls))
-    pipe_module_name, pipe_class_name = pipe_report_cls.rsplit('.', 1)
+    if ':' in pipe_report_cls:
+        pipe_module_name, pipe_class_name = pipe_report_cls.split(':', 1)
+    else:
+        pipe_module_name, pipe_class_name = pipe_report_cls.rsplit('.', 1)
     logger.info(
         "Get report class {} from module {}"
         .format(pipe_class_name, pipe_module_name)
     )
-    pipe_module = importlib.import_module(pipe_module_name)
-    PipeReport = getattr(pipe_module, pipe_class_name)
+    with _cwd_on_sys_path():
+        pipe_module = importlib.import_module(pipe_module_name)
+    PipeReport = pipe_module
+    for attr in pipe_class_name.split('.'):
+        PipeReport = getattr(PipeReport, attr)
 
     if not issubclass(PipeReport, Report):
-        logger.warn(
+        logger.warning(
             "Unaccepted report class {} being passed, "
             "should be subclass of ngcloud.report.Report"
         )
@@ -802,22 +1661,140 @@ def gen_report(pipe_report_cls, job_dir, out_dir):
             "pipe_report_cls: {} should be inherited from"
             "ngcloud.report.Report".format(pipe_report_cls)
         )
+    return PipeReport
 
-    job_dir = Path(job_dir)
-    out_dir = Path(out_dir)
 
-    # validate job_dir
+def _render_snapshot(stage):
+    """Return the pickled parsed stage, or None if rendered in place."""
+    if type(stage).render is not Stage.render:
+        return None
+    stage.ensure_parsed()
+    try:
+        return pickle.dumps(stage, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception as e:
+        logger.debug(
+            "Stage {} cannot be pickled, render in place: {!r}"
+            .format(type(stage).__name__, e)
+        )
+        return None
+
+
+def _render_stage_template(snapshot, tpl_name):
+    """Render a template of a pickled stage, run in worker processes."""
+    # stage classes may live in modules found under current folder
+    with _cwd_on_sys_path():
+        stage = pickle.loads(snapshot)
+    return stage.render_template(tpl_name)
+
+
+def _page_result(stage, tpl_name, future):
+    """Return page rendered by a worker, or render it in place if the
+    worker failed."""
+    try:
+        return future.result()
+    except Exception as e:
+        logger.warning(
+            "Rendering %s of %s by worker caught error %r, render in place",
+            tpl_name, type(stage).__name__, e
+        )
+        return stage.render_template(tpl_name)
+
+
+def _validate_job_dir(job_dir):
     if not job_dir.exists():
         raise FileNotFoundError(
             'Job info folder: {} does not exist!'.format(job_dir)
         )
-    if not job_dir.is_dir():
+    from ngcloud.vfs import is_archive
+    if not job_dir.is_dir() and not is_archive(job_dir):
         raise NotADirectoryError(
             'Expect path to job info a valid directory: {}'.format(job_dir)
         )
 
+
+def gen_report(
+    pipe_report_cls, job_dir, out_dir,
+    export_formats=None, warehouse_path=None, sync_static=None,
+    optimize_images=None, parse_cache_dir=None, render_workers=None,
+    memory_budget=None, preflight=None, memory_profile=None,
+    dedupe_static=None
+):
+    """Generate a NGCloud report.
+
+    For :ref:`normal usage <ngreport>`, one can use :command:`ngreport` command
+    instead of calling this Python function directly.
+
+    Parameters
+    ----------
+    pipe_report_cls: str
+        Name of the pipeline or the Python class to generate the report of
+        certain pipeline, see :func:`load_report_class`.
+    job_dir: path-like object
+        Job folder, or its tar or zip archive.
+    out_dir: path-like object
+    export_formats: list of str, optional
+        Override :attr:`Report.export_formats` of the report class.
+    warehouse_path: path-like object, optional
+        Override :attr:`Report.warehouse_path` of the report class.
+    sync_static: str, optional
+        Override :attr:`Report.sync_static` of the report class.
+    optimize_images: bool, optional
+        Override :attr:`Report.optimize_images` of the report class.
+    parse_cache_dir: path-like object, optional
+        Override :attr:`Report.parse_cache_dir` of the report class, empty
+        string for the default cache folder.
+    render_workers: int, optional
+        Override :attr:`Report.render_workers` of the report class.
+    memory_budget: int or str, optional
+        Override :attr:`Report.memory_budget` of the report class.
+    preflight: bool, optional
+        Override :attr:`Report.preflight` of the report class.
+    memory_profile: path-like object, optional
+        Override :attr:`Report.memory_profile` of the report class.
+    dedupe_static: bool, optional
+        Override :attr:`Report.dedupe_static` of the report class.
+
+    Returns
+    -------
+    The generated :class:`Report` object.
+
+    .. versionchanged:: 0.3.4
+        Add **export_formats**, **warehouse_path**, **sync_static**,
+        **optimize_images**, **parse_cache_dir**, **render_workers**,
+        **memory_budget**, **preflight**, **memory_profile** and
+        **dedupe_static**; return the report
+
+    """
+    # read in the pipeline class
+    PipeReport = load_report_class(pipe_report_cls)
+
+    job_dir = Path(job_dir)
+    out_dir = Path(out_dir)
+
+    # validate job_dir
+    _validate_job_dir(job_dir)
+
     report = PipeReport()
+    if export_formats is not None:
+        from ngcloud.export import check_formats
+        check_formats(export_formats)
+    overrides = [
+        ('export_formats', export_formats),
+        ('warehouse_path', warehouse_path),
+        ('sync_static', sync_static),
+        ('optimize_images', optimize_images),
+        ('parse_cache_dir', parse_cache_dir),
+        ('render_workers', render_workers),
+        ('memory_budget', memory_budget),
+        ('preflight', preflight),
+        ('memory_profile', memory_profile),
+        ('dedupe_static', dedupe_static),
+    ]
+    for attr, value in overrides:
+        if value is not None:
+            setattr(report, attr, value)
     report.generate(job_dir, out_dir)
+    return report
 
 
 def main(argv=None):
@@ -875,16 +1852,47 @@ def main(argv=None):
         Add **argv**; include external loggers.
 
     """
-    # setup console logging
-    console = logging.StreamHandler()
-    all_loggers = logging.getLogger()
-    all_loggers.addHandler(console)
-
     # read arguments from command line
     if argv:
         args = docopt(_SCRIPT_DOC, argv=argv, version=ng.__version__)
     else:
         args = docopt(_SCRIPT_DOC, version=ng.__version__)
+    _setup_console_logging(args)
+    logger.debug("Get command line arguments: {!r}".format(dict(args)))
+
+    if args['--list-pipes']:
+        _print_pipes()
+        return
+
+    # set pipeline to use, either a name or a Python class name
+    pipe_report_cls = args['--pipe']
+
+    out_dir = Path(
+        args['<out_dir>'] if args['<out_dir>'] else args['--outdir']
+    )
+
+    if args['--compare']:
+        _compare_jobs(pipe_report_cls, args['<job_dirs>'], out_dir)
+        return
+
+    job_dir = Path(args['<job_dir>'])
+
+    if args['--serve']:
+        _serve(pipe_report_cls, job_dir, port=int(args['--port']))
+    elif args['--watch']:
+        _watch(
+            pipe_report_cls, job_dir, out_dir,
+            debounce=float(args['--debounce'])
+        )
+    else:
+        _generate_from_args(pipe_report_cls, job_dir, out_dir, args)
+
+
+def _setup_console_logging(args):
+    """Log to stderr at the level and format given by ngreport options."""
+    console = logging.StreamHandler()
+    all_loggers = logging.getLogger()
+    all_loggers.addHandler(console)
 
     # set logging level
     if args['--verbose'] == 1:
@@ -923,46 +1931,85 @@ def main(argv=None):
             console.setFormatter(log_color_formatter)
         except ImportError:
             console.setFormatter(log_formatter)
-            logger.warn(
+            logger.warning(
                 "Color logs require colorlog, "
                 "try pip install colorlog or colorlog[windows] on Windows"
             )
     else:
         console.setFormatter(log_formatter)
 
-    logger.debug("Get command line arguments: {!r}".format(dict(args)))
 
-    # set pipeline to use
-    pipe_type = args['--pipe']
-    if pipe_type in AVAIL_PIPES:
-        pipe_report_cls = AVAIL_PIPES[pipe_type]
-    else:
-        logger.info(
-            "Pipeline type {} is not in AVAIL_PIPES, "
-            "pass it as a Python class name".format(pipe_type)
-        )
-        pipe_report_cls = pipe_type
+def _print_pipes():
+    """Print name and target of available pipelines, ngreport --list-pipes.
+    """
+    for name, target in sorted(available_pipes().items()):
+        print('{}\t{}'.format(name, target))
+
+
+def _compare_jobs(pipe_report_cls, job_dirs, out_dir):
+    """Generate a report comparing jobs, ngreport --compare."""
+    from ngcloud.multi import MultiJobReport
+    PipeReport = load_report_class(pipe_report_cls)
+    job_dirs = [Path(d) for d in job_dirs]
+    for job_dir in job_dirs:
+        _validate_job_dir(job_dir)
+    MultiJobReport(PipeReport).generate(job_dirs, out_dir)
+    logger.info("Job successfully end. Print message")
+    print(_CAVEAT_MSG.format(out_dir))
 
-    job_dir = Path(args['<job_dir>'])
-    out_dir = Path(
-        args['<out_dir>'] if args['<out_dir>'] else args['--outdir']
-    )
 
-    # FIXME: custom pipeline cannot be find if they are not official packages
-    # therefore where the ngreport being called should be added into sys.path
-    # currently is a hack. More elegant way should be used
-    sys.path.append(os.path.abspath('.'))
-    logger.debug(
-        "Inject current path into sys.path. "
-        "Now find packages under paths: {!r}".format(sys.path)
-    )
+def _serve(pipe_report_cls, job_dir, port):
+    """Serve the report until interrupted, ngreport --serve."""
+    from ngcloud.serve import serve_report
+    PipeReport = load_report_class(pipe_report_cls)
+    _validate_job_dir(job_dir)
+    try:
+        serve_report(PipeReport(), job_dir, port=port)
+    except KeyboardInterrupt:
+        logger.info("Stop serving")
+
+
+def _watch(pipe_report_cls, job_dir, out_dir, debounce):
+    """Regenerate the report on changes until interrupted,
+    ngreport --watch."""
+    from ngcloud.watch import watch_report
+    PipeReport = load_report_class(pipe_report_cls)
+    _validate_job_dir(job_dir)
+    try:
+        watch_report(PipeReport(), job_dir, out_dir, debounce=debounce)
+    except KeyboardInterrupt:
+        logger.info("Stop watching")
+
+
+def _generate_from_args(pipe_report_cls, job_dir, out_dir, args):
+    """Generate the report by :func:`gen_report` with ngreport options,
+    then print the memory profile if recorded."""
+    if args['--export']:
+        export_formats = args['--export'].split(',')
+    else:
+        export_formats = None
 
     # called real function to generate report
-    gen_report(pipe_report_cls, job_dir, out_dir)
+    report = gen_report(
+        pipe_report_cls, job_dir, out_dir,
+        export_formats, warehouse_path=args['--warehouse'],
+        sync_static=args['--sync'],
+        optimize_images=args['--optimize-images'] or None,
+        parse_cache_dir='' if args['--parse-cache'] else None,
+        render_workers=(
+            int(args['--render-workers']) if args['--render-workers']
+            else None
+        ),
+        memory_budget=args['--memory-budget'],
+        preflight=False if args['--no-preflight'] else None,
+        memory_profile=args['--memory-profile'],
+        dedupe_static=args['--dedupe-static'] or None
+    )
 
     logger.info("Job successfully end. Print message")
     print(_CAVEAT_MSG.format(out_dir))
-
+    if report.memory_profiler is not None:
+        print(report.memory_profiler.format_table())
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,198 @@
+import shutil
+import tempfile
+import mimetypes
+from pathlib import Path, PurePosixPath
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, unquote
+import ngcloud as ng
+from ngcloud.report import Stage
+from ngcloud.util import strify_path, is_pathlike
+
+logger = ng._create_logger(__name__)
+
+__doc__ = """\
+Local preview server rendering report pages on request.
+
+Unlike generating a report and serving it by ``python3 -m http.server``,
+nothing is rendered or copied ahead. NGS results are parsed once, then each
+page is rendered from the cached result_info when requested, so template
+changes show up on browser reload. Each stage is parsed when a page first
+needs it. Static files are read directly from
+:attr:`Report.static_roots <ngcloud.report.Report.static_roots>` and stage
+result folders.
+
+.. autosummary::
+
+    serve_report
+    ReportPreview
+"""
+
+
+class ReportPreview:
+    """Render pages and locate static files of a report without writing it.
+
+    Parameters
+    ----------
+    report : :class:`~ngcloud.report.Report` object
+    job_dir : path-like object
+
+    Attributes
+    ----------
+    pages : dict
+        Maps page name to the stage rendering it.
+    static_files : dict
+        Maps path relative to report static folder to its source file,
+        collected from :meth:`Stage.iter_static_files
+        <ngcloud.report.Stage.iter_static_files>`.
+    static_roots : list of Path object
+        Template static roots, the later one takes precedence.
+    """
+
+    def __init__(self, report, job_dir):
+        self.report = report
+        # stages that write their own static files are copied here
+        self._tmp_root = Path(tempfile.mkdtemp(prefix='ngcloud_preview_'))
+        report.load_job(job_dir, self._tmp_root)
+        report.report_root = self._tmp_root
+        report.create_stages()
+        # stages are parsed when their pages or summaries are first rendered
+        report.link_summary_stages()
+
+        self.pages = dict()
+        self.static_files = dict()
+        for stage in report._stages:
+            for tpl_name in stage._templates:
+                self.pages[tpl_name] = stage
+            if type(stage).copy_static is Stage.copy_static:
+                self.static_files.update(
+                    (dest.as_posix(), src)
+                    for src, dest in stage.iter_static_files()
+                )
+            else:
+                logger.info(
+                    "{} has custom copy_static(), "
+                    "write its static files to temporary folder"
+                    .format(type(stage).__name__)
+                )
+                stage.ensure_parsed()
+                stage.copy_static()
+
+        if is_pathlike(report.static_roots):
+            static_roots = [report.static_roots]
+        else:
+            static_roots = report.static_roots
+        self.static_roots = [Path(strify_path(p)) for p in static_roots]
+        logger.info(
+            "Preview {} pages and {} stage static files"
+            .format(len(self.pages), len(self.static_files))
+        )
+
+    def render(self, page):
+        """Return rendered HTML of *page*, or None if no such page."""
+        stage = self.pages.get(page)
+        if stage is None:
+            return None
+        return stage.render_template(page)
+
+    def find_static(self, rel_path):
+        """Return source file of static file *rel_path*, or None if missing.
+
+        Lookup order follows what would be copied last when generating the
+        report: stage static files, then static roots in reversed order.
+        Files outside the static roots, including those reached by absolute
+        paths, ``..`` or symbolic links, are never returned.
+        """
+        if rel_path in self.static_files:
+            return self.static_files[rel_path]
+        rel_path = PurePosixPath(rel_path)
+        if rel_path.is_absolute() or '..' in rel_path.parts:
+            return None
+        roots = [self._tmp_root / 'static'] + self.static_roots[::-1]
+        for root in roots:
+            pth = root.joinpath(*rel_path.parts)
+            if pth.is_file() and _is_within(pth, root):
+                return pth
+        return None
+
+    def close(self):
+        shutil.rmtree(strify_path(self._tmp_root), ignore_errors=True)
+
+
+def _is_within(pth, root):
+    try:
+        pth.resolve().relative_to(root.resolve())
+    except ValueError:
+        return False
+    return True
+
+
+class _PreviewHandler(BaseHTTPRequestHandler):
+    preview = None
+
+    def do_GET(self):
+        path = unquote(urlsplit(self.path).path).lstrip('/')
+        if not path:
+            path = 'index.html'
+        if path.startswith('static/'):
+            self._send_static(path[len('static/'):])
+        else:
+            self._send_page(path)
+
+    def _send_page(self, page):
+        try:
+            html = self.preview.render(page)
+        except Exception as e:
+            logger.exception("Rendering {} failed".format(page))
+            self.send_error(500, "Rendering failed: {!r}".format(e))
+            return
+        if html is None:
+            self.send_error(404)
+            return
+        content = html.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _send_static(self, rel_path):
+        src = self.preview.find_static(rel_path)
+        if src is None:
+            self.send_error(404)
+            return
+        ctype = mimetypes.guess_type(src.name)[0] or 'application/octet-stream'
+        with src.open('rb') as f:
+            content = f.read()
+        self.send_response(200)
+        self.send_header('Content-Type', ctype)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        logger.info(format % args)
+
+
+def serve_report(report, job_dir, port=8000, host='127.0.0.1'):
+    """Serve a report preview over HTTP until interrupted.
+
+    Parameters
+    ----------
+    report : :class:`~ngcloud.report.Report` object
+    job_dir : path-like object
+    port : int
+    host : str
+
+    .. versionadded:: 0.3.4
+    """
+    preview = ReportPreview(report, job_dir)
+    handler = type('PreviewHandler', (_PreviewHandler, ), {
+        'preview': preview
+    })
+    httpd = HTTPServer((host, port), handler)
+    print("Serving report preview on http://{}:{}/".format(host, port))
+    try:
+        httpd.serve_forever()
+    finally:
+        httpd.server_close()
+        preview.close()
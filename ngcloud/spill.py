@@ -0,0 +1,308 @@
+import os
+import re
+import mmap
+import shutil
+import tempfile
+import weakref
+import itertools
+from array import array
+from collections import OrderedDict
+from collections.abc import Sequence
+import ngcloud as ng
+
+logger = ng._create_logger(__name__)
+
+__doc__ = """\
+Keep large arrays of parsed results within a memory budget.
+
+Stages may store large :py:class:`array.array` in their result_info, such
+as per-group columns of :class:`~ngcloud.pipe.tuxedo.AlignTable`. All of
+them stay alive until the report is rendered, because summary stages can
+read every normal stage's result. When :attr:`Report.memory_budget
+<ngcloud.report.Report.memory_budget>` is set (``ngreport
+--memory-budget=<size>``), an :class:`ArraySpiller` tracks arrays of each
+parsed stage and, when they add up over the budget, moves the largest ones
+into files replaced by :class:`SpilledArray`. Spilled arrays are
+memory-mapped only while being read, and unmapped again after their stage
+is rendered, so their pages leave the resident memory.
+
+.. autosummary::
+
+    ArraySpiller
+    SpilledArray
+    parse_size
+
+.. versionadded:: 0.3.4
+"""
+
+# unicode arrays cannot be viewed as memoryview of their typecode
+_SPILLABLE_TYPECODES = set('bBhHiIlLqQfd')
+_ITER_CHUNK = 1 << 16
+_SIZE_UNITS = {'': 1, 'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30, 'T': 1 << 40}
+_match_size = re.compile(
+    r'^\s*(\d+(?:\.\d+)?)\s*([KMGT]?)i?B?\s*$', re.I
+).match
+
+
+def parse_size(size):
+    """Return bytes of a size like ``512M`` or ``4G``, units are powers of
+    1024. Integers are returned as they are.
+
+    Examples
+    --------
+
+        >>> parse_size('1.5K')
+        1536
+
+    """
+    if isinstance(size, int):
+        return size
+    match = _match_size(size)
+    if not match:
+        raise ValueError("Unknown size {!r}, try e.g. 512M or 4G".format(size))
+    number, unit = match.groups()
+    return int(float(number) * _SIZE_UNITS[unit.upper()])
+
+
+class _SpillDir:
+    """Temporary folder removed when no spilled array refers to it."""
+
+    def __init__(self, parent=None):
+        self.path = tempfile.mkdtemp(prefix='ngcloud_spill_', dir=parent)
+        self._names = itertools.count()
+        self._finalizer = weakref.finalize(
+            self, shutil.rmtree, self.path, ignore_errors=True
+        )
+
+    def new_file(self, typecode):
+        return os.path.join(
+            self.path, '{}.{}'.format(next(self._names), typecode)
+        )
+
+
+def _load_spilled(path, typecode, length):
+    return SpilledArray(path, typecode, length)
+
+
+class SpilledArray(Sequence):
+    """Read-only typed array stored in a file and memory-mapped on access.
+
+    It behaves like the :py:class:`array.array` it replaces for indexing,
+    slicing, iteration and :func:`len`. Slices are copied into new arrays.
+    Pickled spilled arrays refer to the same file.
+
+    Parameters
+    ----------
+    path : str
+        File of the raw array content written by
+        :py:meth:`array.array.tofile`.
+    typecode : str
+    length : int
+    """
+
+    def __init__(self, path, typecode, length):
+        self.path = path
+        self.typecode = typecode
+        self._length = length
+        self._mmap = None
+        self._view = None
+        self._dir = None
+
+    @classmethod
+    def from_array(cls, arr, spill_dir):
+        """Write *arr* into a file of *spill_dir* and return its spilled
+        array."""
+        path = spill_dir.new_file(arr.typecode)
+        with open(path, 'wb') as f:
+            arr.tofile(f)
+        spilled = cls(path, arr.typecode, len(arr))
+        # the folder lives as long as arrays in it
+        spilled._dir = spill_dir
+        return spilled
+
+    @property
+    def itemsize(self):
+        return array(self.typecode).itemsize
+
+    @property
+    def nbytes(self):
+        return self._length * self.itemsize
+
+    @property
+    def mapped(self):
+        """Whether the file is currently memory-mapped."""
+        return self._view is not None
+
+    def _get_view(self):
+        if self._view is None:
+            with open(self.path, 'rb') as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._mmap).cast(self.typecode)
+        return self._view
+
+    def release(self):
+        """Unmap the file, it's mapped again on next access."""
+        if self._view is None:
+            return
+        try:
+            self._view.release()
+            self._mmap.close()
+        except BufferError:
+            logger.debug("Spilled array %s is still being read", self.path)
+            return
+        self._view = self._mmap = None
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return array(self.typecode, self._get_view()[index])
+        return self._get_view()[index]
+
+    def __iter__(self):
+        view = self._get_view()
+        # items are converted a chunk at a time, faster than one by one
+        for start in range(0, self._length, _ITER_CHUNK):
+            yield from view[start:start + _ITER_CHUNK].tolist()
+
+    def to_array(self):
+        """Return the content as a new :py:class:`array.array`."""
+        return array(self.typecode, self._get_view())
+
+    def __reduce__(self):
+        return _load_spilled, (self.path, self.typecode, self._length)
+
+    def __repr__(self):
+        return '<{} {!r} of {} items at {}>'.format(
+            type(self).__name__, self.typecode, self._length, self.path
+        )
+
+
+def _iter_array_slots(obj, min_bytes, visited):
+    """Yield (container, key, array) of arrays reachable from *obj*
+    through dicts, lists, tuples and attributes of objects."""
+    if id(obj) in visited:
+        return
+    visited.add(id(obj))
+    if isinstance(obj, dict):
+        items = list(obj.items())
+    elif isinstance(obj, list):
+        items = list(enumerate(obj))
+    elif isinstance(obj, tuple):
+        # arrays in tuples cannot be replaced, but lists in them can
+        items = [(None, v) for v in obj]
+    elif all((
+        hasattr(obj, '__dict__'), not isinstance(obj, type),
+        type(obj).__module__ != 'builtins',
+    )):
+        yield from _iter_array_slots(vars(obj), min_bytes, visited)
+        return
+    else:
+        return
+    for key, value in items:
+        if isinstance(value, array):
+            n_bytes = value.itemsize * len(value)
+            if all((
+                key is not None,
+                value.typecode in _SPILLABLE_TYPECODES,
+                n_bytes >= min_bytes,
+            )):
+                yield obj, key, value
+        elif not isinstance(value, (str, bytes, SpilledArray)):
+            yield from _iter_array_slots(value, min_bytes, visited)
+
+
+class ArraySpiller:
+    """Spill the largest arrays of parsed stages when they exceed a budget.
+
+    Parameters
+    ----------
+    budget : int
+        Bytes of arrays kept in memory by all tracked stages.
+    min_bytes : int
+        Arrays smaller than this are neither counted nor spilled.
+    spill_dir : path-like object, optional
+        Folder to create the temporary spill folder in, default system
+        temporary folder.
+
+    Examples
+    --------
+
+        >>> spiller = ArraySpiller(parse_size('1G'))
+        >>> spiller.track(stage, stage.result_info)
+        >>> spiller.release(stage)    # unmap after the stage is rendered
+
+    """
+
+    def __init__(self, budget, min_bytes=1 << 16, spill_dir=None):
+        self.budget = budget
+        self.min_bytes = min_bytes
+        self.spill_dir = spill_dir
+        self._dir = None
+        # key -> list of (container, slot key, array) still in memory
+        self._resident = OrderedDict()
+        self._spilled = OrderedDict()
+
+    @property
+    def resident_bytes(self):
+        """Bytes of tracked arrays still in memory."""
+        return sum(
+            arr.itemsize * len(arr)
+            for slots in self._resident.values() for _, _, arr in slots
+        )
+
+    def track(self, key, result_info):
+        """Track arrays in *result_info* of a stage identified by *key*,
+        then spill the largest arrays of all stages until within budget."""
+        self.forget(key)
+        self._resident[key] = list(
+            _iter_array_slots(result_info, self.min_bytes, set())
+        )
+        self._spilled[key] = []
+        resident = self.resident_bytes
+        if resident <= self.budget:
+            return
+        candidates = sorted(
+            (
+                (slot[2].itemsize * len(slot[2]), k, slot)
+                for k, slots in self._resident.items() for slot in slots
+            ),
+            key=lambda t: t[0], reverse=True
+        )
+        n_spilled, n_bytes = 0, 0
+        for nbytes, k, slot in candidates:
+            if resident <= self.budget:
+                break
+            self._spill(k, slot)
+            resident -= nbytes
+            n_spilled += 1
+            n_bytes += nbytes
+        logger.info(
+            "Spilled {} arrays ({:.1f} MB) to {}, {:.1f} MB kept in memory"
+            .format(
+                n_spilled, n_bytes / 1e6, self._dir.path, resident / 1e6
+            )
+        )
+
+    def _spill(self, key, slot):
+        container, slot_key, arr = slot
+        if self._dir is None:
+            self._dir = _SpillDir(self.spill_dir)
+        spilled = SpilledArray.from_array(arr, self._dir)
+        container[slot_key] = spilled
+        self._resident[key] = [s for s in self._resident[key] if s is not slot]
+        self._spilled[key].append(spilled)
+
+    def release(self, key=None):
+        """Unmap spilled arrays of *key*, or of all stages if None."""
+        keys = list(self._spilled) if key is None else [key]
+        for k in keys:
+            for spilled in self._spilled.get(k, ()):
+                spilled.release()
+
+    def forget(self, key):
+        """Stop tracking arrays of *key*, e.g. when its stage is released."""
+        self.release(key)
+        self._resident.pop(key, None)
+        self._spilled.pop(key, None)
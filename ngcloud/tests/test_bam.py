@@ -0,0 +1,97 @@
+import zlib
+import random
+import struct
+import shutil
+import tempfile
+from pathlib import Path
+from nose.tools import eq_, ok_
+from ngcloud.bam import read_bam_stats, bgzf_block_offsets
+
+
+def _bgzf_block(data):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+    cdata = compressor.compress(data) + compressor.flush()
+    header = struct.pack('<4BI2BH', 31, 139, 8, 4, 0, 0, 255, 6)
+    bsize = len(header) + 6 + len(cdata) + 8 - 1
+    extra = struct.pack('<2BHH', 66, 67, 2, bsize)
+    trailer = struct.pack('<II', zlib.crc32(data) & 0xffffffff, len(data))
+    return header + extra + cdata + trailer
+
+
+def _record(name, flag, ref_id, mapq, next_ref_id, tlen, seq_len=20):
+    read_name = name.encode() + b'\0'
+    body = struct.pack(
+        '<iiBBHHHiiii', ref_id, 100, len(read_name), mapq, 4680, 1, flag,
+        seq_len, next_ref_id, 300, tlen
+    ) + read_name + struct.pack('<I', seq_len << 4)
+    body += b'\x11' * ((seq_len + 1) // 2) + b'\x1e' * seq_len
+    return struct.pack('<i', len(body)) + body
+
+
+def write_bam(path, records, refs=('chr1', 'chr2'), block_data_size=500):
+    """Write records into a BAM of small BGZF blocks, for testing."""
+    text = b'@HD\tVN:1.6\n'
+    data = b'BAM\x01' + struct.pack('<i', len(text)) + text
+    data += struct.pack('<i', len(refs))
+    for ref in refs:
+        name = ref.encode() + b'\0'
+        data += struct.pack('<i', len(name)) + name + struct.pack('<i', 1000)
+    data += b''.join(_record(*r) for r in records)
+    with open(str(path), 'wb') as f:
+        for i in range(0, len(data), block_data_size):
+            f.write(_bgzf_block(data[i:i + block_data_size]))
+        f.write(_bgzf_block(b''))
+
+
+def random_records(n_pairs, seed=0):
+    rng = random.Random(seed)
+    records = []
+    for i in range(n_pairs):
+        name = 'read{}'.format(i)
+        kind = rng.random()
+        mapq = rng.choice([0, 3, 25, 60])
+        tlen = rng.randint(100, 1200)
+        if kind < 0.7:
+            records += [(name, 99, 0, mapq, 0, tlen),
+                        (name, 147, 0, mapq, 0, -tlen)]
+        elif kind < 0.8:
+            records += [(name, 65, 0, mapq, 1, 0), (name, 129, 1, mapq, 0, 0)]
+        elif kind < 0.9:
+            records += [(name, 73, 1, mapq, 1, 0), (name, 133, 1, 0, 1, 0)]
+        else:
+            records += [(name, 1123, 0, mapq, 0, tlen),
+                        (name, 419, 1, mapq, 0, 0)]
+    return records
+
+
+def test_read_bam_stats():
+    root = Path(tempfile.mkdtemp())
+    try:
+        records = random_records(2000)
+        write_bam(root / 'a.bam', records)
+        ok_(len(bgzf_block_offsets(root / 'a.bam')) > 64)
+        stats = read_bam_stats(root / 'a.bam', workers=1).as_dict()
+        eq_(read_bam_stats(root / 'a.bam', workers=4).as_dict(), stats)
+
+        flags = [r[1] for r in records]
+        eq_(stats['total'], len(records))
+        eq_(stats['secondary'], sum(1 for f in flags if f & 0x100))
+        eq_(stats['duplicates'], sum(1 for f in flags if f & 0x400))
+        eq_(stats['mapped'], sum(1 for f in flags if not f & 0x4))
+        eq_(stats['properly_paired'], sum(
+            1 for f in flags if f & 0x902 == 0x2 and not f & 0x4
+        ))
+        eq_(stats['singletons'], sum(1 for f in flags if f == 73))
+        eq_(stats['mate_diff_chr'], sum(1 for f in flags if f in (65, 129)))
+        eq_(sum(stats['insert_size_hist'].values()), sum(
+            1 for r in records if r[1] in (99, 1123)
+        ))
+        eq_(sum(stats['mapq_hist'].values()), stats['primary_mapped'])
+        ok_(not stats['sampled'])
+
+        preview = read_bam_stats(root / 'a.bam', max_blocks=10).as_dict()
+        ok_(preview['sampled'])
+        eq_(preview['n_blocks'], 10)
+        ok_(0 < preview['total'] < stats['total'])
+    finally:
+        shutil.rmtree(str(root))
@@ -0,0 +1,88 @@
+import os
+import shutil
+import tempfile
+from types import SimpleNamespace
+from pathlib import Path
+from nose.tools import eq_, ok_
+from ngcloud.pipe import get_shared_template_root
+from ngcloud.report import Stage
+from ngcloud.cache import ParseCache, input_fingerprint
+
+
+class SummaryTxtStage(Stage):
+    template_find_paths = [get_shared_template_root()]
+    parse_inputs = ['*/summary.txt']
+    n_parsed = 0
+
+    def parse(self):
+        type(self).n_parsed += 1
+        self.result_info['lines'] = sorted(
+            p.read_text() for p in self.result_root.glob('*/summary.txt')
+        )
+
+
+def test_parse_cache():
+    tmp = Path(tempfile.mkdtemp())
+    try:
+        (tmp / 'A').mkdir()
+        summary = tmp / 'A' / 'summary.txt'
+        summary.write_text('one')
+        job_info = SimpleNamespace(root_path=tmp)
+        stage = SummaryTxtStage(job_info, tmp / 'report')
+        stage.parse_cache = ParseCache(tmp / 'cache')
+
+        stage.ensure_parsed()
+        stage.release()
+        eq_(stage.ensure_parsed(), {'lines': ['one']})
+        eq_(SummaryTxtStage.n_parsed, 1)
+
+        summary.write_text('two')
+        os.utime(str(summary), ns=(0, 0))
+        stage.release()
+        eq_(stage.ensure_parsed(), {'lines': ['two']})
+        eq_(SummaryTxtStage.n_parsed, 2)
+        eq_(len(list((tmp / 'cache').iterdir())), 2)
+    finally:
+        shutil.rmtree(str(tmp))
+
+
+def test_fingerprint_sample_sheet():
+    tmp = Path(tempfile.mkdtemp())
+    try:
+        sheet = tmp / 'samples.tsv'
+        sheet.write_text('name\nA\n')
+        job_info = SimpleNamespace(root_path=tmp, source_files=[sheet])
+        stage = SummaryTxtStage(job_info, tmp / 'report')
+        digest = input_fingerprint(stage)
+        sheet.write_text('name\nA\nB\n')
+        ok_(input_fingerprint(stage) != digest)
+    finally:
+        shutil.rmtree(str(tmp))
+
+
+def test_parse_cache_prune():
+    tmp = Path(tempfile.mkdtemp())
+    try:
+        cache = ParseCache(tmp, max_size=250, max_age=3600)
+        for i, mtime in enumerate([0, 4e9, 4e9 + 1, 4e9 + 2]):
+            pth = tmp / '{}.pickle'.format(i)
+            pth.write_bytes(b'x' * 100)
+            os.utime(str(pth), (mtime, mtime))
+        # expired 0, then least recently used 1 beyond max_size
+        eq_(cache.prune(), 2)
+        eq_(sorted(p.name for p in tmp.iterdir()), ['2.pickle', '3.pickle'])
+    finally:
+        shutil.rmtree(str(tmp))
+
+
+def test_fingerprint_parse_options():
+    tmp = Path(tempfile.mkdtemp())
+    try:
+        stage = SummaryTxtStage(SimpleNamespace(root_path=tmp), tmp / 'r')
+        stage.parse_options = ['max_lines']
+        stage.max_lines = None
+        digest = input_fingerprint(stage)
+        stage.max_lines = 10
+        ok_(input_fingerprint(stage) != digest)
+    finally:
+        shutil.rmtree(str(tmp))
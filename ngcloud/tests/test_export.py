@@ -0,0 +1,55 @@
+from decimal import Decimal
+from collections import OrderedDict
+from nose.tools import eq_, ok_
+from ngcloud.export import jsonify, flatten_result_info
+from ngcloud.pipe.tuxedo import AlignTable, OverSeq
+
+
+def test_jsonify():
+    over_seq = OverSeq('ACGT', '10', '1.234', 'No Hit')
+    eq_(jsonify({'a': Decimal('1.5'), 'b': float('inf'), 'c': over_seq}), {
+        'a': 1.5, 'b': None,
+        'c': {'seq': 'ACGT', 'count': 10.0, 'percentage': 1.23,
+              'possible_source': 'No Hit'},
+    })
+
+
+def test_flatten_result_info():
+    table = AlignTable()
+    table.append('S1', dict.fromkeys(AlignTable.COLUMNS, 1))
+    info = OrderedDict([
+        ('detail_info', table),
+        ('qc_info', {'S1_R1': {'Basic Statistics': 'pass'}}),
+        ('sep_rate', {'S1': [0.5, 0.25]}),
+        ('overall_pair_percent', 44.28),
+        ('DETAIL_SEP', [('Input', 'input')]),
+        ('stage_mapping', [('qc', 'qc.html', 'QC')]),
+    ])
+    rows = list(flatten_result_info(info, ['S1', 'S1_R1']))
+    eq_(rows[0], ('S1', 'detail_info.left_input', 1))
+    eq_(rows[len(AlignTable.COLUMNS):], [
+        ('S1_R1', 'qc_info.Basic Statistics', 'pass'),
+        ('S1', 'sep_rate.0', 0.5),
+        ('S1', 'sep_rate.1', 0.25),
+        (None, 'overall_pair_percent', 44.28),
+    ])
+
+
+def test_flatten_namedtuple_and_constants():
+    from ngcloud.pipe.tuxedo import DiffGene
+    gene = DiffGene(*range(len(DiffGene._fields)))
+    info = {'top_genes': [gene], 'PAGE_SIZE': 50, 'DATA_FIELDS': ['gene']}
+    rows = list(flatten_result_info(info))
+    eq_(rows[:2], [
+        (None, 'top_genes.0.test_id', 0), (None, 'top_genes.0.gene', 1)
+    ])
+    eq_(len(rows), len(DiffGene._fields))
+
+
+def test_check_formats():
+    from nose.tools import assert_raises
+    from ngcloud.export import check_formats
+    check_formats(['json', 'sqlite'])
+    with assert_raises(ValueError) as cm:
+        check_formats(['json', 'xlsx'])
+    ok_("'xlsx'" in str(cm.exception))
@@ -0,0 +1,50 @@
+import gzip
+import shutil
+import tempfile
+from pathlib import Path
+from nose.tools import eq_, ok_
+from ngcloud.pipe.gatk import read_vcf_stats
+
+_VCF = '\n'.join([
+    '##fileformat=VCFv4.2',
+    '\t'.join([
+        '#CHROM', 'POS', 'ID', 'REF', 'ALT', 'QUAL', 'FILTER', 'INFO',
+        'FORMAT', 'S1', 'S2'
+    ]),
+    '1\t100\t.\tA\tG\t50\tPASS\tDP=12\tGT\t0/1\t1/1',
+    '1\t200\t.\tC\tA\t5\tLowQual\tDP=3\tGT\t0/0\t./.',
+    '2\t300\t.\tT\tC,TA\t.\tPASS\tAC=1\tGT:DP\t1|2:4\t0/0:3',
+    '2\t400\t.\tGA\tG\t1500\tPASS\tDP=600\tGT\t1/1\t0|1',
+]) + '\n'
+
+
+def test_read_vcf_stats():
+    root = Path(tempfile.mkdtemp())
+    try:
+        with (root / 'calls.vcf').open('w') as f:
+            f.write(_VCF)
+        with gzip.open(str(root / 'calls.vcf.gz'), 'wt') as f:
+            f.write(_VCF)
+        stats = read_vcf_stats(root / 'calls.vcf', chunk_size=3)
+        eq_(
+            read_vcf_stats(root / 'calls.vcf.gz', chunk_size=1).as_dict(),
+            stats.as_dict()
+        )
+    finally:
+        shutil.rmtree(str(root))
+
+    eq_(stats.n_records, 4)
+    eq_((stats.n_snv, stats.n_indel, stats.n_other), (3, 2, 0))
+    eq_((stats.n_transition, stats.n_transversion), (2, 1))
+    ok_(stats.titv == 2)
+    eq_(list(stats.chrom_counts.items()), [('1', 2), ('2', 2)])
+    eq_(stats.filter_counts['PASS'], 3)
+    eq_(dict(stats.genotypes['S1']), {'het': 2, 'hom_ref': 1, 'hom_alt': 1})
+    eq_(dict(stats.genotypes['S2']),
+        {'het': 1, 'hom_ref': 1, 'hom_alt': 1, 'missing': 1})
+    summary = stats.as_dict()
+    eq_(summary['qual_hist']['0-10'], 1)
+    eq_(summary['qual_hist']['1000+'], 1)
+    eq_(summary['n_no_qual'], 1)
+    eq_(summary['dp_hist']['500+'], 1)
+    eq_(summary['n_no_dp'], 1)
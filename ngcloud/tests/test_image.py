@@ -0,0 +1,33 @@
+import shutil
+import tempfile
+from pathlib import Path
+from nose.tools import eq_, ok_
+from nose.plugins.skip import SkipTest
+from ngcloud import image
+
+
+def test_thumb_path():
+    eq_(image.thumb_path('pics/A_R1/foo.png'), 'pics/A_R1/_thumb/foo.png')
+
+
+def test_image_optimizer():
+    if not image.is_available():
+        raise SkipTest("Pillow not installed")
+    tmp = Path(tempfile.mkdtemp())
+    try:
+        src = tmp / 'plot.png'
+        image.Image.new('RGB', (800, 600), 'white').save(str(src))
+        for _ in range(2):
+            optimizer = image.ImageOptimizer(
+                tmp / 'dst', cache_dir=tmp / 'cache', max_workers=1
+            )
+            optimizer.submit(src, Path('A', 'plot.png'))
+            optimizer.submit(src, Path('B', 'plot.png'))
+            optimizer.join()
+        eq_(len(list((tmp / 'cache').iterdir())), 2)
+        ok_((tmp / 'dst' / 'B' / 'plot.png').exists())
+        with image.Image.open(str(tmp / 'dst' / 'A' / '_thumb' / 'plot.png')) \
+                as thumb:
+            eq_(thumb.size, (400, 300))
+    finally:
+        shutil.rmtree(str(tmp))
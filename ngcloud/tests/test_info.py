@@ -0,0 +1,68 @@
+import shutil
+import tempfile
+from pathlib import Path
+from nose.tools import ok_, eq_, assert_raises
+from nose.plugins.skip import SkipTest
+from ngcloud.info import SampleSheet, Sample
+
+SHEET_ROWS = [
+    ['name', 'pair_end', 'stranded', 'batch'],
+    ['A', 'R1', '', '1'],
+    ['A', 'R2', '', '1'],
+    ['B', 'False', 'true', '2'],
+    ['C', 'R1', 'no'],
+]
+
+
+def test_sample_sheet_text():
+    tmp = Path(tempfile.mkdtemp())
+    try:
+        for sheet_name, delimiter in [('s.tsv', '\t'), ('s.csv', ',')]:
+            (tmp / sheet_name).write_text(
+                '\n'.join(delimiter.join(row) for row in SHEET_ROWS) + '\n\n'
+            )
+            sheet = SampleSheet.read(tmp / sheet_name)
+            eq_(len(sheet), 4)
+            eq_(sheet.columns['batch'], ['1', '1', '2', ''])
+            eq_([s.full_name for s in sheet], ['A_R1', 'A_R2', 'B', 'C_R1'])
+            eq_((sheet[2].pair_end, sheet[2].stranded), (False, True))
+            eq_((sheet[0].stranded, sheet[3].stranded), (None, False))
+            ok_(sheet[0] is sheet[0])
+
+            groups = sheet.groups()
+            eq_(list(groups), ['A', 'B', 'C'])
+            eq_(groups['A'], sheet[:2])
+            ok_('B' in groups and 'D' not in groups)
+    finally:
+        shutil.rmtree(str(tmp))
+
+
+def test_sample_sheet_parquet():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SkipTest('pyarrow is not installed')
+    tmp = Path(tempfile.mkdtemp())
+    try:
+        pq.write_table(pa.Table.from_pydict({
+            'name': ['B', 'A', 'A '],
+            'pair_end': [None, 'R1', 'R2'],
+            'stranded': [None, True, True],
+        }), str(tmp / 'samples.parquet'))
+        sheet = SampleSheet.read(tmp / 'samples.parquet')
+        eq_([s.full_name for s in sheet], ['B', 'A_R1', 'A_R2'])
+        eq_(sheet[1].stranded, True)
+        groups = sheet.groups()
+        eq_(list(groups), ['B', 'A'])
+        eq_(groups['A'], sheet[1:])
+    finally:
+        shutil.rmtree(str(tmp))
+
+
+def test_sample_sheet_invalid():
+    with assert_raises(ValueError):
+        SampleSheet({'sample': ['A']})
+    with assert_raises(ValueError):
+        SampleSheet({'name': ['A'], 'pair_end': ['R3']})[0]
+    eq_(repr(SampleSheet({'name': ['A']})[0]), repr(Sample('A')))
@@ -0,0 +1,65 @@
+import os
+import json
+import sys
+import tempfile
+from array import array
+from types import SimpleNamespace
+from pathlib import Path
+from nose.tools import eq_, ok_
+from ngcloud.pipe import get_shared_template_root
+from ngcloud.report import Stage
+from ngcloud.memprof import MemoryProfiler, deep_sizeof
+
+
+class LargeStage(Stage):
+    template_find_paths = [get_shared_template_root()]
+
+    def parse(self):
+        self.result_info['rows'] = [str(i) * 10 for i in range(20000)]
+        self.result_info['values'] = array('d', range(1000))
+
+
+def test_deep_sizeof():
+    values = array('d', range(1000))
+    shared = [values, values]
+    n_bytes = values.itemsize * len(values)
+    ok_(deep_sizeof(shared) < sys.getsizeof(shared) + 2 * n_bytes)
+    ok_(deep_sizeof({'a': shared}) > n_bytes)
+    obj = SimpleNamespace(values=values)
+    ok_(deep_sizeof(obj) > deep_sizeof(values))
+
+
+def test_profile_stage_phases():
+    fd, json_path = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    try:
+        job_info = SimpleNamespace(root_path=Path('.'), id='1')
+        stage = LargeStage(job_info, Path('report'))
+        profiler = MemoryProfiler(json_path, top=3)
+        profiler.start()
+        try:
+            with profiler.phase(stage, 'parse'):
+                stage.ensure_parsed()
+            profiler.record_result_info(stage)
+            with profiler.phase(stage, 'render'):
+                stage.render()
+        finally:
+            profiler.stop()
+
+        eq_([(p['stage'], p['phase']) for p in profiler.phases],
+            [('LargeStage', 'parse'), ('LargeStage', 'render')])
+        parse = profiler.phases[0]
+        ok_(parse['traced_peak'] > 20000 * 50)
+        ok_(any(
+            a['file'] == __file__ for a in parse['top_allocations']
+        ))
+        sizes = profiler.result_info['LargeStage']
+        ok_(sizes['rows'] > sizes['values'] > 8000)
+
+        with open(json_path) as f:
+            eq_(json.load(f)['phases'][1]['phase'], 'render')
+        table = profiler.format_table()
+        ok_('LargeStage           parse' in table)
+        ok_('rows' in table.splitlines()[-2])
+    finally:
+        os.remove(json_path)
@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+from nose.tools import eq_
+from ngcloud.multi import merge_stage_results, MultiJobReport
+
+
+class QCStage:
+    def __init__(self, result_info):
+        self.result_info = result_info
+
+
+def _fake_report(job_id, result_info):
+    job_info = SimpleNamespace(
+        id=job_id, sample_group={'S1': []},
+        sample_list=[SimpleNamespace(name='S1', full_name='S1')],
+    )
+    return SimpleNamespace(
+        job_info=job_info, _stages=[QCStage(result_info)]
+    )
+
+
+def test_merge_stage_results():
+    reports = [
+        _fake_report('1', {'rate': 0.5, 'reads': {'S1': 10}}),
+        _fake_report('2', {'rate': 0.7, 'over_seq': {'S1': [1, 2]}}),
+    ]
+    merged = merge_stage_results(reports)
+    eq_(list(merged), ['QCStage'])
+    eq_(merged['QCStage'], [
+        (None, 'rate', [0.5, 0.7]),
+        ('S1', 'reads', [10, None]),
+    ])
+
+
+def test_job_labels():
+    job_infos = [
+        SimpleNamespace(id=1, root_path=SimpleNamespace(name='a')),
+        SimpleNamespace(id=2, root_path=SimpleNamespace(name='b')),
+    ]
+    eq_(MultiJobReport._job_labels(job_infos), ['1', '2'])
+    job_infos[1].id = 1
+    eq_(MultiJobReport._job_labels(job_infos), ['1-a', '1-b'])
+    job_infos[1].root_path.name = 'a'
+    eq_(MultiJobReport._job_labels(job_infos), ['1-a-1', '1-a-2'])
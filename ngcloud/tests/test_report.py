@@ -0,0 +1,183 @@
+import os
+import pickle
+import shutil
+import tempfile
+from types import SimpleNamespace
+from pathlib import Path
+from nose.tools import eq_, ok_
+from ngcloud.pipe import get_shared_template_root
+from ngcloud.report import (
+    Stage, SummaryStage, Report, NormalStages,
+    _render_snapshot, _render_stage_template,
+)
+
+
+class CountingStage(Stage):
+    template_find_paths = [get_shared_template_root()]
+    n_parsed = 0
+
+    def parse(self):
+        type(self).n_parsed += 1
+        self.result_info['value'] = type(self).n_parsed
+
+
+def test_normal_stages_parse_on_access():
+    job_info = SimpleNamespace(root_path=Path('.'))
+    stage = CountingStage(job_info, Path('report'))
+    normal_stages = NormalStages([stage])
+    eq_(list(normal_stages), ['CountingStage'])
+    eq_(CountingStage.n_parsed, 0)
+    eq_(normal_stages['CountingStage']['value'], 1)
+    eq_(normal_stages['CountingStage']['value'], 1)
+    stage.release()
+    eq_(stage.result_info, {})
+    eq_(normal_stages['CountingStage']['value'], 2)
+
+
+def test_load_report_class():
+    from ngcloud.report import load_report_class, available_pipes
+    from ngcloud.pipe.tuxedo import TuxedoReport
+    ok_('tuxedo' in available_pipes())
+    for name in ['tuxedo', 'ngcloud.pipe.tuxedo.TuxedoReport',
+                 'ngcloud.pipe.tuxedo:TuxedoReport']:
+        ok_(load_report_class(name) is TuxedoReport)
+
+
+def test_entry_points_take_precedence():
+    import ngcloud.pipe
+    from ngcloud.report import available_pipes
+    registered = ngcloud.pipe._registered_pipes
+    ngcloud.pipe._registered_pipes = {'tuxedo': 'mypkg.report:MyTuxedo'}
+    try:
+        pipes = available_pipes()
+        eq_(pipes['tuxedo'], 'mypkg.report:MyTuxedo')
+        eq_(pipes['gatk'], 'ngcloud.pipe.gatk:GATKReport')
+    finally:
+        ngcloud.pipe._registered_pipes = registered
+
+
+def test_render_snapshot():
+    job_info = SimpleNamespace(root_path=Path('.'), id='1')
+    stage = CountingStage(job_info, Path('report'))
+    snapshot = _render_snapshot(stage)
+    ok_(stage._parsed)
+    clone = pickle.loads(snapshot)
+    eq_(clone.result_info, stage.result_info)
+    eq_(
+        _render_stage_template(snapshot, 'stage.html'),
+        stage.render()['stage.html']
+    )
+
+
+class RequiringStage(Stage):
+    template_find_paths = [get_shared_template_root()]
+    required_inputs = [
+        '{group}/summary.txt',
+        ('{sample.full_name}/data.txt', '{sample.full_name}.zip'),
+        'overall.txt',
+    ]
+
+
+def test_preflight_reports_all_missing():
+    from nose.tools import assert_raises
+    from ngcloud.preflight import check_inputs, MissingInputError
+    tmp = Path(tempfile.mkdtemp())
+    try:
+        for name in ['A/summary.txt', 'A_R1/data.txt', 'overall.txt']:
+            (tmp / name).parent.mkdir(exist_ok=True)
+            (tmp / name).write_text('')
+        (tmp / 'A_R2.zip').write_text('')
+        samples = [
+            SimpleNamespace(name=name, full_name=full_name)
+            for name, full_name in [('A', 'A_R1'), ('A', 'A_R2'), ('B', 'B')]
+        ]
+        job_info = SimpleNamespace(
+            root_path=tmp, sample_list=samples,
+            sample_group={'A': samples[:2], 'B': samples[2:]}
+        )
+        stage = RequiringStage(job_info, Path('report'))
+        with assert_raises(MissingInputError) as cm:
+            check_inputs([stage], workers=2)
+        eq_([(m.stage, m.target) for m in cm.exception.missing], [
+            ('RequiringStage', 'B'), ('RequiringStage', 'B'),
+        ])
+        eq_(cm.exception.missing[1].paths, [tmp / 'B/data.txt', tmp / 'B.zip'])
+        ok_(isinstance(cm.exception, FileNotFoundError))
+
+        (tmp / 'B').mkdir()
+        (tmp / 'B/summary.txt').write_text('')
+        (tmp / 'B.zip').write_text('')
+        check_inputs([stage], workers=2)
+    finally:
+        shutil.rmtree(str(tmp))
+
+
+def _template_stage(tmp):
+    (tmp / 'tpl').mkdir()
+    (tmp / 'tpl' / 'page.html').write_text('old {{ result_info.value }}')
+    stage_cls = type('TemplateStage', (CountingStage,), {
+        'template_find_paths': [tmp / 'tpl'],
+        'template_entrances': 'page.html',
+    })
+    return stage_cls(SimpleNamespace(root_path=tmp), tmp / 'report')
+
+
+def _edit_template(tmp):
+    tpl = tmp / 'tpl' / 'page.html'
+    tpl.write_text('new {{ result_info.value }}')
+    # a different mtime even on file systems of coarse timestamps
+    os.utime(str(tpl), (0, 0))
+
+
+def test_render_reloads_modified_template():
+    tmp = Path(tempfile.mkdtemp())
+    try:
+        stage = _template_stage(tmp)
+        ok_(stage.render_template('page.html').startswith('old '))
+        _edit_template(tmp)
+        ok_(stage.render_template('page.html').startswith('new '))
+    finally:
+        shutil.rmtree(str(tmp))
+
+
+def test_update_reloads_modified_template():
+    tmp = Path(tempfile.mkdtemp())
+    try:
+        stage = _template_stage(tmp)
+        report = Report()
+        report.job_info = stage.job_info
+        report.report_root = tmp / 'report'
+        report.report_root.mkdir()
+        report._stages = [stage]
+        report.update()
+        page = report.report_root / 'page.html'
+        ok_(page.read_text().startswith('old '))
+        _edit_template(tmp)
+        report.update()
+        ok_(page.read_text().startswith('new '))
+    finally:
+        shutil.rmtree(str(tmp))
+
+
+def test_render_report_parses_once_and_releases():
+    tmp = Path(tempfile.mkdtemp())
+    try:
+        stage = _template_stage(tmp)
+        (tmp / 'tpl' / 'summary.html').write_text(
+            'sum {{ normal_stages.TemplateStage.value }}'
+        )
+        summary = type('Summary', (SummaryStage,), {
+            'template_find_paths': [tmp / 'tpl'],
+            'template_entrances': 'summary.html',
+        })(stage.job_info, tmp / 'report')
+        report = Report()
+        report._stages = [summary, stage]
+        report._release_rendered = True
+        n_parsed = type(stage).n_parsed
+        report.render_report()
+        eq_(type(stage).n_parsed, n_parsed + 1)
+        eq_(report.report_html['summary.html'], 'sum {}'.format(n_parsed + 1))
+        eq_(report.report_html['page.html'], 'old {}'.format(n_parsed + 1))
+        eq_(stage.result_info, {})
+    finally:
+        shutil.rmtree(str(tmp))
@@ -0,0 +1,29 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from nose.tools import eq_
+from ngcloud.serve import ReportPreview
+
+
+def test_find_static_stays_in_roots():
+    tmp = Path(tempfile.mkdtemp())
+    try:
+        root = tmp / 'static'
+        (root / 'css').mkdir(parents=True)
+        (root / 'css' / 'a.css').write_text('')
+        (tmp / 'secret.txt').write_text('')
+        os.symlink(str(tmp / 'secret.txt'), str(root / 'link.txt'))
+        preview = ReportPreview.__new__(ReportPreview)
+        preview._tmp_root = tmp / 'preview'
+        preview.static_files = {}
+        preview.static_roots = [root]
+
+        eq_(preview.find_static('css/a.css'), root / 'css' / 'a.css')
+        for rel_path in [
+            str(tmp / 'secret.txt'), '/' + str(tmp / 'secret.txt'),
+            '../secret.txt', 'css/../../secret.txt', 'link.txt',
+        ]:
+            eq_(preview.find_static(rel_path), None)
+    finally:
+        shutil.rmtree(str(tmp))
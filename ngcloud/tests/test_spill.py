@@ -0,0 +1,74 @@
+import pickle
+from array import array
+from types import SimpleNamespace
+from pathlib import Path
+from nose.tools import eq_, ok_, assert_raises
+from ngcloud.pipe import get_shared_template_root
+from ngcloud.pipe.tuxedo import AlignTable
+from ngcloud.report import Stage, _render_snapshot
+from ngcloud.spill import ArraySpiller, SpilledArray, parse_size
+
+
+def test_parse_size():
+    eq_(parse_size('512'), 512)
+    eq_(parse_size('1.5K'), 1536)
+    eq_(parse_size('2G'), 2 << 30)
+    eq_(parse_size('4MiB'), 4 << 20)
+    eq_(parse_size(100), 100)
+    with assert_raises(ValueError):
+        parse_size('lots')
+
+
+def test_spill_largest_over_budget():
+    small = array('d', range(10))
+    table = AlignTable()
+    for i in range(3000):
+        table.append(str(i), {'left_input': i, 'left_map': i // 2})
+    info_a = {'table': table, 'small': small}
+    info_b = {'rates': [array('d', [0.5] * 20000)]}
+
+    spiller = ArraySpiller(300000, min_bytes=1000)
+    spiller.track('a', info_a)
+    # 11 columns of 24 KB and the paired flags fit in the budget
+    eq_(spiller.resident_bytes, 11 * 24000 + 3000)
+    ok_(all(isinstance(c, array) for c in table.columns.values()))
+
+    spiller.track('b', info_b)
+    rates = info_b['rates'][0]
+    ok_(isinstance(rates, SpilledArray))
+    ok_(spiller.resident_bytes <= 300000)
+    ok_(info_a['small'] is small)
+    eq_(table['2999']['left_map'], 1499)
+    eq_(table.ratio('left_map', 'left_input')[2], 0.5)
+
+    eq_(len(rates), 20000)
+    eq_(rates[-1], 0.5)
+    eq_(rates[:2], array('d', [0.5, 0.5]))
+    spiller.release('b')
+    ok_(not rates.mapped)
+    eq_(sum(rates), 10000.0)
+    eq_(list(pickle.loads(pickle.dumps(rates))), list(rates))
+
+
+class ArrayStage(Stage):
+    template_find_paths = [get_shared_template_root()]
+
+    def parse(self):
+        self.result_info['values'] = array('Q', range(10000))
+
+
+def test_stage_spilled_when_parsed():
+    job_info = SimpleNamespace(root_path=Path('.'), id='1')
+    stage = ArrayStage(job_info, Path('report'))
+    stage.spiller = ArraySpiller(0, min_bytes=1)
+    stage.ensure_parsed()
+    values = stage.result_info['values']
+    ok_(isinstance(values, SpilledArray))
+    eq_(values[9999], 9999)
+
+    clone = pickle.loads(_render_snapshot(stage))
+    ok_(clone.spiller is None)
+    eq_(clone.result_info['values'].to_array(), array('Q', range(10000)))
+
+    stage.release()
+    ok_(not values.mapped)
@@ -0,0 +1,213 @@
+import json
+import math
+import shutil
+import tempfile
+import zipfile
+from pathlib import Path
+from nose.tools import ok_, eq_
+from ngcloud.pipe.tuxedo import (
+    read_gene_exp_diff, parse_align_summary, AlignTable, CuffdiffStage,
+    QCStage
+)
+from ngcloud.util import ZipMember
+
+_GENE_EXP_DIFF = '\n'.join([
+    '\t'.join([
+        'test_id', 'gene_id', 'gene', 'locus', 'sample_1', 'sample_2',
+        'status', 'value_1', 'value_2', 'log2(fold_change)', 'test_stat',
+        'p_value', 'q_value', 'significant'
+    ]),
+    'G1\tG1\tA\tchr1:1-10\tq1\tq2\tOK\t1\t4\t2\t-3\t0.001\t0.01\tyes',
+    'G2\tG2\tB\tchr1:20-30\tq1\tq2\tNOTEST\t0\t0\t0\t0\t1\t1\tno',
+    'G3\tG3\tC\tchr2:1-10\tq1\tq2\tOK\t0\t3\tinf\tnan\t5e-05\t0.002\tyes',
+    'G4\tG4\tD\tchr2:5-10\tq1\tq2\tOK\t8\t1\t-3\t2\t0.04\t0.3\tno',
+]) + '\n'
+
+
+_FASTQC_DATA = '\n'.join([
+    '##FastQC\t0.10.1',
+    '>>Basic Statistics\tpass',
+    '#Measure\tValue',
+    'Total Sequences\t100',
+    '>>END_MODULE',
+    '>>Overrepresented sequences\twarn',
+    '#Sequence\tCount\tPercentage\tPossible Source',
+    'ACGTACGT\t10\t10.0\tNo Hit',
+    '>>END_MODULE',
+]) + '\n'
+
+
+class _FakeSample:
+    def __init__(self, full_name):
+        self.full_name = full_name
+
+
+class _FakeJobInfo:
+    sample_group = {}
+    sample_list = []
+
+    def __init__(self, root_path, sample_list=()):
+        self.root_path = root_path
+        if sample_list:
+            self.sample_list = list(sample_list)
+
+
+def _make_job():
+    job_root = Path(tempfile.mkdtemp())
+    (job_root / '7_cuffdiff').mkdir()
+    with (job_root / '7_cuffdiff' / 'gene_exp.diff').open('w') as f:
+        f.write(_GENE_EXP_DIFF)
+    return job_root
+
+
+def test_read_gene_exp_diff():
+    job_root = _make_job()
+    try:
+        genes = read_gene_exp_diff(job_root / '7_cuffdiff' / 'gene_exp.diff')
+    finally:
+        shutil.rmtree(str(job_root))
+    eq_([g.gene for g in genes], ['A', 'B', 'C', 'D'])
+    eq_(genes[0].q_value, 0.01)
+    ok_(math.isinf(genes[2].log2_fold_change))
+    eq_([g.significant for g in genes], [True, False, True, False])
+
+
+def test_cuffdiff_stage_index_and_data():
+    job_root = _make_job()
+    report_root = job_root / 'report'
+    try:
+        stage = CuffdiffStage(_FakeJobInfo(job_root), report_root)
+        # static files of an unparsed stage are copied after parsing it
+        stage.copy_static()
+        info = stage.result_info
+        eq_(info['n_genes'], 4)
+        eq_(info['n_tested'], 3)
+        eq_([g.gene for g in info['top_genes']], ['C', 'A'])
+        # the full table is freed once written
+        eq_((stage._diff_genes, stage._diff_index), ([], None))
+
+        data_root = report_root / 'static' / 'cuffdiff'
+        with (data_root / 'gene_exp_index.json').open() as f:
+            index = json.load(f)
+        with (data_root / 'gene_exp.jsonl').open() as f:
+            rows = [json.loads(line) for line in f]
+    finally:
+        shutil.rmtree(str(job_root))
+    eq_(index['by_q_value'], [2, 0, 3, 1])
+    eq_(index['by_fold_change'], [2, 3, 0, 1])
+    eq_(index['significant'], [2, 0])
+    eq_(len(rows), 4)
+    eq_(rows[2][CuffdiffStage.DATA_FIELDS.index('log2_fold_change')], None)
+
+
+def test_cuffdiff_stage_without_result():
+    job_root = Path(tempfile.mkdtemp())
+    try:
+        stage = CuffdiffStage(_FakeJobInfo(job_root), job_root / 'report')
+        eq_(stage.result_root, job_root / 'cuffdiff')
+        stage.copy_static()
+        eq_(stage.result_info['diff_found'], False)
+        ok_('cuffdiff' in stage.render_template('cuffdiff.html').lower())
+    finally:
+        shutil.rmtree(str(job_root))
+
+
+def test_qc_stage_reads_fastqc_zip():
+    job_root = Path(tempfile.mkdtemp())
+    report_root = job_root / 'report'
+    try:
+        (job_root / '1_fastqc').mkdir()
+        archive = job_root / '1_fastqc' / 'A_R1_fastqc.zip'
+        with zipfile.ZipFile(str(archive), 'w') as zf:
+            zf.writestr('A_R1_fastqc/fastqc_data.txt', _FASTQC_DATA)
+            zf.writestr('A_R1_fastqc/Images/duplication_levels.png', b'png')
+            zf.writestr('A_R1_fastqc/Icons/fastqc_icon.png', b'icon')
+        stage = QCStage(
+            _FakeJobInfo(job_root, [_FakeSample('A_R1')]), report_root
+        )
+        stage.parse()
+        static_files = list(stage.iter_static_files())
+        stage.copy_static()
+        pics_dir = report_root / 'static' / 'qc_sample' / 'pics'
+        copied = (pics_dir / 'A_R1' / 'duplication_levels.png').read_bytes()
+    finally:
+        shutil.rmtree(str(job_root))
+    eq_(list(stage.result_info['qc_info']['A_R1'].items()), [
+        ('Basic Statistics', 'pass'), ('Overrepresented sequences', 'warn')
+    ])
+    eq_(stage.result_info['over_seq']['A_R1'][0].seq, 'ACGTACGT')
+    eq_(static_files, [(
+        ZipMember(archive, 'A_R1_fastqc/Images/duplication_levels.png'),
+        Path('qc_sample/pics/A_R1/duplication_levels.png')
+    )])
+    eq_(copied, b'png')
+
+
+def test_align_table():
+    counts = dict.fromkeys(AlignTable.COLUMNS, 0)
+    table = AlignTable()
+    table.append('A', dict(counts, left_input=100, left_map=80))
+    table.append('B', dict(counts, left_input=50, left_map=10))
+    eq_(list(table), ['A', 'B'])
+    eq_(table['B']['left_map'], 10)
+    eq_(list(table.ratio('left_map', 'left_input')), [0.8, 0.2])
+    eq_(list(table.ratio('left_map', 'right_input')), [0.0, 0.0])
+
+
+_ALIGN_SUMMARY_PE = """\
+Left reads:
+          Input     :  48256786
+           Mapped   :  26884051 (55.7% of input)
+            of these:    600784 ( 2.2%) have multiple alignments \
+(697919 have >1)
+Right reads:
+          Input     :  48256786
+           Mapped   :  25391501 (52.6% of input)
+            of these:    600784 ( 2.4%) have multiple alignments \
+(678632 have >1)
+54.2% overall read mapping rate.
+
+Aligned pairs:  18814684
+     of these:    600784 ( 3.2%) have multiple alignments
+                 4680778 (24.9%) are discordant alignments
+29.3% concordant pair alignment rate.
+"""
+
+_ALIGN_SUMMARY_SE = """\
+Reads:
+          Input     :  20000000
+           Mapped   :  18000000 (90.0% of input)
+            of these:   1000000 ( 5.6%) have multiple alignments \
+(2000 have >20)
+90.0% overall read mapping rate.
+"""
+
+
+def test_parse_align_summary_pair_end():
+    info = parse_align_summary(_ALIGN_SUMMARY_PE.splitlines())
+    eq_(info['left_input'], 48256786)
+    eq_(info['right_map'], 25391501)
+    eq_(info['left_multicount'], 697919)
+    eq_(info['align_pair'], 18814684)
+    eq_(info['align_multi'], 600784)
+    eq_(info['align_discord'], 4680778)
+    eq_(set(info), set(AlignTable.COLUMNS))
+
+
+def test_parse_align_summary_tophat21():
+    text = _ALIGN_SUMMARY_PE.replace(
+        '                 4680778', '          and:   4680778')
+    info = parse_align_summary(text.splitlines())
+    eq_(info['align_discord'], 4680778)
+
+
+def test_parse_align_summary_single_end():
+    info = parse_align_summary(_ALIGN_SUMMARY_SE.splitlines())
+    eq_(info, {
+        'left_input': 20000000, 'left_map': 18000000,
+        'left_multimap': 1000000, 'left_multicount': 2000,
+    })
+    table = AlignTable()
+    table.append('SE', info)
+    eq_(table['SE']['right_input'], None)
+    eq_(list(table.paired), [0])
@@ -0,0 +1,101 @@
+import shutil
+import tempfile
+import zipfile
+from pathlib import Path
+from nose.tools import eq_, ok_
+from ngcloud.util import (
+    CopyPool, merged_copytree, file_hash, ZipMember, discover_zip_members
+)
+
+
+def test_copy_pool():
+    tmp = Path(tempfile.mkdtemp())
+    try:
+        srcs = []
+        for i in range(20):
+            src = tmp / 'src' / 'f{}.txt'.format(i)
+            src.parent.mkdir(exist_ok=True)
+            src.write_text(str(i))
+            srcs.append(src)
+        pool = CopyPool(tmp / 'dst', max_workers=4)
+        for i, src in enumerate(srcs):
+            pool.submit(src, Path('sub', str(i % 5), 'f.txt'))
+        pool.submit(tmp / 'src' / 'missing', 'missing', ignore_errors=True)
+        n_files, n_bytes = pool.join()
+        eq_((n_files, n_bytes), (20, 30))
+        # the last file submitted to the same destination wins
+        eq_([
+            (tmp / 'dst' / 'sub' / str(i) / 'f.txt').read_text()
+            for i in range(5)
+        ], ['15', '16', '17', '18', '19'])
+    finally:
+        shutil.rmtree(str(tmp))
+
+
+def test_merged_copytree_sync():
+    tmp = Path(tempfile.mkdtemp())
+    try:
+        for root, content in [('a', 'old'), ('b', 'new')]:
+            (tmp / root / 'sub').mkdir(parents=True)
+            (tmp / root / 'sub' / 'f.txt').write_text(content)
+            (tmp / root / (root + '.txt')).write_text(content)
+        srcs = [tmp / 'a', tmp / 'b']
+        counts = merged_copytree(srcs, tmp / 'dst', sync='mtime')
+        eq_((counts['copied'], counts['skipped']), (3, 0))
+        eq_((tmp / 'dst' / 'sub' / 'f.txt').read_text(), 'new')
+
+        counts = merged_copytree(srcs, tmp / 'dst', sync='hash')
+        eq_((counts['copied'], counts['skipped']), (0, 3))
+        (tmp / 'b' / 'b.txt').write_text('newer')
+        counts = merged_copytree(srcs, tmp / 'dst', sync='mtime')
+        eq_((counts['copied'], counts['overwritten']), (1, 1))
+        eq_((tmp / 'dst' / 'b.txt').read_text(), 'newer')
+
+        # destination is created even without any source
+        merged_copytree([tmp / 'missing'], tmp / 'empty')
+        ok_((tmp / 'empty').is_dir())
+    finally:
+        shutil.rmtree(str(tmp))
+
+
+def test_copy_pool_dedupe():
+    tmp = Path(tempfile.mkdtemp())
+    try:
+        (tmp / 'src').mkdir()
+        for name, content in [('a', 'icon'), ('b', 'icon'), ('c', 'other')]:
+            (tmp / 'src' / name).write_text(content)
+        pool = CopyPool(tmp / 'dst', max_workers=4, dedupe=True)
+        for sample in ['S1', 'S2']:
+            for name in 'abc':
+                pool.submit(tmp / 'src' / name, Path(sample, name))
+        eq_(pool.join(), (2, 9))
+        dst_files = sorted((tmp / 'dst').glob('*/*'))
+        eq_(len(dst_files), 6)
+        eq_(len({f.stat().st_ino for f in dst_files}), 2)
+        eq_((tmp / 'dst' / 'S2' / 'b').read_text(), 'icon')
+    finally:
+        shutil.rmtree(str(tmp))
+
+
+def test_copy_pool_zip_member():
+    tmp = Path(tempfile.mkdtemp())
+    try:
+        archive = tmp / 'S1_fastqc.zip'
+        with zipfile.ZipFile(str(archive), 'w') as zf:
+            zf.writestr('S1_fastqc/Images/a.png', b'plot')
+            zf.writestr('S1_fastqc/fastqc_data.txt', 'data')
+        (tmp / 'a.png').write_bytes(b'plot')
+        members = discover_zip_members(archive, 'Images/*.png', 'S1_fastqc')
+        eq_(members, [ZipMember(archive, 'S1_fastqc/Images/a.png')])
+        eq_(file_hash(members[0]), file_hash(tmp / 'a.png'))
+
+        counts = []
+        for _ in range(2):
+            pool = CopyPool(tmp / 'dst', max_workers=2, sync='mtime')
+            pool.submit(members[0], 'pics/a.png')
+            counts.append(pool.join()[0])
+        eq_((tmp / 'dst' / 'pics' / 'a.png').read_bytes(), b'plot')
+        # the second copy is up to date by member's size and mtime
+        eq_(counts, [1, 0])
+    finally:
+        shutil.rmtree(str(tmp))
@@ -0,0 +1,78 @@
+import shutil
+import tarfile
+import zipfile
+import tempfile
+from pathlib import Path, PurePosixPath
+from nose.tools import ok_, eq_
+from ngcloud.vfs import ArchivePath, job_path
+from ngcloud.util import copy, discover_file_by_patterns
+from ngcloud.bam import read_bam_stats
+from ngcloud.tests.test_bam import write_bam, random_records
+
+
+def _make_job(root):
+    job_root = root / 'job_1234'
+    (job_root / '2_tophat' / 'A').mkdir(parents=True)
+    (job_root / 'job_info.yaml').write_text('job_id: 1234\n')
+    (job_root / '2_tophat' / 'A' / 'align_summary.txt').write_text('A\n')
+    write_bam(
+        job_root / '2_tophat' / 'A' / 'accepted_hits.bam',
+        random_records(2000)
+    )
+    return job_root
+
+
+def test_tar_job_folder():
+    tmp = Path(tempfile.mkdtemp())
+    try:
+        job_root = _make_job(tmp)
+        archive = tmp / 'job_1234.tar'
+        with tarfile.open(str(archive), 'w') as tf:
+            tf.add(str(job_root), arcname='job_1234')
+
+        root = job_path(archive)
+        ok_(isinstance(root, ArchivePath))
+        eq_(root.name, 'job_1234')
+        eq_([p.name for p in root.iterdir()], ['2_tophat', 'job_info.yaml'])
+        eq_((root / 'job_info.yaml').read_text(), 'job_id: 1234\n')
+        found = discover_file_by_patterns(root, ['*/*/*.txt', '**/*.bam'])
+        eq_([p.relative_to(root) for p in found], [
+            PurePosixPath('2_tophat/A/align_summary.txt'),
+            PurePosixPath('2_tophat/A/accepted_hits.bam'),
+        ])
+
+        copy(found[0], tmp)
+        eq_((tmp / 'align_summary.txt').read_text(), 'A\n')
+        # members are read in place, also by worker processes
+        eq_(
+            read_bam_stats(found[1], workers=2).as_dict(),
+            read_bam_stats(
+                job_root / '2_tophat' / 'A' / 'accepted_hits.bam'
+            ).as_dict()
+        )
+    finally:
+        shutil.rmtree(str(tmp))
+
+
+def test_zip_job_folder():
+    tmp = Path(tempfile.mkdtemp())
+    try:
+        job_root = _make_job(tmp)
+        archive = tmp / 'job_1234.zip'
+        with zipfile.ZipFile(str(archive), 'w') as zf:
+            for pth in sorted(job_root.glob('**/*')):
+                if pth.is_file():
+                    zf.write(
+                        str(pth), pth.relative_to(job_root).as_posix()
+                    )
+
+        root = job_path(archive)
+        eq_(root.name, 'job_1234.zip')
+        summary = root / '2_tophat' / 'A' / 'align_summary.txt'
+        ok_(summary.is_file() and summary.parent.is_dir())
+        eq_(summary.stat().st_size, 2)
+        with summary.open() as f:
+            eq_(f.read(), 'A\n')
+        ok_(not (root / 'missing').exists())
+    finally:
+        shutil.rmtree(str(tmp))
@@ -0,0 +1,52 @@
+from types import SimpleNamespace
+from nose.tools import eq_, ok_
+from ngcloud.warehouse import MetricsWarehouse
+
+
+def _fake_report(job_id, rate):
+    stage = SimpleNamespace(result_info={
+        'overall_sep_percent': rate,
+        'sep_rate': {'S1': [rate, rate]},
+    })
+    job_info = SimpleNamespace(
+        id=job_id, type='tuxedo', sample_group={'S1': []},
+        sample_list=[SimpleNamespace(
+            name='S1', full_name='S1', pair_end=False, stranded=False
+        )],
+    )
+    return SimpleNamespace(job_info=job_info, _stages=[stage])
+
+
+def test_warehouse_compare():
+    warehouse = MetricsWarehouse(':memory:')
+    for job_id, rate in [('1', 50.0), ('2', 70.0), ('3', 90.0)]:
+        warehouse.add_report(_fake_report(job_id, rate))
+    # re-adding replaces the old records
+    warehouse.add_report(_fake_report('3', 80.0))
+    eq_([row[0] for row in warehouse.jobs()], ['1', '2', '3'])
+    eq_(
+        [row[3] for row in warehouse.trend('overall_sep_percent')],
+        [50.0, 70.0, 80.0]
+    )
+
+    comparison = warehouse.compare(_fake_report('3', 60.0))
+    # list positions such as sep_rate.0 are skipped
+    eq_(len(comparison), 1)
+    row = comparison[0]
+    eq_(row['metric'], 'overall_sep_percent')
+    eq_((row['n_jobs'], row['min'], row['median'], row['max']),
+        (2, 50.0, 60.0, 70.0))
+    ok_(row['percentile'] == 50)
+    warehouse.close()
+
+
+def test_ngmetrics_missing_db():
+    import os
+    import tempfile
+    from nose.tools import assert_raises
+    from ngcloud.warehouse import main
+    db_path = os.path.join(tempfile.mkdtemp(), 'missing.db')
+    with assert_raises(FileNotFoundError):
+        main([db_path, 'jobs'])
+    ok_(not os.path.exists(db_path))
+    os.rmdir(os.path.dirname(db_path))
@@ -1,9 +1,18 @@
+import io
+import multiprocessing
 import shutil
 import os
 import os.path as op
+import time
+import hashlib
+import threading
+import zipfile
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
-from pathlib import Path
+from pathlib import Path, PurePosixPath
 import ngcloud as ng
+from ngcloud.vfs import ArchivePath
 
 logger = ng._create_logger(__name__)
 
@@ -13,6 +22,8 @@ def humanfmt(value, places=0, curr='', sep=',', dp='.',
 
 
     This function is an example from Official :mod:`decimal`.
+    int and float values are converted to Decimal first, so numbers can be
+    kept as plain numeric types until they are rendered.
 
     Attributes
     ----------
@@ -46,8 +57,15 @@ def humanfmt(value, places=0, curr='', sep=',', dp='.',
     '123 456 789.00'
     >>> humanfmt(Decimal('-0.02'), neg='<', trailneg='>')
     '<0.02>'
+    >>> humanfmt(29.2648, places=2)
+    '29.26'
+
+    .. versionchanged:: 0.3.4
+        Accept int and float
 
     """
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
     q = Decimal(10) ** -places      # 2 places --> '0.01'
     sign, digits, exp = value.quantize(q).as_tuple()
     result = []
@@ -83,13 +101,16 @@ def open(path_like, *args, **kwargs):
         >>> with open(Path('say'), 'w') as f:
         ...     f.write('hi')
 
+    .. versionchanged:: 0.3.4
+        Open members of :class:`~ngcloud.vfs.ArchivePath` for reading.
     """
+    # called per file, message is only formatted when debug is enabled
     logger.debug(
-        "File {0!s} is open by custom open() function "
-        "with extra arguments: args={1} kwargs={2}"
-        .format(path_like, args, kwargs)
+        "File %s is open by custom open() function "
+        "with extra arguments: args=%s kwargs=%s",
+        path_like, args, kwargs
     )
-    if isinstance(path_like, Path):
+    if isinstance(path_like, (Path, ArchivePath)):
         return path_like.open(*args, **kwargs)
     else:
         return open(path_like, *args, **kwargs)
@@ -106,23 +127,363 @@ def expanduser(path_like):
         return op.expanduser(path_like)
 
 
+def user_cache_dir(*path_parts):
+    """Return path under NGCloud cache folder.
+
+    The folder is :file:`$XDG_CACHE_HOME/ngcloud`, where ``XDG_CACHE_HOME``
+    defaults to :file:`~/.cache`. Nothing is created.
+
+    .. versionadded:: 0.3.4
+    """
+    cache_home = os.environ.get('XDG_CACHE_HOME') or op.join(
+        op.expanduser('~'), '.cache'
+    )
+    return Path(cache_home, 'ngcloud', *path_parts)
+
+
 def copy(src_path_like, dst_path_like, metadata=False, **kwargs):
     """pathlib support for path-like objects.
 
     Internally use either :py:func:`shutil.copy` or :py:func:`shutil.copy2`
     based on `metadata` value.
+
+    .. versionchanged:: 0.3.4
+        Source can be a :class:`ZipMember` or an
+        :class:`~ngcloud.vfs.ArchivePath`, streamed out of its archive.
     """
     if metadata:
         _copy_cmd = shutil.copy2  # copy2 perserves metadata
     else:
         _copy_cmd = shutil.copy
 
+    if isinstance(src_path_like, (ZipMember, ArchivePath)):
+        _copy_archived(src_path_like, dst_path_like, metadata)
+        return
     # TODO: use system command for large file
     _copy_cmd(
         strify_path(src_path_like), strify_path(dst_path_like), **kwargs
     )
 
 
+def _copy_archived(member, dst_path_like, metadata):
+    dst = Path(strify_path(dst_path_like))
+    if dst.is_dir():
+        dst = dst / member.name
+    with member.open('rb') as fsrc, dst.open('wb') as fdst:
+        shutil.copyfileobj(fsrc, fdst)
+    if metadata:
+        mtime = member.stat().st_mtime
+        os.utime(dst.as_posix(), (mtime, mtime))
+
+
+class ZipMember:
+    """A file inside a zip archive used in place of a source file path.
+
+    Static files of stages can be members of an archive, such as images of
+    FastQC's :file:`<sample>_fastqc.zip`. They are streamed out of the
+    archive when copied by :func:`copy` or :class:`CopyPool`, hashed by
+    :func:`file_hash` or served, without extracting the archive first.
+    Only :attr:`name`, :meth:`open` and :meth:`stat` of
+    :py:class:`pathlib.Path` are supported.
+
+    Parameters
+    ----------
+    archive : path-like object or :class:`~ngcloud.vfs.ArchivePath`
+        Path to the zip file. Zip files inside an archived job folder
+        are read into memory when opened.
+    member : str
+        Name of the member inside the archive, e.g.
+        ``A_R1_fastqc/Images/per_base_quality.png``.
+
+    .. versionadded:: 0.3.4
+    """
+
+    def __init__(self, archive, member):
+        if not isinstance(archive, ArchivePath):
+            archive = Path(strify_path(archive))
+        self.archive = archive
+        self.member = member
+
+    @property
+    def name(self):
+        """Final component of the member name."""
+        return self.member.rsplit('/', 1)[-1]
+
+    @property
+    def suffix(self):
+        return op.splitext(self.name)[1]
+
+    def open(self, mode='rb'):
+        """Open the member for reading in binary mode."""
+        if mode != 'rb':
+            raise ValueError(
+                "Zip member can only be opened in 'rb' mode, not {!r}"
+                .format(mode)
+            )
+        zf = _open_zipfile(self.archive)
+        try:
+            f = zf.open(self.member)
+        except Exception:
+            zf.close()
+            raise
+        # the member stream keeps the archive open until it's closed
+        zf.close()
+        return f
+
+    def stat(self):
+        """Return :py:func:`os.stat` result of the archive with size and
+        modification time of the member."""
+        with _open_zipfile(self.archive) as zf:
+            info = zf.getinfo(self.member)
+        st = list(self.archive.stat())[:10]
+        mtime = time.mktime(info.date_time + (0, 0, -1))
+        st[6] = info.file_size
+        st[7] = st[8] = int(mtime)
+        return os.stat_result(st)
+
+    def __eq__(self, other):
+        if not isinstance(other, ZipMember):
+            return False
+        return (self.archive, self.member) == (other.archive, other.member)
+
+    def __hash__(self):
+        return hash((self.archive, self.member))
+
+    def __str__(self):
+        return '{}/{}'.format(self.archive.as_posix(), self.member)
+
+    def __repr__(self):
+        return 'ZipMember({!r}, {!r})'.format(
+            self.archive.as_posix(), self.member
+        )
+
+
+def _open_zipfile(archive):
+    if isinstance(archive, ArchivePath):
+        # zip files need seeking, read the nested one at once
+        return zipfile.ZipFile(io.BytesIO(archive.read_bytes()))
+    return zipfile.ZipFile(strify_path(archive))
+
+
+def discover_zip_members(path_like, file_patterns="*", root=''):
+    """Discover members of a zip archive based on given patterns.
+
+    Like :func:`discover_file_by_patterns` but the members under folder
+    *root* of the archive are matched by :py:meth:`pathlib.PurePath.match`
+    with their names relative to *root*.
+
+    Returns
+    -------
+    List of :class:`ZipMember` object sorted by member name.
+
+    Examples
+    --------
+
+        >>> discover_zip_members(
+        ...     'A_R1_fastqc.zip', 'Images/*.png', root='A_R1_fastqc')
+        [ZipMember('A_R1_fastqc.zip', 'A_R1_fastqc/Images/kmer_profiles.png'),
+         ...]
+
+    .. versionadded:: 0.3.4
+    """
+    if isinstance(file_patterns, str):
+        file_patterns = [file_patterns]
+    prefix = root.strip('/') + '/' if root.strip('/') else ''
+    if not isinstance(path_like, ArchivePath):
+        path_like = Path(strify_path(path_like))
+    with _open_zipfile(path_like) as zf:
+        names = sorted(
+            name for name in zf.namelist()
+            if name.startswith(prefix) and not name.endswith('/')
+        )
+    found = [
+        ZipMember(path_like, name) for name in names
+        if any(
+            PurePosixPath(name[len(prefix):]).match(pattern)
+            for pattern in file_patterns
+        )
+    ]
+    logger.info(
+        "%d member matching patterns %r under %s of %s",
+        len(found), file_patterns, root, path_like
+    )
+    return found
+
+
+class CopyPool:
+    """Copy files concurrently by a bounded pool of threads.
+
+    Copying is I/O bound, so on network file systems where per-file latency
+    dominates, keeping several copies in flight is much faster than copying
+    one file at a time. Files are copied in background once submitted.
+    If more than one file is submitted to the same destination, they are
+    copied in the order of submission so the last one wins.
+
+    With *dedupe*, files are hashed and each unique content is copied once.
+    Other destinations of the same content become hard links to the first
+    copy, falling back to copying if hard links are not supported.
+    FastQC icons of every sample, for example, then take space only once.
+
+    Parameters
+    ----------
+    dst_root : path-like object
+        Root of relative destination paths.
+    max_workers : int
+        Number of files being copied at the same time.
+    sync : str, optional
+        One of :data:`SYNC_MODES`. Skip destination files already up to
+        date, see :func:`merged_copytree`.
+    dedupe : bool
+        Hard link files of identical content.
+
+    Examples
+    --------
+
+        >>> pool = CopyPool('output/static', max_workers=8)
+        >>> pool.submit('src/js/app.js', 'js/app.js')
+        >>> n_files, n_bytes = pool.join()
+
+    .. versionadded:: 0.3.4
+    """
+
+    def __init__(self, dst_root, max_workers=8, sync=None, dedupe=False):
+        self.dst_root = Path(strify_path(dst_root))
+        self.sync = sync
+        self.dedupe = dedupe
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._futures = []
+        self._last = dict()
+        # content digest -> (first destination, event set once copied)
+        self._blobs = dict()
+        self._blobs_lock = threading.Lock()
+        self._start = time.perf_counter()
+
+    def submit(self, src, rel_dest, ignore_errors=False):
+        """Copy *src* to *rel_dest* under destination root in background.
+
+        Parent folders are created if not exist. Errors are raised when
+        :meth:`join`, unless *ignore_errors* is True where they are logged.
+        """
+        dest = self.dst_root / rel_dest
+        prev = self._last.get(dest)
+        future = self._executor.submit(
+            self._copy, _source_path(src), dest, prev, ignore_errors
+        )
+        self._last[dest] = future
+        self._futures.append(future)
+        return future
+
+    def _copy(self, src, dest, prev, ignore_errors):
+        """Return tuple of (status, bytes) where status is one of
+        copied, linked, skipped and failed."""
+        if prev is not None:
+            # tasks start in submission order, so prev is running or done
+            prev.exception()
+        try:
+            dest_stat = None
+            if self.sync or self.dedupe:
+                try:
+                    dest_stat = dest.stat()
+                except FileNotFoundError:
+                    pass
+            if not self.dedupe:
+                if self._is_synced(src, dest, prev, dest_stat):
+                    return 'skipped', 0
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                copy(src, dest, metadata=bool(self.sync))
+                return 'copied', dest.stat().st_size
+            return self._copy_dedupe(src, dest, prev, dest_stat)
+        except Exception as e:
+            if not ignore_errors:
+                raise
+            logger.warning("Copying %s caught error %r, skipped", src, e)
+            return 'failed', 0
+
+    def _copy_dedupe(self, src, dest, prev, dest_stat):
+        first, blob_dest, copied = self._claim_blob(file_hash(src), dest)
+        if first:
+            try:
+                if self._is_synced(src, dest, prev, dest_stat):
+                    return 'skipped', 0
+                if dest_stat is not None:
+                    # never write through a hard link shared with others
+                    dest.unlink()
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                copy(src, dest, metadata=bool(self.sync))
+                return 'copied', dest.stat().st_size
+            finally:
+                copied.set()
+
+        copied.wait()
+        return self._link_blob(blob_dest, dest, dest_stat)
+
+    def _is_synced(self, src, dest, prev, dest_stat):
+        """Return True if *dest* is kept by sync and no earlier task of it
+        is pending."""
+        if not self.sync or prev is not None or dest_stat is None:
+            return False
+        return _is_up_to_date(src, src.stat(), dest, dest_stat, self.sync)
+
+    def _claim_blob(self, digest, dest):
+        """Return (first, blob destination, event set once copied) of the
+        content *digest*, *first* is True if *dest* should copy it."""
+        with self._blobs_lock:
+            # dest is being replaced, it can no longer be linked to
+            for key, (blob_dest, _) in list(self._blobs.items()):
+                if blob_dest == dest:
+                    del self._blobs[key]
+            if digest in self._blobs:
+                return (False,) + self._blobs[digest]
+            copied = threading.Event()
+            self._blobs[digest] = (dest, copied)
+            return True, dest, copied
+
+    def _link_blob(self, blob_dest, dest, dest_stat):
+        """Hard link *dest* to the copied *blob_dest*, or copy it if hard
+        links are not supported."""
+        if dest_stat is not None:
+            if self.sync and os.path.samefile(
+                    strify_path(blob_dest), strify_path(dest)):
+                return 'skipped', 0
+            dest.unlink()
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(strify_path(blob_dest), strify_path(dest))
+        except OSError:
+            copy(blob_dest, dest, metadata=bool(self.sync))
+            return 'copied', dest.stat().st_size
+        return 'linked', 0
+
+    def join(self):
+        """Wait for all submitted files being copied and shut down the pool.
+
+        Returns
+        -------
+        tuple of (number of files, total bytes) copied. Files linked,
+        skipped or failed to copy are not counted.
+        """
+        self._executor.shutdown(wait=True)
+        counts = Counter()
+        n_bytes = 0
+        for future in self._futures:
+            status, size = future.result()
+            counts[status] += 1
+            n_bytes += size
+        n_files = counts['copied']
+        elapsed = time.perf_counter() - self._start
+        logger.info(
+            "Copied {} files ({:.1f} MB) in {:.2f}s, "
+            "{:.1f} files/s, {:.1f} MB/s, {} linked, {} skipped, {} failed"
+            .format(
+                n_files, n_bytes / 1e6, elapsed,
+                n_files / elapsed if elapsed else 0,
+                n_bytes / 1e6 / elapsed if elapsed else 0,
+                counts['linked'], counts['skipped'], counts['failed'],
+            )
+        )
+        return n_files, n_bytes
+
+
 def discover_file_by_patterns(path_like, file_patterns="*"):
     """Discover files under certain path based on given patterns.
 
@@ -131,7 +492,7 @@ def discover_file_by_patterns(path_like, file_patterns="*"):
 
     Parameters
     ----------
-    path_like : path-like object
+    path_like : path-like object or :class:`~ngcloud.vfs.ArchivePath`
     file_patterns : str or iterable
         glob-style file pattern
 
@@ -153,14 +514,17 @@ def discover_file_by_patterns(path_like, file_patterns="*"):
          PosixPath('report/static/vendor/bootstrap-3.1.1/js/bootstrap.min.js'),
          PosixPath('report/static/vendor/bootstrap-3.1.1/js/bootstrap.js')]
 
+    .. versionchanged:: 0.3.4
+        Glob members of archived job folders.
     """
     # if input is str
     if isinstance(file_patterns, str):
-        found_file_list = list(Path(path_like).glob(file_patterns))
+        found_file_list = list(_glob_root(path_like).glob(file_patterns))
         logger.info(
-            "{2} file matching single pattern {1} under {0!s}"
-            .format(path_like, file_patterns, len(found_file_list))
+            "%d file matching single pattern %s under %s",
+            len(found_file_list), file_patterns, path_like
         )
+        return found_file_list
 
     # if input is iterable
     try:
@@ -170,15 +534,12 @@ def discover_file_by_patterns(path_like, file_patterns="*"):
                 raise TypeError(
                     "File pattern should be str, not {}".format(file_patterns)
                 )
-            file_list = list(Path(path_like).glob(pattern))
-            logger.debug(
-                "... {} file found by {}"
-                .format(len(file_list), pattern)
-            )
+            file_list = list(_glob_root(path_like).glob(pattern))
+            logger.debug("... %d file found by %s", len(file_list), pattern)
             discovered_file_list.extend(file_list)
         logger.info(
-            "{2} file matching patterns {1!r} under {0!s}"
-            .format(path_like, file_patterns, len(discovered_file_list))
+            "%d file matching patterns %r under %s",
+            len(discovered_file_list), file_patterns, path_like
         )
         return discovered_file_list
     except TypeError as te:
@@ -189,43 +550,177 @@ def discover_file_by_patterns(path_like, file_patterns="*"):
         ) from te
 
 
-def merged_copytree(src_list, dst):
-    dst_p = Path(dst)
-    if not dst_p.exists():
-        dst_p.mkdir()
-    for src in src_list:
-        src_p = Path(src)
-        for current_root, dirs, files in os.walk(strify_path(src)):
-            current_p = Path(current_root)
-            rel_to_src_root = current_p.relative_to(src_p)
-            dst_current_d = dst_p / rel_to_src_root
-            if not dst_current_d.exists():
-                dst_current_d.mkdir()
+def file_hash(path_like, algorithm='sha1', chunk_size=1 << 20):
+    """Return hex digest of the content of a file.
+
+    .. versionadded:: 0.3.4
+    """
+    h = hashlib.new(algorithm)
+    with _source_path(path_like).open('rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def process_pool_context():
+    """Return multiprocessing context for process pools.
+
+    Worker processes are started by ``forkserver``, or ``spawn`` where it
+    is not supported, since forking a process while threads such as those
+    of :class:`CopyPool` run may copy a lock held by one of them into the
+    child forever.
+
+    .. versionadded:: 0.3.4
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
+
+
+def _glob_root(path_like):
+    if isinstance(path_like, ArchivePath):
+        return path_like
+    return Path(path_like)
+
+
+def _source_path(path_like):
+    """Return Path of a source file, which can also be :class:`ZipMember`
+    or :class:`~ngcloud.vfs.ArchivePath`."""
+    if isinstance(path_like, (ZipMember, ArchivePath)):
+        return path_like
+    return Path(strify_path(path_like))
+
+
+SYNC_MODES = ('mtime', 'hash')
+"""Ways to tell a copied file is up to date, used by :func:`merged_copytree`
+and :class:`CopyPool`.
+
+- ``'mtime'``: same size and modification time in seconds
+- ``'hash'``: same size and content hash
+"""
+
+
+def _is_up_to_date(src, src_stat, dst, dst_stat, sync):
+    if src_stat.st_size != dst_stat.st_size:
+        return False
+    if sync == 'mtime':
+        return int(src_stat.st_mtime) == int(dst_stat.st_mtime)
+    elif sync == 'hash':
+        return file_hash(src) == file_hash(dst)
+    raise ValueError(
+        "Unknown sync mode {!r}, should be one of {!r}"
+        .format(sync, SYNC_MODES)
+    )
+
+
+def _scan_tree(root, rel_dir, merged):
+    """Collect files under root/rel_dir as merged[rel_dir][name] = entry."""
+    files = merged.setdefault(rel_dir, OrderedDict())
+    with os.scandir(os.path.join(root, rel_dir)) as it:
+        for entry in sorted(it, key=lambda e: e.name):
+            if entry.is_dir():
+                _scan_tree(root, os.path.join(rel_dir, entry.name), merged)
             else:
-                logger.debug(
-                    "Dest. dir: {!s} existed, keeping its files"
-                    .format(dst_current_d)
-                )
+                files[entry.name] = entry
+
+
+def merged_copytree(src_list, dst, sync=None):
+    """Copy files under each of *src_list* into one folder *dst*.
+
+    Folders are merged. Files of later sources take precedence when they
+    share the same relative path. Existing files under *dst* are kept unless
+    being overwritten by files of the sources.
+
+    Parameters
+    ----------
+    src_list : list of path-like object
+    dst : path-like object
+    sync : str, optional
+        One of :data:`SYNC_MODES`. When given, existing destination files
+        up to date are skipped and files are copied with their metadata, so
+        copying again into the same folder is nearly free.
+        By default every file is copied.
+
+    Returns
+    -------
+    :class:`collections.Counter` of files being *copied*, *overwritten*
+    (included in *copied*), *skipped* and *failed*.
+
+    .. versionchanged:: 0.3.4
+        Add **sync**; scan folders by :func:`os.scandir` and log a summary
+        instead of one warning per overwritten or failed file.
+    """
+    merged = OrderedDict()
+    for src in src_list:
+        src = strify_path(src)
+        if not os.path.isdir(src):
+            logger.debug("Source dir %r not exist, skipped", src)
+            continue
+        _scan_tree(src, '', merged)
+
+    dst = strify_path(dst)
+    os.makedirs(dst, exist_ok=True)
+    counts = Counter(copied=0, overwritten=0, skipped=0, failed=0)
+    first_error = None
+    for rel_dir, files in merged.items():
+        error = _copy_merged_dir(
+            files, os.path.join(dst, rel_dir), sync, counts
+        )
+        if first_error is None:
+            first_error = error
+    if first_error is not None:
+        logger.warning(
+            "Copying %d files failed and skipped, first %s caught error %r",
+            counts['failed'], *first_error
+        )
+    logger.info(
+        "Merged %d folders into %s: %d copied (%d overwritten), "
+        "%d up to date, %d failed", len(src_list), dst,
+        counts['copied'], counts['overwritten'], counts['skipped'],
+        counts['failed']
+    )
+    return counts
+
+
+def _copy_merged_dir(files, dst_dir, sync, counts):
+    """Copy scanned *files* of a merged folder into *dst_dir*.
+
+    Update *counts* and return (path, error) of the first failed file or
+    None.
+    """
+    try:
+        with os.scandir(dst_dir) as it:
+            existing = {entry.name: entry for entry in it}
+    except FileNotFoundError:
+        os.makedirs(dst_dir)
+        existing = dict()
+    logger.debug(
+        '%d files: -> %s, %d existed', len(files), dst_dir, len(existing)
+    )
+    first_error = None
+    for name, src_entry in files.items():
+        dst_entry = existing.get(name)
+        try:
+            if dst_entry is not None:
+                if sync and _is_up_to_date(
+                    src_entry.path, src_entry.stat(),
+                    dst_entry.path, dst_entry.stat(), sync
+                ):
+                    counts['skipped'] += 1
+                    continue
+                os.unlink(dst_entry.path)
+                counts['overwritten'] += 1
+            copy(src_entry.path, dst_dir, metadata=bool(sync))
+            counts['copied'] += 1
+        except Exception as e:
+            counts['failed'] += 1
+            if first_error is None:
+                first_error = (src_entry.path, e)
             logger.debug(
-                '{2} files: {0!s} -> {1!s}'
-                .format(current_p, dst_current_d, len(files))
+                "Copying %s caught error %r, skipped", src_entry.path, e
             )
-            for f in files:
-                src_f = current_p / f
-                try:
-                    dst_f = dst_current_d / f
-                    if dst_f.exists():
-                        logger.warning(
-                            "File {} existed, overwritten by {}"
-                            .format(dst_f, src_f)
-                        )
-                        dst_f.unlink()
-                    copy(src_f, dst_current_d)
-                except Exception as e:
-                    logger.warn(
-                        "Copying {} caught error {!r}, skipped"
-                        .format(src_f, e)
-                    )
+    return first_error
+
 
 def strify_path(path_like):
     """Normalized path-like object to POSIX style str.
@@ -0,0 +1,498 @@
+import io
+import os
+import stat
+import time
+import tarfile
+import zipfile
+import posixpath
+import threading
+from fnmatch import fnmatchcase
+from pathlib import Path, PurePosixPath
+import ngcloud as ng
+
+logger = ng._create_logger(__name__)
+
+__doc__ = """\
+Read job folders packed as tar or zip archives without extracting them.
+
+Finished jobs are often archived as, say, :file:`job_1234.tar`.
+:func:`job_path` turns such an archive into an :class:`ArchivePath` at its
+root, which supports the subset of :py:class:`pathlib.Path` NGCloud uses to
+read job results: joining by ``/``, :meth:`~ArchivePath.iterdir`,
+:meth:`~ArchivePath.glob`, :meth:`~ArchivePath.open` and
+:meth:`~ArchivePath.stat`. So :class:`~ngcloud.info.JobInfo`, stages and
+helpers such as :func:`~ngcloud.util.discover_file_by_patterns` and
+:func:`~ngcloud.util.copy` work on archives as they do on folders, and
+``ngreport job_1234.tar out`` reads only the members stages need.
+
+The member index of an archive is built once per process by
+:func:`archive_index`. Members are read in place: a tar member is a byte
+range of the archive file, so it can be read and seeked without reading
+anything else. Only uncompressed tar is supported, since every member of a
+compressed tar would be decompressed from the archive's beginning.
+
+.. autosummary::
+
+    ArchivePath
+    ArchiveIndex
+    archive_index
+    is_archive
+    job_path
+
+.. versionadded:: 0.3.4
+"""
+
+ARCHIVE_SUFFIXES = ('.tar', '.zip')
+"""Suffixes of files treated as archived job folders."""
+
+
+def is_archive(path_like):
+    """Return whether *path_like* is a tar or zip file NGCloud can read."""
+    pth = Path(path_like)
+    return pth.suffix.lower() in ARCHIVE_SUFFIXES and pth.is_file()
+
+
+class _MemberEntry:
+    __slots__ = ('size', 'mtime', 'offset')
+
+    def __init__(self, size, mtime, offset):
+        self.size = size
+        self.mtime = mtime
+        self.offset = offset
+
+
+class _RangeReader(io.RawIOBase):
+    """Raw binary stream over a byte range of a file."""
+
+    def __init__(self, path, offset, size):
+        self._f = io.open(path, 'rb', buffering=0)
+        self._offset = offset
+        self._size = size
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        n = min(len(b), self._size - self._pos)
+        if n <= 0:
+            return 0
+        self._f.seek(self._offset + self._pos)
+        n = self._f.readinto(memoryview(b)[:n])
+        self._pos += n
+        return n
+
+    def seek(self, pos, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            pos += self._pos
+        elif whence == io.SEEK_END:
+            pos += self._size
+        if pos < 0:
+            raise ValueError("Negative seek position {}".format(pos))
+        self._pos = pos
+        return pos
+
+    def tell(self):
+        return self._pos
+
+    def close(self):
+        if not self.closed:
+            self._f.close()
+        super().close()
+
+
+class ArchiveIndex:
+    """Member index of a tar or zip archive.
+
+    Use :func:`archive_index` to share the index of an archive.
+
+    Parameters
+    ----------
+    path : path-like object
+        Path to an uncompressed tar or a zip file.
+
+    Attributes
+    ----------
+    path : Path object
+    files : dict
+        Maps member names to their size, modification time and location.
+    dirs : dict
+        Maps folder names, ``''`` for the archive root, to sorted names of
+        their children. Folders not stored in the archive are implied by
+        their members.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path).resolve()
+        # a tar of zip files may look like a zip file by its ending bytes
+        is_tar = tarfile.is_tarfile(self.path.as_posix())
+        self.is_zip = not is_tar and zipfile.is_zipfile(self.path.as_posix())
+        self.files = dict()
+        self.dirs = {'': set()}
+        if self.is_zip:
+            self._index_zip()
+        else:
+            self._index_tar()
+        self.dirs = {
+            name: sorted(children) for name, children in self.dirs.items()
+        }
+        logger.info(
+            "Indexed {} files in {} folders of archive {!s}"
+            .format(len(self.files), len(self.dirs), self.path)
+        )
+
+    def _index_zip(self):
+        with zipfile.ZipFile(self.path.as_posix()) as zf:
+            for info in zf.infolist():
+                if info.is_dir():
+                    self._add_dir(info.filename)
+                else:
+                    mtime = _zip_mtime(info)
+                    self._add_file(
+                        info.filename,
+                        _MemberEntry(info.file_size, mtime, info.filename)
+                    )
+
+    def _index_tar(self):
+        try:
+            tf = tarfile.open(self.path.as_posix(), 'r:')
+        except tarfile.ReadError as e:
+            raise ValueError(
+                "{!s} is not an uncompressed tar or a zip file"
+                .format(self.path)
+            ) from e
+        with tf:
+            # only headers are read, file data are skipped by seeking
+            for info in tf:
+                if info.isdir():
+                    self._add_dir(info.name)
+                elif info.isreg() and not info.sparse:
+                    self._add_file(
+                        info.name,
+                        _MemberEntry(info.size, info.mtime, info.offset_data)
+                    )
+                else:
+                    logger.debug(
+                        "Skip tar member %s not being a regular file",
+                        info.name
+                    )
+
+    def _add_dir(self, name):
+        name = _normalize(name)
+        while name and name not in self.dirs:
+            self.dirs[name] = set()
+            parent, _, child = name.rpartition('/')
+            self.dirs.setdefault(parent, set()).add(child)
+            name = parent
+
+    def _add_file(self, name, entry):
+        name = _normalize(name)
+        parent, _, child = name.rpartition('/')
+        self._add_dir(parent)
+        self.dirs[parent].add(child)
+        self.files[name] = entry
+
+    def open(self, name):
+        """Open member *name* for reading in binary mode."""
+        entry = self.files[name]
+        if self.is_zip:
+            zf = zipfile.ZipFile(self.path.as_posix())
+            try:
+                f = zf.open(entry.offset)
+            finally:
+                # the member stream keeps the archive open until it's closed
+                zf.close()
+            return f
+        return io.BufferedReader(
+            _RangeReader(self.path.as_posix(), entry.offset, entry.size)
+        )
+
+    def stat(self, name):
+        """Return :py:func:`os.stat` result of the archive with size and
+        modification time of member *name*."""
+        st = os.stat(self.path.as_posix())
+        if name in self.files:
+            entry = self.files[name]
+            mode = stat.S_IFREG | 0o444
+            size, mtime = entry.size, entry.mtime
+        else:
+            mode = stat.S_IFDIR | 0o555
+            size, mtime = 0, st.st_mtime
+        mtime_ns = int(mtime * 1e9)
+        return os.stat_result((
+            mode, st.st_ino, st.st_dev, 1, st.st_uid, st.st_gid, size,
+            int(st.st_atime), int(mtime), int(st.st_ctime),
+            st.st_atime, float(mtime), st.st_ctime,
+            st.st_atime_ns, mtime_ns, st.st_ctime_ns,
+        ))
+
+
+def _normalize(name):
+    name = posixpath.normpath(name.lstrip('/'))
+    return '' if name == '.' else name
+
+
+def _zip_mtime(info):
+    return time.mktime(info.date_time + (0, 0, -1))
+
+
+_index_cache = dict()
+_index_lock = threading.Lock()
+
+
+def archive_index(path_like):
+    """Return the :class:`ArchiveIndex` of an archive, built once.
+
+    Indexes are cached per process until the archive is modified.
+    """
+    pth = Path(path_like).resolve()
+    st = os.stat(pth.as_posix())
+    key = (pth.as_posix(), st.st_size, st.st_mtime_ns)
+    with _index_lock:
+        index = _index_cache.get(key)
+        if index is None:
+            index = _index_cache[key] = ArchiveIndex(pth)
+    return index
+
+
+def _archive_path(archive, member):
+    return ArchivePath(archive_index(archive), member)
+
+
+class ArchivePath:
+    """Path to a member or a folder inside an archive.
+
+    It supports the subset of :py:class:`pathlib.Path` used by NGCloud to
+    read job results. Members are read-only. Pickled archive paths hold
+    only the archive path and the member name; the index is rebuilt by
+    :func:`archive_index` when unpickled in another process.
+
+    Parameters
+    ----------
+    index : :class:`ArchiveIndex` object
+    member : str
+        Member name, ``''`` for the archive root.
+
+    Examples
+    --------
+
+        >>> root = job_path('job_1234.tar')
+        >>> [p.name for p in root.iterdir()]
+        ['1_fastqc', '2_tophat', 'job_info.yaml']
+        >>> with (root / 'job_info.yaml').open() as f:
+        ...     f.readline()
+        'job_id: 1234\\n'
+
+    """
+
+    def __init__(self, index, member=''):
+        self._index = index
+        self.member = _normalize(member)
+        if self.member.startswith('../') or self.member == '..':
+            raise ValueError(
+                "Path {} is outside of archive {!s}"
+                .format(member, index.path)
+            )
+
+    @property
+    def archive(self):
+        """Path to the archive file."""
+        return self._index.path
+
+    def __reduce__(self):
+        return _archive_path, (self.archive.as_posix(), self.member)
+
+    def joinpath(self, *parts):
+        member = self.member
+        for part in parts:
+            part = str(part)
+            if part.startswith('/'):
+                raise ValueError(
+                    "Cannot join absolute path {} to {!s}".format(part, self)
+                )
+            member = posixpath.join(member, part)
+        return ArchivePath(self._index, member)
+
+    def __truediv__(self, other):
+        return self.joinpath(other)
+
+    @property
+    def name(self):
+        """Final component of the member name, or the archive's name at
+        the archive root."""
+        if not self.member:
+            return self.archive.name
+        return self.member.rpartition('/')[2]
+
+    @property
+    def suffix(self):
+        return PurePosixPath(self.name).suffix
+
+    @property
+    def stem(self):
+        return PurePosixPath(self.name).stem
+
+    @property
+    def parent(self):
+        return ArchivePath(self._index, self.member.rpartition('/')[0])
+
+    def exists(self):
+        return self.is_file() or self.is_dir()
+
+    def is_file(self):
+        return self.member in self._index.files
+
+    def is_dir(self):
+        return self.member in self._index.dirs
+
+    def iterdir(self):
+        if not self.is_dir():
+            raise NotADirectoryError(
+                "Not a folder in archive: {!s}".format(self)
+            )
+        for child in self._index.dirs[self.member]:
+            yield self / child
+
+    def glob(self, pattern):
+        """Iterate over members matching a relative glob *pattern*.
+
+        Like :py:meth:`pathlib.Path.glob`, ``**`` matches this folder and
+        all subfolders.
+        """
+        parts = [p for p in pattern.split('/') if p not in ('', '.')]
+        if not parts:
+            raise ValueError("Unacceptable pattern: {!r}".format(pattern))
+        seen = set()
+        for member in self._glob(self.member, parts):
+            if member not in seen:
+                seen.add(member)
+                yield ArchivePath(self._index, member)
+
+    def _glob(self, base, parts):
+        children = self._index.dirs.get(base)
+        if children is None:
+            return
+        head, rest = parts[0], parts[1:]
+        if head == '**':
+            if rest:
+                yield from self._glob(base, rest)
+            else:
+                yield base
+            for child in children:
+                child_path = posixpath.join(base, child)
+                if child_path in self._index.dirs:
+                    yield from self._glob(child_path, parts)
+            return
+        for child in children:
+            if not fnmatchcase(child, head):
+                continue
+            child_path = posixpath.join(base, child)
+            if not rest:
+                yield child_path
+            elif child_path in self._index.dirs:
+                yield from self._glob(child_path, rest)
+
+    def open(
+        self, mode='r', buffering=-1, encoding=None, errors=None,
+        newline=None
+    ):
+        """Open the member for reading like :py:meth:`pathlib.Path.open`."""
+        if mode not in ('r', 'rt', 'rb'):
+            raise ValueError(
+                "Archive member can only be opened for reading, not {!r}"
+                .format(mode)
+            )
+        if not self.is_file():
+            if self.is_dir():
+                raise IsADirectoryError(
+                    "Is a folder in archive: {!s}".format(self)
+                )
+            raise FileNotFoundError(
+                "No such member in archive: {!s}".format(self)
+            )
+        f = self._index.open(self.member)
+        if mode == 'rb':
+            return f
+        return io.TextIOWrapper(
+            f, encoding=encoding, errors=errors, newline=newline
+        )
+
+    def read_bytes(self):
+        with self.open('rb') as f:
+            return f.read()
+
+    def read_text(self, encoding=None, errors=None):
+        with self.open(encoding=encoding, errors=errors) as f:
+            return f.read()
+
+    def stat(self):
+        """Return :py:func:`os.stat` result of the archive with size and
+        modification time of the member."""
+        if not self.exists():
+            raise FileNotFoundError(
+                "No such member in archive: {!s}".format(self)
+            )
+        return self._index.stat(self.member)
+
+    def resolve(self):
+        return self
+
+    def relative_to(self, other):
+        """Return member path relative to *other* as
+        :py:class:`pathlib.PurePosixPath`."""
+        if not isinstance(other, ArchivePath) or other.archive != self.archive:
+            raise ValueError(
+                "{!s} is not in archive {!s}".format(other, self.archive)
+            )
+        return PurePosixPath(self.member).relative_to(other.member or '.')
+
+    def as_posix(self):
+        """Return str of archive path and member name joined by ``/``."""
+        if not self.member:
+            return self.archive.as_posix()
+        return '{}/{}'.format(self.archive.as_posix(), self.member)
+
+    def __str__(self):
+        return self.as_posix()
+
+    def __repr__(self):
+        return 'ArchivePath({!r}, {!r})'.format(
+            self.archive.as_posix(), self.member
+        )
+
+    def _key(self):
+        return (self.archive, self.member)
+
+    def __eq__(self, other):
+        return isinstance(other, ArchivePath) and self._key() == other._key()
+
+    def __lt__(self, other):
+        if not isinstance(other, ArchivePath):
+            return NotImplemented
+        return self._key() < other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+
+def job_path(path_like):
+    """Return the root of a job folder, which can be an archive.
+
+    An archive becomes :class:`ArchivePath` at its root. If the archive
+    root has no :file:`job_info.yaml` but a single folder, as archiving
+    by ``tar cf job_1234.tar job_1234/``, the folder is the job root.
+    Other paths are resolved as :py:class:`pathlib.Path`.
+    """
+    if isinstance(path_like, ArchivePath):
+        return path_like
+    if not is_archive(path_like):
+        return Path(path_like).resolve()
+    root = ArchivePath(archive_index(path_like))
+    children = list(root.iterdir())
+    if len(children) == 1 and children[0].is_dir():
+        if not (root / 'job_info.yaml').is_file():
+            root = children[0]
+    return root
@@ -0,0 +1,272 @@
+import os
+import sqlite3
+import statistics
+from datetime import datetime
+from docopt import docopt
+import ngcloud as ng
+from ngcloud.util import strify_path
+from ngcloud.export import iter_metric_rows, _job_dict, _has_list_index
+
+logger = ng._create_logger(__name__)
+
+__doc__ = """\
+Local SQLite store of metrics across jobs.
+
+Every report generated with :attr:`Report.warehouse_path
+<ngcloud.report.Report.warehouse_path>` (``ngreport --warehouse=<db>``)
+appends its job info and parsed metrics into the database, which is indexed
+by job, sample and metric. Query it by :command:`ngmetrics` or
+:class:`MetricsWarehouse`.
+
+.. autosummary::
+
+    MetricsWarehouse
+    main
+"""
+
+_SCHEMA = """\
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY, job_type TEXT, added_at TEXT
+);
+CREATE TABLE IF NOT EXISTS samples (
+    job_id TEXT, name TEXT, full_name TEXT, pair_end TEXT, stranded INTEGER
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    job_id TEXT, stage TEXT, sample TEXT, metric TEXT,
+    value_num REAL, value_text TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_samples_job ON samples (job_id);
+CREATE INDEX IF NOT EXISTS idx_samples_name ON samples (name);
+CREATE INDEX IF NOT EXISTS idx_metrics_job ON metrics (job_id);
+CREATE INDEX IF NOT EXISTS idx_metrics_sample ON metrics (sample);
+CREATE INDEX IF NOT EXISTS idx_metrics_metric ON metrics (metric, stage);
+"""
+
+
+class MetricsWarehouse:
+    """SQLite-backed store of job metrics.
+
+    Tables are *jobs* (job_id, job_type, added_at), *samples* and *metrics*
+    in the same long format as :class:`~ngcloud.export.SQLiteExporter`.
+
+    It is a context manager closing the database on exit.
+
+    Parameters
+    ----------
+    db_path : path-like object
+        Database file, created if not exist.
+    create : bool
+        Create the database if not exist, otherwise raise
+        :py:exc:`FileNotFoundError`.
+    """
+
+    def __init__(self, db_path, create=True):
+        self.db_path = db_path
+        if not create and not os.path.exists(strify_path(db_path)):
+            raise FileNotFoundError(
+                "Metrics warehouse {!s} does not exist".format(db_path)
+            )
+        self._conn = sqlite3.connect(strify_path(db_path))
+        with self._conn:
+            self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add_report(self, report):
+        """Append job info and metrics of a parsed report.
+
+        Existing records of the same job ID are replaced.
+        """
+        job = _job_dict(report.job_info)
+        job_id = job['job_id']
+        logger.info(
+            "Add job {} into warehouse {!s}".format(job_id, self.db_path)
+        )
+        with self._conn:
+            for table in ['jobs', 'samples', 'metrics']:
+                self._conn.execute(
+                    "DELETE FROM {} WHERE job_id = ?".format(table), (job_id,)
+                )
+            self._conn.execute(
+                "INSERT INTO jobs VALUES (?, ?, ?)",
+                (job_id, job['job_type'],
+                 datetime.now().isoformat(sep=' ', timespec='seconds'))
+            )
+            self._conn.executemany(
+                "INSERT INTO samples VALUES (?, ?, ?, ?, ?)",
+                [(job_id, s['name'], s['full_name'],
+                  s['pair_end'], s['stranded'])
+                 for s in job['samples']]
+            )
+            self._conn.executemany(
+                "INSERT INTO metrics VALUES (?, ?, ?, ?, ?, ?)",
+                iter_metric_rows(report)
+            )
+
+    def jobs(self):
+        """Return list of (job_id, job_type, added_at, n_samples)."""
+        return self._conn.execute(
+            "SELECT j.job_id, j.job_type, j.added_at, COUNT(s.name) "
+            "FROM jobs j LEFT JOIN samples s ON j.job_id = s.job_id "
+            "GROUP BY j.job_id ORDER BY j.added_at, j.job_id"
+        ).fetchall()
+
+    def metrics(self, stage=None):
+        """Return list of (stage, metric, n_jobs) of numeric metrics."""
+        sql = (
+            "SELECT stage, metric, COUNT(DISTINCT job_id) FROM metrics "
+            "WHERE value_num IS NOT NULL {} GROUP BY stage, metric "
+            "ORDER BY stage, metric"
+        )
+        if stage is None:
+            return self._conn.execute(sql.format('')).fetchall()
+        return self._conn.execute(
+            sql.format('AND stage = ?'), (stage,)
+        ).fetchall()
+
+    def trend(self, metric, stage=None, sample=None):
+        """Return list of (job_id, added_at, sample, value) of a metric.
+
+        Rows are ordered by the time jobs are added.
+        """
+        sql = (
+            "SELECT m.job_id, j.added_at, m.sample, m.value_num "
+            "FROM metrics m JOIN jobs j ON m.job_id = j.job_id "
+            "WHERE m.metric = ?"
+        )
+        params = [metric]
+        if stage is not None:
+            sql += " AND m.stage = ?"
+            params.append(stage)
+        if sample is not None:
+            sql += " AND m.sample = ?"
+            params.append(sample)
+        sql += " ORDER BY j.added_at, m.job_id, m.sample"
+        return self._conn.execute(sql, params).fetchall()
+
+    def compare(self, report):
+        """Compare numeric metrics of a parsed report against other jobs.
+
+        Per-sample metrics are averaged over samples, both for the report
+        and for each job in the warehouse. Metrics of list positions,
+        e.g. ``over_seq.3.count``, are skipped.
+
+        Returns
+        -------
+        List of dict with keys *stage*, *metric*, *value*, *n_jobs*, *min*,
+        *median*, *max* and *percentile* (percentage of jobs having value
+        less than or equal to this report). Only metrics found in other jobs
+        are included.
+        """
+        current = dict()
+        for job_id, stage, sample, metric, value, _ in iter_metric_rows(
+                report):
+            if value is None or _has_list_index(metric):
+                continue
+            current.setdefault((stage, metric), []).append(value)
+
+        histories = self._histories(current, str(report.job_info.id))
+        comparison = []
+        for (stage, metric), values in sorted(current.items()):
+            history = histories.get((stage, metric))
+            if not history:
+                continue
+            value = sum(values) / len(values)
+            n_below = sum(1 for v in history if v <= value)
+            comparison.append({
+                'stage': stage,
+                'metric': metric,
+                'value': value,
+                'n_jobs': len(history),
+                'min': min(history),
+                'median': statistics.median(history),
+                'max': max(history),
+                'percentile': n_below / len(history) * 100,
+            })
+        return comparison
+
+    def _histories(self, keys, job_id):
+        """Return mapping of (stage, metric) in *keys* to the per-job
+        averages of other jobs, fetched by one query."""
+        histories = dict()
+        with self._conn:
+            self._conn.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS compared "
+                "(stage TEXT, metric TEXT)"
+            )
+            self._conn.execute("DELETE FROM compared")
+            self._conn.executemany(
+                "INSERT INTO compared VALUES (?, ?)", list(keys)
+            )
+            rows = self._conn.execute(
+                "SELECT m.stage, m.metric, AVG(m.value_num) FROM metrics m "
+                "JOIN compared c ON m.stage = c.stage AND m.metric = c.metric "
+                "WHERE m.job_id != ? AND m.value_num IS NOT NULL "
+                "GROUP BY m.stage, m.metric, m.job_id",
+                (job_id,)
+            )
+            for stage, metric, value in rows:
+                histories.setdefault((stage, metric), []).append(value)
+        return histories
+
+
+_SCRIPT_DOC = """\
+Query metrics across jobs in a NGCloud metrics warehouse.
+
+Usage:
+    ngmetrics <db> jobs
+    ngmetrics <db> metrics [--stage=<stage>]
+    ngmetrics <db> trend <metric> [--stage=<stage>] [--sample=<sample>]
+    ngmetrics -h | --help
+    ngmetrics --version
+
+Options:
+    -h --help           Show this message.
+    -V --version        Show version
+    --stage=<stage>     Only metrics of the stage, e.g. TophatStage
+    --sample=<sample>   Only metrics of the sample or sample group
+
+Output is tab separated.
+"""
+
+
+def main(argv=None):
+    """Store the logics for :command:`ngmetrics`.
+
+    Examples
+    --------
+
+        >>> main(['metrics.db', 'trend', 'overall_pair_percent'])
+
+    """
+    args = docopt(_SCRIPT_DOC, argv=argv, version=ng.__version__)
+    warehouse = MetricsWarehouse(args['<db>'], create=False)
+    try:
+        if args['jobs']:
+            header = ['job_id', 'job_type', 'added_at', 'n_samples']
+            rows = warehouse.jobs()
+        elif args['metrics']:
+            header = ['stage', 'metric', 'n_jobs']
+            rows = warehouse.metrics(stage=args['--stage'])
+        else:
+            header = ['job_id', 'added_at', 'sample', 'value']
+            rows = warehouse.trend(
+                args['<metric>'],
+                stage=args['--stage'], sample=args['--sample']
+            )
+        print('\t'.join(header))
+        for row in rows:
+            print('\t'.join('' if v is None else str(v) for v in row))
+    finally:
+        warehouse.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+import os
+import sys
+import time
+from pathlib import Path
+try:
+    import inotify_simple
+except ImportError:
+    inotify_simple = None
+import ngcloud as ng
+from ngcloud.report import SummaryStage
+from ngcloud.util import strify_path, is_pathlike
+
+logger = ng._create_logger(__name__)
+
+__doc__ = """\
+Rebuild a report whenever its NGS result or templates change.
+
+Changes are monitored by inotify on Linux when inotify_simple_ is
+installed (``pip install ngcloud[watch]``), otherwise by polling file
+modification times.
+
+.. _inotify_simple: https://pypi.python.org/pypi/inotify_simple
+
+.. autosummary::
+
+    watch_report
+    InotifyWatcher
+    PollingWatcher
+"""
+
+
+class PollingWatcher:
+    """Watch file trees by comparing their modification time and size.
+
+    Parameters
+    ----------
+    paths : list of path-like object
+        Roots of the file trees to watch.
+    interval : float
+        Seconds between two scans.
+    """
+
+    def __init__(self, paths, interval=1.0):
+        self.paths = [Path(strify_path(p)) for p in paths]
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = dict()
+        for root in self.paths:
+            for current_root, dirs, files in os.walk(strify_path(root)):
+                for f in files:
+                    fp = os.path.join(current_root, f)
+                    try:
+                        st = os.stat(fp)
+                    except OSError:
+                        continue
+                    snapshot[fp] = (st.st_mtime, st.st_size)
+        return snapshot
+
+    def wait(self, timeout=None):
+        """Block until some files change or *timeout* seconds pass.
+
+        Returns
+        -------
+        :class:`!set` of :class:`~pathlib.Path` being created, modified or
+        deleted. Empty if timeout.
+        """
+        waited = 0
+        while timeout is None or waited < timeout:
+            time.sleep(self.interval)
+            waited += self.interval
+            snapshot = self._scan()
+            changed = {
+                Path(fp) for fp in set(snapshot) | set(self._snapshot)
+                if snapshot.get(fp) != self._snapshot.get(fp)
+            }
+            self._snapshot = snapshot
+            if changed:
+                return changed
+        return set()
+
+
+class InotifyWatcher:
+    """Watch file trees by Linux inotify, new sub-folders are watched as well.
+
+    Require inotify_simple_. See :class:`PollingWatcher` for parameters.
+    """
+
+    def __init__(self, paths):
+        flags = inotify_simple.flags
+        mask = flags.CREATE | flags.CLOSE_WRITE | flags.MODIFY
+        self._mask = mask | flags.MOVED_TO | flags.MOVED_FROM | flags.DELETE
+        self._is_dir = flags.ISDIR
+        self._create = flags.CREATE | flags.MOVED_TO
+        self._inotify = inotify_simple.INotify()
+        self._wd_path = dict()
+        for p in paths:
+            self._add_tree(strify_path(p))
+
+    def _add_tree(self, root):
+        for current_root, dirs, files in os.walk(root):
+            wd = self._inotify.add_watch(current_root, self._mask)
+            self._wd_path[wd] = Path(current_root)
+
+    def wait(self, timeout=None):
+        """Block until some files change or *timeout* seconds pass."""
+        changed = set()
+        events = self._inotify.read(
+            timeout=None if timeout is None else int(timeout * 1000)
+        )
+        for event in events:
+            if event.wd not in self._wd_path:
+                continue
+            pth = self._wd_path[event.wd] / event.name
+            if event.mask & self._is_dir and event.mask & self._create:
+                self._add_tree(strify_path(pth))
+            changed.add(pth)
+        return changed
+
+
+def _make_watcher(paths, interval):
+    if inotify_simple is not None and sys.platform.startswith('linux'):
+        logger.info("Watching changes by inotify")
+        return InotifyWatcher(paths)
+    logger.info(
+        "Watching changes by polling every {} sec, install inotify_simple "
+        "to use inotify on Linux".format(interval)
+    )
+    return PollingWatcher(paths, interval=interval)
+
+
+def _is_under(pth, root):
+    return pth == root or root in pth.parents
+
+
+def _all_paths(path_likes):
+    if is_pathlike(path_likes):
+        path_likes = [path_likes]
+    return [Path(strify_path(p)).resolve() for p in path_likes]
+
+
+def watch_report(report, job_dir, out_dir, debounce=2.0, interval=1.0):
+    """Generate a report and keep it updated on changes until interrupted.
+
+    The report is first generated by :meth:`Report.generate
+    <ngcloud.report.Report.generate>`. Then the job folder, template paths
+    and static roots are watched. Changes coming within *debounce* seconds
+    are handled together by :meth:`Report.update
+    <ngcloud.report.Report.update>`:
+
+    - only stages whose :attr:`~ngcloud.report.Stage.result_root` tree
+      changed are parsed again
+    - template changes cause a re-render only
+    - static root changes cause template static files to be copied again
+
+    If job_info.yaml changes or the report cannot be generated yet, for
+    example some stage result folders have not been produced, the whole
+    report is generated again on next change.
+
+    Parameters
+    ----------
+    report : :class:`~ngcloud.report.Report` object
+    job_dir : path-like object
+    out_dir : path-like object
+    debounce : float
+        Seconds to wait for a burst of changes to settle.
+    interval : float
+        Seconds between scans when polling.
+
+    .. versionadded:: 0.3.4
+    """
+    job_dir = Path(job_dir).resolve()
+    out_dir = Path(out_dir).resolve()
+    job_info_yaml = job_dir / 'job_info.yaml'
+    static_roots = set(_all_paths(report.static_roots))
+    template_roots = set()
+    for Stage in report.stage_classnames:
+        template_roots.update(_all_paths(Stage.template_find_paths))
+
+    watched = [job_dir] + [
+        p for p in sorted(static_roots | template_roots) if p.exists()
+    ]
+    watcher = _make_watcher(watched, interval)
+
+    need_full = not _try_generate(report, job_dir, out_dir)
+    while True:
+        changed = watcher.wait()
+        while True:
+            more = watcher.wait(timeout=debounce)
+            if not more:
+                break
+            changed |= more
+        changed = {p for p in changed if not _is_under(p, out_dir)}
+        if not changed:
+            continue
+        logger.info("{} changed paths detected".format(len(changed)))
+
+        if need_full or job_info_yaml in changed:
+            need_full = not _try_generate(report, job_dir, out_dir)
+            continue
+
+        stale = [
+            stage for stage in report._stages
+            if not isinstance(stage, SummaryStage)
+            if stage.result_foldername
+            if any(_is_under(p, stage.result_root.resolve()) for p in changed)
+        ]
+        static = any(
+            _is_under(p, root) for p in changed for root in static_roots
+        )
+        logger.info(
+            "Update stages {!r}".format([type(s).__name__ for s in stale])
+        )
+        try:
+            report.update(stages=stale, static=static)
+        except Exception:
+            logger.exception("Updating report failed, wait for next change")
+
+
+def _try_generate(report, job_dir, out_dir):
+    try:
+        report.generate(job_dir, out_dir)
+    except Exception:
+        logger.exception("Generating report failed, wait for next change")
+        return False
+    logger.info("Report generated under {!s}".format(report.report_root))
+    return True
@@ -88,8 +88,12 @@ if sys.platform.startswith("win32"):
 else:
     color_dep = ['colorlog']
 
+watch_dep = ['inotify_simple']
+parquet_dep = ['pyarrow']
+image_dep = ['Pillow']
+
 all_dep = []
-for deps in [color_dep]:
+for deps in [color_dep, watch_dep, parquet_dep, image_dep]:
     all_dep.extend(deps)
 
 setup(
@@ -126,6 +130,9 @@ setup(
         ':python_version=="2.7"': ['pathlib'],
         ':python_version=="3.3"': ['pathlib'],
         'color': color_dep,
+        'watch': watch_dep,
+        'parquet': parquet_dep,
+        'image': image_dep,
         'all': all_dep,
     },
 
@@ -143,6 +150,11 @@ setup(
     entry_points={
         'console_scripts': [
             'ngreport = ngcloud.report:main',
+            'ngmetrics = ngcloud.warehouse:main',
+        ],
+        'ngcloud.pipes': [
+            'tuxedo = ngcloud.pipe.tuxedo:TuxedoReport',
+            'gatk = ngcloud.pipe.gatk:GATKReport',
         ],
     },
 